@@ -0,0 +1,16 @@
+"""Load and filter Scopus article exports outside of Streamlit."""
+
+from . import config
+from .batch import BatchExecutor, run_batch
+from .dataset import Dataset, dataset_for, open_dataset
+from .filters import (
+    CITATION_OPTIONS,
+    JCR_OPTIONS,
+    PERIOD_OPTIONS,
+    FilterSpec,
+    Predicate,
+    apply_filters,
+    predicate_mask,
+)
+from .io import DEFAULT_FILE, convert_to_excel, expand_sources, load_data, load_many, load_paths, load_source, write_results
+from .specs import load_spec_file, parse_specs
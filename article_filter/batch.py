@@ -0,0 +1,155 @@
+"""Shared-scan execution of many filter specs over the same dataset."""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .filters import KEYWORDS_COLUMN, predicate_mask
+
+
+class BatchExecutor:
+    """Evaluate FilterSpecs over one frame, scanning each distinct predicate only once.
+
+    Predicate masks are cached as boolean arrays and combined per spec, so
+    a batch of specs costs one column scan per distinct condition instead
+    of one per spec and condition. Keyword conditions are evaluated once per
+    distinct Keywords value rather than once per row. With a DatasetIndex,
+    predicates it can answer are looked up instead of scanned.
+
+    An executor may be shared by many sessions and server threads, so the
+    mask cache is guarded by a lock and bounded to max_bytes (default:
+    ARTICLE_FILTER_MASK_CACHE_MB), dropping the least recently used masks.
+    """
+
+    def __init__(self, data, index=None, max_bytes=None):
+        self.data = data
+        self.index = index
+        self.max_bytes = config.MASK_CACHE_MB * 2**20 if max_bytes is None else max_bytes
+        # predicate -> (mask, access), least recently used first
+        self._masks = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._keyword_codes = None
+        self.hits = 0
+        self.misses = 0
+
+    def _keywords_mask(self, predicate):
+        if self._keyword_codes is None:
+            codes, uniques = pd.factorize(self.data[KEYWORDS_COLUMN])
+            self._keyword_codes = (codes, pd.DataFrame({KEYWORDS_COLUMN: uniques}))
+        codes, uniques = self._keyword_codes
+        unique_mask = predicate_mask(uniques, predicate).to_numpy(dtype=bool)
+        # Missing keywords (code -1) never match
+        return np.append(unique_mask, False)[codes]
+
+    def _lookup(self, predicate):
+        """The mask of a predicate, how it was obtained, and whether it was cached."""
+        with self._lock:
+            entry = self._masks.get(predicate)
+            if entry is not None:
+                self._masks.move_to_end(predicate)
+                self.hits += 1
+                return entry + (True,)
+            self.misses += 1
+        # Computed outside the lock: other threads keep using the cache meanwhile
+        access = "index"
+        mask = self.index.mask(predicate) if self.index is not None else None
+        if mask is None and predicate.field == "keywords":
+            mask = self._keywords_mask(predicate)
+            access = "distinct scan"
+        elif mask is None:
+            mask = predicate_mask(self.data, predicate).to_numpy(dtype=bool)
+            access = "scan"
+        self._store(predicate, mask, access)
+        return mask, access, False
+
+    def _store(self, predicate, mask, access):
+        if mask.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._masks.pop(predicate, None)
+            if previous is not None:
+                self._bytes -= previous[0].nbytes
+            self._masks[predicate] = (mask, access)
+            self._bytes += mask.nbytes
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._masks.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def cache_bytes(self):
+        """Bytes held by the cached masks."""
+        with self._lock:
+            return self._bytes
+
+    def cache_len(self):
+        """Number of cached masks."""
+        with self._lock:
+            return len(self._masks)
+
+    def mask(self, predicate):
+        return self._lookup(predicate)[0]
+
+    def explain(self, spec):
+        """Evaluate spec one predicate at a time and describe each step.
+
+        A step records how the predicate's mask was obtained (index lookup,
+        scan, or scan of the distinct keyword values), whether it came from
+        the mask cache, the rows before and after it and its time.
+        """
+        steps = []
+        rows = len(self.data)
+        combined = None
+        for predicate in spec.predicates():
+            start = time.perf_counter()
+            mask, access, cached = self._lookup(predicate)
+            combined = mask.copy() if combined is None else combined & mask
+            elapsed = time.perf_counter() - start
+            rows_out = int(combined.sum())
+            steps.append({
+                "field": predicate.field,
+                "value": predicate.value,
+                "exact": predicate.exact,
+                "access": access,
+                "cache": "hit" if cached else "miss",
+                "rows_in": rows,
+                "rows_out": rows_out,
+                "ms": round(elapsed * 1000, 3),
+            })
+            rows = rows_out
+        return steps
+
+    def spec_mask(self, spec):
+        predicates = spec.predicates()
+        if not predicates:
+            return np.ones(len(self.data), dtype=bool)
+        mask = self.mask(predicates[0]).copy()
+        for predicate in predicates[1:]:
+            mask &= self.mask(predicate)
+        return mask
+
+    def masks(self, specs):
+        """Return one row mask per spec; specs with the same predicates share a mask."""
+        by_predicates = {}
+        for spec in specs:
+            key = frozenset(spec.predicates())
+            if key not in by_predicates:
+                by_predicates[key] = self.spec_mask(spec)
+        return [by_predicates[frozenset(spec.predicates())] for spec in specs]
+
+    def filter(self, spec):
+        return self.data[self.spec_mask(spec)]
+
+    def run(self, specs):
+        return [self.data[mask] for mask in self.masks(specs)]
+
+    def counts(self, specs):
+        return [int(mask.sum()) for mask in self.masks(specs)]
+
+
+def run_batch(data, specs):
+    """Filter data with every spec, sharing predicate scans between them."""
+    return BatchExecutor(data).run(specs)
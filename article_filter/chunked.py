@@ -0,0 +1,184 @@
+"""Chunked CSV ingestion with per-chunk dtype compaction for very large exports.
+
+The file is parsed chunk by chunk and each chunk is copied into column
+buffers that are allocated once, sized from a count of the newlines in the
+file. Peak memory is therefore roughly the final table plus one chunk,
+instead of several times the file size.
+"""
+
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Object columns whose first chunk has fewer distinct values than this share
+# of its rows are stored as categoricals (dictionary encoded)
+CATEGORY_RATIO = 0.5
+
+READ_BLOCK_BYTES = 1 << 24
+
+
+def count_lines(source):
+    """Count newline characters in a path or seekable binary file without parsing it."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return count_lines(f)
+    position = source.tell()
+    lines = 0
+    while True:
+        block = source.read(READ_BLOCK_BYTES)
+        if not block:
+            break
+        lines += block.count(b"\n")
+    source.seek(position)
+    return lines
+
+
+def smallest_int_dtype(values):
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def compact_dtype(column):
+    """Return the narrowest numpy dtype that holds column without losing values."""
+    if pd.api.types.is_bool_dtype(column):
+        return np.dtype(bool)
+    if pd.api.types.is_integer_dtype(column):
+        return smallest_int_dtype(column.to_numpy())
+    if pd.api.types.is_float_dtype(column):
+        values = column.to_numpy(dtype=np.float64)
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+            return np.dtype(np.float32)
+        return np.dtype(np.float64)
+    return None
+
+
+class ColumnBuffer:
+    """A pre-sized numpy buffer for one numeric column, widened if a later chunk needs it."""
+
+    def __init__(self, dtype, capacity):
+        self.values = np.empty(capacity, dtype=dtype)
+
+    def write(self, start, column):
+        dtype = compact_dtype(column)
+        if dtype is None:
+            raise TypeError("non-numeric values in a numeric column")
+        wider = np.result_type(self.values.dtype, dtype)
+        if wider != self.values.dtype:
+            self.values = self.values.astype(wider)
+        self.ensure(start + len(column))
+        self.values[start:start + len(column)] = column.to_numpy(dtype=self.values.dtype)
+
+    def ensure(self, size):
+        if size > len(self.values):
+            grown = np.empty(max(size, 2 * len(self.values)), dtype=self.values.dtype)
+            grown[:len(self.values)] = self.values
+            self.values = grown
+
+    def finish(self, size):
+        return self.values[:size]
+
+
+class CategoryBuffer(ColumnBuffer):
+    """Dictionary encoded strings: int32 codes plus the categories seen so far."""
+
+    def __init__(self, capacity):
+        super().__init__(np.int32, capacity)
+        self.categories = {}
+
+    def write(self, start, column):
+        codes, uniques = pd.factorize(column)
+        lookup = np.array([self.categories.setdefault(v, len(self.categories)) for v in uniques] + [-1], dtype=np.int32)
+        self.ensure(start + len(column))
+        self.values[start:start + len(column)] = lookup[codes]
+
+    def finish(self, size):
+        return pd.Categorical.from_codes(self.values[:size], categories=list(self.categories))
+
+
+class ObjectBuffer(ColumnBuffer):
+    def __init__(self, capacity):
+        super().__init__(object, capacity)
+
+    def write(self, start, column):
+        self.ensure(start + len(column))
+        self.values[start:start + len(column)] = column.to_numpy(dtype=object)
+
+    def finish(self, size):
+        return pd.Series(self.values[:size]).infer_objects()
+
+
+def is_parsed_text(column):
+    """True when read_csv parsed a chunk of a text column into numbers or booleans."""
+    return compact_dtype(column) is not None and column.notna().any()
+
+
+def read_text_columns(source, names, read_options):
+    """The columns names of source, unparsed."""
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    return pd.read_csv(source, usecols=names, dtype={name: object for name in names}, **read_options)
+
+
+def new_buffer(column, capacity):
+    dtype = compact_dtype(column)
+    if dtype is not None:
+        return ColumnBuffer(dtype, capacity)
+    if column.nunique() < CATEGORY_RATIO * max(len(column), 1):
+        return CategoryBuffer(capacity)
+    return ObjectBuffer(capacity)
+
+
+def read_chunked(source, chunk_rows=100_000, progress=None, **read_options):
+    """Parse a CSV export in chunks of chunk_rows into a compacted DataFrame.
+
+    progress, if given, is called as progress(fraction_done, rows_read) after
+    every chunk.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    # One newline per record plus the header: lines bounds the row count
+    lines = count_lines(source)
+    capacity = lines + 1
+    buffers = {}
+    # Text columns with chunks that were parsed as numbers or booleans
+    mixed = set()
+    rows = 0
+    done = 0.0
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, **read_options):
+        for name in chunk.columns:
+            column = chunk[name]
+            buffer = buffers.get(name)
+            if buffer is None:
+                buffer = buffers[name] = new_buffer(column, capacity)
+            try:
+                buffer.write(rows, column)
+            except TypeError:
+                # A column that looked numeric in earlier chunks turns out to hold text
+                text = buffers[name] = ObjectBuffer(capacity)
+                text.write(0, pd.Series(buffer.finish(rows), dtype=object))
+                text.write(rows, column)
+                mixed.add(name)
+            else:
+                if isinstance(buffer, (ObjectBuffer, CategoryBuffer)) and is_parsed_text(column):
+                    mixed.add(name)
+        rows += len(chunk)
+        done = min(rows / max(lines - 1, 1), 1.0)
+        if progress is not None:
+            progress(done, rows)
+    if progress is not None and done < 1.0:
+        # The line count overestimates rows when records span lines or are skipped
+        progress(1.0, rows)
+    if mixed:
+        # Those chunks hold numbers instead of the text read_csv gives for the
+        # whole column: such columns are read again, as text
+        for name, column in read_text_columns(source, sorted(mixed), read_options).items():
+            text = buffers[name] = CategoryBuffer(rows) if isinstance(buffers[name], CategoryBuffer) else ObjectBuffer(rows)
+            text.write(0, column)
+    return pd.DataFrame({name: buffer.finish(rows) for name, buffer in buffers.items()})
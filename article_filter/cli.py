@@ -0,0 +1,174 @@
+"""Command line interface: python -m article_filter <command> ..."""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from . import config
+from .dataset import BACKENDS, open_dataset
+from .io import expand_sources, write_results
+from .specs import load_spec_file
+
+
+APP_SCRIPT = "interactive_article_filter_10.py"
+
+
+def safe_filename(name):
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "results"
+
+
+def unique_filename(name, extension, used):
+    """A file name for a spec's results that no earlier spec of the run has used."""
+    stem = safe_filename(name)
+    filename, n = f"{stem}.{extension}", 1
+    while filename in used:
+        n += 1
+        filename = f"{stem}-{n}.{extension}"
+    used.add(filename)
+    return filename
+
+
+def print_progress(done, rows):
+    end = "\n" if done >= 1 else ""
+    print(f"\rLoading data: {done:6.1%} ({rows:,} rows)", end=end, file=sys.stderr, flush=True)
+
+
+def cmd_filter(args):
+    specs = [spec for path in args.specs for spec in load_spec_file(path)]
+    dataset = open_dataset(args.data, backend=args.backend, progress=print_progress)
+
+    if args.out_dir and not args.count_only:
+        os.makedirs(args.out_dir, exist_ok=True)
+    # Specs sharing a name (or differing only in characters a file name cannot
+    # hold) get numbered files rather than overwriting each other's results
+    used = set()
+    for spec in specs:
+        if args.count_only or not args.out_dir:
+            print(f"{spec.name}\t{dataset.count(spec)}")
+            continue
+        path = os.path.join(args.out_dir, unique_filename(spec.name, args.format, used))
+        result = dataset.filter(spec)
+        write_results(result, path)
+        print(f"{spec.name}\t{len(result)}\t{path}")
+    return 0
+
+
+def cmd_explain(args):
+    from .explain import explain, format_plan
+
+    specs = [spec for path in args.specs for spec in load_spec_file(path)]
+    dataset = open_dataset(args.data, backend=args.backend, progress=print_progress)
+    for spec in specs:
+        plan = explain(dataset, spec)
+        if args.json:
+            print(json.dumps({"name": spec.name, **plan}, default=str))
+        else:
+            print(f"{spec.name}\n{format_plan(plan)}")
+    return 0
+
+
+def cmd_serve(args):
+    from .server import serve
+
+    serve(open_dataset(args.data, backend=args.backend, progress=print_progress), host=args.host, port=args.port, max_concurrency=args.max_concurrency)
+    return 0
+
+
+def cmd_index(args):
+    from .index import index_path, load_or_build
+    from .io import load_source
+
+    paths = expand_sources(args.data)
+    data = load_source(args.data, max_workers=config.INGEST_WORKERS, progress=print_progress)
+    path = index_path(paths) if paths else None
+    if args.force and path and os.path.exists(path):
+        os.remove(path)
+    start = time.perf_counter()
+    index = load_or_build(paths, data)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    print(f"{path}\t{index.n_rows} rows\t{len(index.arrays)} arrays\t{size:,} bytes\t{elapsed:.2f} s")
+    return 0
+
+
+def cmd_warm(args):
+    from .warm import warm_source
+
+    start = time.perf_counter()
+    dataset = warm_source(args.data, backend=args.backend, progress=print_progress)
+    print(f"{args.data}\t{args.backend}\t{len(dataset)} rows\tready in {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+def cmd_app(args):
+    from streamlit.web import cli as streamlit_cli
+
+    from .warm import start_default
+
+    # Same process as the server: the app's sessions find the data being prepared
+    if expand_sources(config.DATA_SOURCE):
+        start_default()
+    return streamlit_cli.main(["run", args.script, *args.streamlit_args], prog_name="streamlit")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="article_filter", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("filter", help="apply one or many filter specs to a dataset")
+    p.add_argument("specs", nargs="+", metavar="SPEC", help="JSON or YAML filter spec file(s)")
+    p.add_argument("-d", "--data", default=config.DATA_SOURCE,
+                   help=f"CSV export, directory or glob to filter (default: {config.DATA_SOURCE})")
+    p.add_argument("-o", "--out-dir", help="directory for one result file per spec")
+    p.add_argument("-f", "--format", default="csv", choices=["csv", "xlsx", "json", "ndjson"])
+    p.add_argument("--count-only", action="store_true", help="only print the number of matching rows")
+    p.add_argument("--backend", choices=BACKENDS, default=config.BACKEND, help="query backend")
+    p.set_defaults(func=cmd_filter)
+
+    p = commands.add_parser("explain", help="show how each filter spec is evaluated, step by step")
+    p.add_argument("specs", nargs="+", metavar="SPEC", help="JSON or YAML filter spec file(s)")
+    p.add_argument("-d", "--data", default=config.DATA_SOURCE,
+                   help=f"CSV export, directory or glob to query (default: {config.DATA_SOURCE})")
+    p.add_argument("--backend", choices=BACKENDS, default=config.BACKEND, help="query backend")
+    p.add_argument("--json", action="store_true", help="print one JSON plan per line")
+    p.set_defaults(func=cmd_explain)
+
+    p = commands.add_parser("serve", help="serve the HTTP/JSON query API over a dataset")
+    p.add_argument("-d", "--data", default=config.DATA_SOURCE,
+                   help=f"CSV export, directory or glob to serve (default: {config.DATA_SOURCE})")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--max-concurrency", type=int, default=4, help="queries executed at the same time")
+    p.add_argument("--backend", choices=BACKENDS, default=config.BACKEND, help="query backend")
+    p.set_defaults(func=cmd_serve)
+
+    p = commands.add_parser("index", help="build (or validate) the index bundle stored next to the data")
+    p.add_argument("-d", "--data", default=config.DATA_SOURCE,
+                   help=f"CSV export, directory or glob to index (default: {config.DATA_SOURCE})")
+    p.add_argument("--force", action="store_true", help="rebuild even if the bundle is current")
+    p.set_defaults(func=cmd_index)
+
+    p = commands.add_parser("warm", help="prepare the on-disk stores and indexes of a dataset ahead of serving it")
+    p.add_argument("-d", "--data", default=config.DATA_SOURCE,
+                   help=f"CSV export, directory or glob to prepare (default: {config.DATA_SOURCE})")
+    p.add_argument("--backend", choices=BACKENDS, default=config.BACKEND, help="query backend")
+    p.set_defaults(func=cmd_warm)
+
+    p = commands.add_parser("app", help="start preparing the default data, then serve an app with streamlit run")
+    p.add_argument("script", nargs="?", default=APP_SCRIPT, help=f"Streamlit app (default: {APP_SCRIPT})")
+    p.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="options passed on to streamlit run")
+    p.set_defaults(func=cmd_app)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError, TypeError, ImportError) as e:
+        # ImportError: an optional dependency such as PyYAML is missing
+        print(f"article_filter: error: {e}", file=sys.stderr)
+        return 1
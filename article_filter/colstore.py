@@ -0,0 +1,199 @@
+"""Memory-mapped column store shared by every process that loads the same data.
+
+A store is a directory ``<first data file>.cols`` with one set of ``.npy``
+files per column and a ``manifest.json`` recording the source fingerprint:
+
+* numeric, boolean and datetime columns: the values array;
+* categorical columns: the codes array, categories and their dtype kept
+  in the manifest (string, numeric or boolean categories);
+* text columns: UTF-8 bytes, int64 offsets and a packed validity bitmap,
+  the Arrow large_string layout, so with pyarrow installed they become
+  pandas string columns without copying.
+
+Nothing in a store is executable: columns of other Python objects are not
+stored (UnsupportedColumn), and the caller keeps the parsed frame instead.
+
+Opening a store memory-maps these files, so all Streamlit processes on a
+host share the same physical pages through the OS page cache instead of
+each parsing and holding its own copy of the CSV.
+"""
+
+import errno
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .fingerprint import sources_fingerprint
+
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+
+
+class UnsupportedColumn(ValueError):
+    """A column holds values a column store cannot represent."""
+
+
+def store_path(paths):
+    return f"{paths[0]}.cols"
+
+
+def column_kind(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = column.cat.categories
+        # Categories go to the JSON manifest: strings, numbers and booleans only
+        if categories.dtype.kind in "biuf" or all(isinstance(c, str) for c in categories):
+            return "category"
+    elif column.dtype.kind in "biufmM":
+        return "numeric"
+    elif all(isinstance(v, str) for v in column.dropna()):
+        return "text"
+    raise UnsupportedColumn(f"Column {column.name!r} of {column.dtype} values cannot be stored")
+
+
+def write_text(directory, stem, column):
+    valid = column.notna().to_numpy()
+    encoded = [v.encode("utf-8") if ok else b"" for v, ok in zip(column.tolist(), valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(directory, f"{stem}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(directory, f"{stem}.offsets.npy"), offsets)
+    np.save(os.path.join(directory, f"{stem}.valid.npy"), np.packbits(valid, bitorder="little"))
+
+
+def read_text(directory, stem, rows):
+    data = np.load(os.path.join(directory, f"{stem}.data.npy"), mmap_mode="r")
+    offsets = np.load(os.path.join(directory, f"{stem}.offsets.npy"), mmap_mode="r")
+    valid = np.load(os.path.join(directory, f"{stem}.valid.npy"), mmap_mode="r")
+    try:
+        import pyarrow as pa
+    except ImportError:
+        blob = data.tobytes()
+        bits = np.unpackbits(valid, count=rows, bitorder="little").astype(bool)
+        values = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") if bits[i] else np.nan for i in range(rows)]
+        return pd.array(values, dtype="str")
+    array = pa.LargeStringArray.from_buffers(rows, pa.py_buffer(offsets), pa.py_buffer(data), pa.py_buffer(valid))
+    return pd.arrays.ArrowStringArray(array, dtype=pd.StringDtype("pyarrow", na_value=np.nan))
+
+
+def write_store(data, path, fingerprint):
+    """Write data as a column store at path, replacing any previous store atomically.
+
+    Raises UnsupportedColumn, before writing anything, when a column cannot be stored.
+    """
+    kinds = [column_kind(data[name]) for name in data.columns]
+    # A directory of its own: processes and threads writing the same store
+    # at once never share one
+    parent, store_name = os.path.split(os.path.abspath(path))
+    tmp_path = tempfile.mkdtemp(prefix=f"{store_name}.tmp-", dir=parent)
+    try:
+        columns = []
+        for i, (name, kind) in enumerate(zip(data.columns, kinds)):
+            column = data[name]
+            stem = f"c{i}"
+            entry = {"name": name, "kind": kind, "stem": stem}
+            if kind == "numeric":
+                np.save(os.path.join(tmp_path, f"{stem}.npy"), column.to_numpy())
+            elif kind == "category":
+                np.save(os.path.join(tmp_path, f"{stem}.npy"), column.cat.codes.to_numpy())
+                entry["categories"] = column.cat.categories.tolist()
+                entry["categories_dtype"] = str(column.cat.categories.dtype)
+                entry["ordered"] = bool(column.cat.ordered)
+            else:
+                write_text(tmp_path, stem, column)
+            columns.append(entry)
+        manifest = {"version": FORMAT_VERSION, "fingerprint": fingerprint, "rows": len(data), "columns": columns}
+        with open(os.path.join(tmp_path, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        replace_directory(tmp_path, path)
+    finally:
+        # Left behind only if the store could not be moved into place
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def replace_directory(new_path, path):
+    """Move the directory new_path to path, replacing a directory there.
+
+    Directories cannot be renamed over non-empty ones, so a store already
+    at path is first moved aside to a unique name. If another writer puts
+    its store at path in between, that store is kept: both hold the same
+    data.
+    """
+    try:
+        os.rename(new_path, path)
+        return
+    except OSError as e:
+        # Checked by errno: another writer may be moving the store at path
+        if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+            raise
+    parent, store_name = os.path.split(os.path.abspath(path))
+    old_path = tempfile.mkdtemp(prefix=f"{store_name}.old-", dir=parent)
+    try:
+        try:
+            # Onto the empty directory just created; processes that still
+            # map the old files keep them until they unmap
+            os.rename(path, old_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename(new_path, path)
+        except OSError as e:
+            if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                raise
+    finally:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == FORMAT_VERSION else None
+
+
+def open_store(path, manifest=None):
+    """Memory-map a column store into a DataFrame."""
+    manifest = manifest or read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No column store at {path}")
+    rows = manifest["rows"]
+    arrays = {}
+    for entry in manifest["columns"]:
+        stem = entry["stem"]
+        if entry["kind"] == "numeric":
+            arrays[entry["name"]] = np.load(os.path.join(path, f"{stem}.npy"), mmap_mode="r")
+        elif entry["kind"] == "category":
+            codes = np.load(os.path.join(path, f"{stem}.npy"), mmap_mode="r")
+            categories = pd.Index(entry["categories"], dtype=entry["categories_dtype"])
+            arrays[entry["name"]] = pd.Categorical.from_codes(codes, categories=categories, ordered=entry["ordered"])
+        elif entry["kind"] == "text":
+            arrays[entry["name"]] = read_text(path, stem, rows)
+        else:
+            raise FileNotFoundError(f"Unknown column kind {entry['kind']!r} in the column store at {path}")
+    # copy=False keeps every column backed by its mapped file
+    return pd.DataFrame(arrays, index=pd.RangeIndex(rows), copy=False)
+
+
+def load_store(path, fingerprint, load):
+    """Open the column store at path, creating it with load() unless it holds fingerprint."""
+    manifest = read_manifest(path)
+    if manifest is not None and manifest["fingerprint"] == fingerprint:
+        return open_store(path, manifest)
+    data = load()
+    try:
+        write_store(data, path, fingerprint)
+    except (OSError, UnsupportedColumn):
+        # Read-only data directory or a column of arbitrary objects: serve the
+        # parsed frame, parse again next time
+        return data
+    return open_store(path)
+
+
+def load_cached(paths, load):
+    """Open the column store of paths, creating it with load(paths) when missing or stale."""
+    return load_store(store_path(paths), sources_fingerprint(paths), lambda: load(paths))
@@ -0,0 +1,109 @@
+"""Settings read from ARTICLE_FILTER_* environment variables."""
+
+import os
+
+DEFAULT_FILE = "Base Final_25_12_2024_5.csv"
+
+
+def flag(value):
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def setting(name, default=None, cast=str):
+    value = os.environ.get(f"ARTICLE_FILTER_{name}")
+    if value is None or value == "":
+        return default
+    return cast(value)
+
+
+# File, directory or glob pattern loaded when nothing is uploaded
+DATA_SOURCE = setting("DATA", DEFAULT_FILE)
+
+# Worker processes used to parse several files at once (None: one per CPU)
+INGEST_WORKERS = setting("INGEST_WORKERS", None, int)
+
+# Exports at least this large are parsed in chunks with dtype compaction
+CHUNKED_THRESHOLD_MB = setting("CHUNKED_THRESHOLD_MB", 256, float)
+
+# Rows per chunk for chunked parsing
+CHUNK_ROWS = setting("CHUNK_ROWS", 100_000, int)
+
+# Query backend: "pandas" or "polars" (in memory), "sqlite" (out of core, default data only)
+BACKEND = setting("BACKEND", "pandas")
+
+# SQLite file used by the sqlite backend (default: next to the first data file)
+SQLITE_PATH = setting("SQLITE_PATH", None)
+
+# Build and memory-map a persistent index bundle (<data file>.idx) next to the data
+INDEX = setting("INDEX", True, flag)
+
+# Checksum every array of an index bundle when it is opened (default: only
+# its header and size are checked, which keeps opening it instant)
+INDEX_VERIFY = setting("INDEX_VERIFY", False, flag)
+
+# Keep a memory-mapped column store (<data file>.cols) next to the data so that
+# every process loading it shares one copy through the OS page cache
+COLUMN_STORE = setting("COLUMN_STORE", True, flag)
+
+# Poll the default data file and reload it in the background when it changes
+# (appended rows are parsed and indexed on their own)
+WATCH = setting("WATCH", True, flag)
+
+# Seconds between two checks of the default data file
+WATCH_INTERVAL = setting("WATCH_INTERVAL", 5.0, float)
+
+# Memory budget of the predicate mask cache of each in-memory dataset; the
+# least recently used masks are dropped beyond it
+MASK_CACHE_MB = setting("MASK_CACHE_MB", 256, float)
+
+# Memory budget for uploaded datasets; beyond it the least recently used are
+# spilled to memory-mapped column stores on disk
+UPLOAD_MEMORY_MB = setting("UPLOAD_MEMORY_MB", 1024, float)
+
+# Seconds an uploaded dataset is kept after its last use
+UPLOAD_TTL = setting("UPLOAD_TTL", 3600, float)
+
+# Directory for spilled uploads (default: a folder in the system temp directory)
+SPILL_DIR = setting("SPILL_DIR", None)
+
+# Engine reading Excel workbooks: "calamine", "openpyxl" or "auto" (calamine if installed)
+EXCEL_ENGINE = setting("EXCEL_ENGINE", "auto")
+
+# Directory of the column stores of workbooks already read (default: a
+# folder in the system temp directory)
+EXCEL_CACHE_DIR = setting("EXCEL_CACHE_DIR", None)
+
+# Disk budget of those column stores; the least recently used are deleted
+# beyond it, and any unused for longer than ARTICLE_FILTER_UPLOAD_TTL
+EXCEL_CACHE_MB = setting("EXCEL_CACHE_MB", 1024, float)
+
+# Show the stage timings panel in the app sidebar (also with ?debug=1 in the URL)
+DEBUG = setting("DEBUG", False, flag)
+
+# JSON Lines file receiving the stage timings of every app rerun (unset: no log)
+TIMING_LOG = setting("TIMING_LOG", None)
+
+# Queries taking at least this long are logged with their plan
+SLOW_QUERY_MS = setting("SLOW_QUERY_MS", 250, float)
+
+# JSON Lines file receiving slow queries and their plans (unset: no log)
+SLOW_QUERY_LOG = setting("SLOW_QUERY_LOG", None)
+
+# Local port serving Prometheus metrics at /metrics (unset: not served)
+METRICS_PORT = setting("METRICS_PORT", None, int)
+
+# Profile every app run: "cprofile" or "sample" (unset: only runs with ?profile=)
+PROFILE = setting("PROFILE", None)
+
+# Token to pass as ?token= to profile a run from the URL or open ?admin=profiles
+# (unset: both are disabled)
+ADMIN_TOKEN = setting("ADMIN_TOKEN", None)
+
+# Directory receiving profiles (default: article_filter-profiles in the temp directory)
+PROFILE_DIR = setting("PROFILE_DIR", None)
+
+# Number of most recent profiles kept
+PROFILE_KEEP = setting("PROFILE_KEEP", 50, int)
+
+# Trace allocations with tracemalloc to report the top ones of each run (slows the app down)
+TRACEMALLOC = setting("TRACEMALLOC", False, flag)
@@ -0,0 +1,94 @@
+"""A loaded article table shared by the CLI, the HTTP API and the apps."""
+
+import numpy as np
+
+from . import config
+from .batch import BatchExecutor
+from .io import expand_sources, load_source
+
+
+class Dataset:
+    """An article table together with the cached predicate masks used to query it."""
+
+    def __init__(self, data, source=None, index=None):
+        self.data = data
+        self.source = source
+        self.index = index
+        self.executor = BatchExecutor(data, index=index)
+
+    @classmethod
+    def from_file(cls, source, progress=None):
+        """Load a file, directory or glob pattern of CSV exports."""
+        return cls(load_source(source, max_workers=config.INGEST_WORKERS, progress=progress), source=source)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def empty(self):
+        return self.data.empty
+
+    @property
+    def columns(self):
+        return list(self.data.columns)
+
+    def distinct(self, column):
+        """Non-null values of column in order of first appearance."""
+        return self.data[column].dropna().unique().tolist()
+
+    def mask(self, spec):
+        return self.executor.spec_mask(spec)
+
+    def filter(self, spec):
+        return self.data[self.mask(spec)]
+
+    def page(self, spec, offset=0, limit=100):
+        """Rows offset to offset + limit (all the rest if limit is None) of the matching rows."""
+        # Only the rows of the page are copied out of the table
+        rows = np.flatnonzero(self.mask(spec))
+        return self.data.iloc[rows[offset:] if limit is None else rows[offset:offset + limit]]
+
+    def count(self, spec):
+        return int(self.mask(spec).sum())
+
+    def explain(self, spec):
+        return self.executor.explain(spec)
+
+    def facet(self, column, spec, limit=None):
+        """Count the values of column among the rows matching spec, most frequent first."""
+        if column not in self.data.columns:
+            raise KeyError(column)
+        counts = self.data[column][self.mask(spec)].value_counts()
+        # Categorical columns also report categories that have no matching rows
+        counts = counts[counts > 0]
+        if limit is not None:
+            counts = counts.head(limit)
+        return [(value, int(n)) for value, n in counts.items()]
+
+
+BACKENDS = ("pandas", "polars", "sqlite")
+
+
+def dataset_for(data, source=None, backend=None, index=None):
+    """Wrap an in-memory table with the configured in-memory backend."""
+    backend = backend or config.BACKEND
+    if backend == "polars":
+        from .polars_backend import PolarsDataset
+        return PolarsDataset(data, source=source)
+    return Dataset(data, source=source, index=index)
+
+
+def open_dataset(source, backend=None, progress=None):
+    """Open source with the configured query backend (config.BACKEND by default)."""
+    backend = backend or config.BACKEND
+    if backend in ("pandas", "polars"):
+        data = load_source(source, max_workers=config.INGEST_WORKERS, progress=progress)
+        index = None
+        if backend == "pandas" and config.INDEX:
+            from .index import load_or_build
+            index = load_or_build(expand_sources(source), data)
+        return dataset_for(data, source=source, backend=backend, index=index)
+    if backend == "sqlite":
+        from .sql import SQLiteDataset
+        return SQLiteDataset.open(source, progress=progress)
+    raise ValueError(f"Unknown backend: {backend!r}")
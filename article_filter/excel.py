@@ -0,0 +1,124 @@
+"""Reading Excel workbooks, as uploaded to the .xlsx variant of the app.
+
+The calamine engine (python-calamine) parses workbooks several times faster
+than openpyxl and without building an object per cell; it is used when it
+is installed. Otherwise pandas reads with openpyxl in read-only mode, which
+streams rows instead of loading the whole workbook model. Neither is
+imported until a workbook is read.
+
+A workbook read once is kept as a column store keyed by its content and the
+sheets read, so the same workbook uploaded again, from any session or
+process, is memory-mapped instead of parsed. Stores unused for longer than
+config.UPLOAD_TTL are deleted, and the least recently used ones beyond
+config.EXCEL_CACHE_MB.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from . import config
+from .colstore import MANIFEST, load_store
+from .fingerprint import file_fingerprint, upload_content_hash
+from .io import align_frames
+
+ENGINES = ("calamine", "openpyxl")
+
+
+def excel_engine(engine=None):
+    """The engine to read workbooks with: config.EXCEL_ENGINE, "auto" meaning calamine if installed."""
+    engine = engine or config.EXCEL_ENGINE
+    if engine != "auto":
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown Excel engine: {engine!r}")
+        return engine
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return "openpyxl"
+    return "calamine"
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def sheet_names(source, engine=None):
+    with pd.ExcelFile(_rewind(source), engine=excel_engine(engine)) as book:
+        return book.sheet_names
+
+
+def read_workbook(source, sheets=None, engine=None):
+    """Read sheets (default: the first one) of a workbook; rows of several sheets are concatenated."""
+    with pd.ExcelFile(_rewind(source), engine=excel_engine(engine)) as book:
+        frames = [book.parse(name) for name in sheets or book.sheet_names[:1]]
+    return align_frames(frames)
+
+
+def workbook_key(source, sheets, engine):
+    if isinstance(source, (str, os.PathLike)):
+        content = file_fingerprint(source)
+    elif hasattr(source, "file_id"):
+        content = upload_content_hash(source)
+    else:
+        content = hashlib.blake2b(_rewind(source).read(), digest_size=16).hexdigest()
+    # Engines may type some cells differently, so they do not share stores
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((content, list(sheets or []), engine)).encode())
+    return digest.hexdigest()
+
+
+def store_bytes(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def prune_stores(directory, max_bytes, ttl=None, keep=None):
+    """Delete stores unused for ttl seconds, then the least recently used beyond max_bytes.
+
+    A store's last use is the modification time of the directory, which
+    load_workbook touches on every read.
+    """
+    now = time.time()
+    stores = []
+    for entry in os.scandir(directory):
+        if not entry.is_dir() or entry.name == keep:
+            continue
+        try:
+            stores.append((entry.stat().st_mtime, entry.path, store_bytes(entry.path)))
+        except OSError:
+            continue
+    total = sum(nbytes for _, _, nbytes in stores)
+    if keep is not None and os.path.isdir(os.path.join(directory, keep)):
+        total += store_bytes(os.path.join(directory, keep))
+    for mtime, path, nbytes in sorted(stores):
+        # Half-written stores of other writers (".tmp-*") are only removed once stale
+        stale = ttl is not None and now - mtime > ttl
+        if stale or (total > max_bytes and MANIFEST in os.listdir(path)):
+            shutil.rmtree(path, ignore_errors=True)
+            total -= nbytes
+
+
+def load_workbook(source, sheets=None, engine=None):
+    """Read a workbook (path or uploaded file) through its column store in config.EXCEL_CACHE_DIR."""
+    engine = excel_engine(engine)
+    key = workbook_key(source, sheets, engine)
+    directory = config.EXCEL_CACHE_DIR or os.path.join(tempfile.gettempdir(), "article_filter-xlsx")
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return read_workbook(source, sheets, engine)
+    path = os.path.join(directory, key)
+    data = load_store(path, key, lambda: read_workbook(source, sheets, engine))
+    try:
+        if os.path.isdir(path):
+            os.utime(path)
+        prune_stores(directory, config.EXCEL_CACHE_MB * 2**20, ttl=config.UPLOAD_TTL, keep=key)
+    except OSError:
+        pass
+    return data
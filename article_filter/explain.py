@@ -0,0 +1,60 @@
+"""Query plans of FilterSpecs, and the log of slow queries.
+
+explain(dataset, spec) evaluates spec one predicate at a time, in the
+order the backends apply them, and reports for every step how it was
+answered (index lookup, scan, scan of the distinct keyword values,
+SQLite's plan), whether its mask came from the cache, and the rows going
+in and out. With SQLite and Polars a step's time is that of the query up
+to and including it.
+
+Queries slower than config.SLOW_QUERY_MS are appended with their plan to
+the JSON Lines file config.SLOW_QUERY_LOG, when set.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from . import config
+from .timing import append_log
+
+PLAN_COLUMNS = ("field", "value", "exact", "access", "cache", "rows_in", "rows_out", "ms")
+
+
+def explain(dataset, spec):
+    start = time.perf_counter()
+    steps = dataset.explain(spec)
+    return {
+        "backend": type(dataset).__name__,
+        "rows": len(dataset),
+        "spec": spec.to_dict(),
+        "steps": steps,
+        "rows_out": steps[-1]["rows_out"] if steps else len(dataset),
+        "ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def format_plan(plan):
+    """Plain-text table of a plan, for the command line."""
+    header = f"{plan['backend']}: {plan['rows']:,} rows -> {plan['rows_out']:,} rows in {plan['ms']:.2f} ms"
+    if not plan["steps"]:
+        return header + "\n  (no filters)"
+    rows = [PLAN_COLUMNS] + [tuple(str(step[c]) for c in PLAN_COLUMNS) for step in plan["steps"]]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(PLAN_COLUMNS))]
+    lines = ["  " + "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    return "\n".join([header] + lines)
+
+
+def log_slow_query(dataset, spec, seconds, plan=None, **fields):
+    """Log spec with its plan if it took at least config.SLOW_QUERY_MS; return whether it did."""
+    if not config.SLOW_QUERY_LOG or seconds * 1000 < config.SLOW_QUERY_MS:
+        return False
+    # Without the plan of the run itself, explaining again shows the cached state
+    plan = plan or explain(dataset, spec)
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        **fields,
+        "query_ms": round(seconds * 1000, 3),
+        "plan": plan,
+    }
+    append_log(config.SLOW_QUERY_LOG, record)
+    return True
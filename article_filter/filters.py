@@ -0,0 +1,150 @@
+"""Filter specification and the pandas filter pipeline used by the apps."""
+
+from dataclasses import asdict, dataclass, field, fields
+from typing import Optional
+
+import pandas as pd
+
+# Period of publication options (label -> inclusive year range)
+PERIOD_RANGES = {
+    "2007-2010": (2007, 2010),
+    "2011-2014": (2011, 2014),
+    "2015-2020": (2015, 2020),
+    "2021-2025": (2021, 2025),
+}
+
+# Citation options (label -> inclusive range, None means unbounded)
+CITATION_RANGES = {
+    "1 to 10 citations": (1, 10),
+    "11 to 24 citations": (11, 24),
+    "25 to 49 citations": (25, 49),
+    "50 to 99 citations": (50, 99),
+    "100 to 249 citations": (100, 249),
+    "250 or more citations": (250, None),
+}
+
+JCR_RANKS = ["No Q", "Q1", "Q2", "Q3", "Q4"]
+
+# "All" and "None" both mean "do not filter" in the selectboxes
+NO_FILTER = ("All", "None")
+
+PERIOD_OPTIONS = list(NO_FILTER) + list(PERIOD_RANGES)
+CITATION_OPTIONS = list(NO_FILTER) + list(CITATION_RANGES)
+JCR_OPTIONS = list(NO_FILTER) + JCR_RANKS
+
+YEAR_COLUMN = "Year"
+CITATIONS_COLUMN = "Cited by"
+KEYWORDS_COLUMN = "Keywords"
+JCR_COLUMN = "JCR rank"
+KNOWLEDGE_GROUP_COLUMN = "Knowledge area group"
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """A single active filter condition of a FilterSpec."""
+
+    field: str
+    value: str
+    exact: bool = False
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """The state of the sidebar filters, as selected in the app."""
+
+    period: str = "All"
+    citations: str = "All"
+    keywords: str = "All"
+    exact_match: bool = False
+    jcr: str = "All"
+    knowledge_group: str = "All"
+    name: Optional[str] = field(default=None, compare=False)
+
+    def __post_init__(self):
+        # Specs come from JSON and YAML files and HTTP bodies: "keywords: 2020"
+        # or "exact_match: 'false'" must not be taken for something else
+        for name in ("period", "citations", "keywords", "jcr", "knowledge_group"):
+            value = getattr(self, name)
+            if not isinstance(value, str):
+                raise ValueError(f"Filter field {name!r} must be a string, not {type(value).__name__}: {value!r}")
+        if not isinstance(self.exact_match, bool):
+            raise ValueError(f"Filter field 'exact_match' must be true or false, not {self.exact_match!r}")
+        if self.name is not None and not isinstance(self.name, str):
+            raise ValueError(f"Filter field 'name' must be a string, not {type(self.name).__name__}: {self.name!r}")
+        if self.period not in PERIOD_OPTIONS:
+            raise ValueError(f"Unknown period of publication: {self.period!r}")
+        if self.citations not in CITATION_OPTIONS:
+            raise ValueError(f"Unknown citations option: {self.citations!r}")
+        if self.jcr not in JCR_OPTIONS:
+            raise ValueError(f"Unknown JCR rank: {self.jcr!r}")
+
+    @classmethod
+    def from_dict(cls, values):
+        if not isinstance(values, dict):
+            raise ValueError(f"A filter spec must be an object of filter fields, not {type(values).__name__}")
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def is_default(self):
+        return not self.predicates()
+
+    def predicates(self):
+        """Return the active filter conditions, in the order the app applies them."""
+        active = []
+        if self.period not in NO_FILTER:
+            active.append(Predicate("period", self.period))
+        if self.citations not in NO_FILTER:
+            active.append(Predicate("citations", self.citations))
+        if self.keywords not in NO_FILTER:
+            active.append(Predicate("keywords", self.keywords, self.exact_match))
+        if self.jcr not in NO_FILTER:
+            active.append(Predicate("jcr", self.jcr))
+        if self.knowledge_group not in NO_FILTER:
+            active.append(Predicate("knowledge_group", self.knowledge_group))
+        return active
+
+
+def split_keywords(value):
+    return [kw.strip() for kw in value.split(",")]
+
+
+def predicate_mask(data, predicate):
+    """Evaluate one predicate over the whole frame as a boolean Series."""
+    if predicate.field == "period":
+        low, high = PERIOD_RANGES[predicate.value]
+        return (data[YEAR_COLUMN] >= low) & (data[YEAR_COLUMN] <= high)
+    if predicate.field == "citations":
+        low, high = CITATION_RANGES[predicate.value]
+        mask = data[CITATIONS_COLUMN] >= low
+        if high is not None:
+            mask &= data[CITATIONS_COLUMN] <= high
+        return mask
+    if predicate.field == "keywords":
+        keywords = split_keywords(predicate.value)
+        if predicate.exact:
+            return data[KEYWORDS_COLUMN].apply(
+                lambda x: all(kw in x.split(",") for kw in keywords) if pd.notna(x) else False
+            ).astype(bool)
+        return data[KEYWORDS_COLUMN].str.contains('|'.join(keywords), case=False, na=False).astype(bool)
+    if predicate.field == "jcr":
+        return data[JCR_COLUMN] == predicate.value
+    if predicate.field == "knowledge_group":
+        # The apps ignore this filter when the column is missing
+        if KNOWLEDGE_GROUP_COLUMN not in data.columns:
+            return pd.Series(True, index=data.index)
+        return data[KNOWLEDGE_GROUP_COLUMN] == predicate.value
+    raise ValueError(f"Unknown filter field: {predicate.field!r}")
+
+
+def apply_filters(data, spec):
+    """Return the rows of data selected by spec, in their original order."""
+    filtered_data = data
+    for predicate in spec.predicates():
+        filtered_data = filtered_data[predicate_mask(filtered_data, predicate)]
+    return filtered_data
@@ -0,0 +1,144 @@
+"""Cheap fingerprints of source files, uploads and frames.
+
+Used to invalidate files derived from the sources and as Streamlit cache keys.
+"""
+
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+SAMPLE_BYTES = 1 << 16
+SAMPLES = 3
+
+
+def file_fingerprint(path):
+    """Hash of a file's size, mtime and a few sampled blocks (start, middle, end)."""
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        for i in range(SAMPLES):
+            f.seek(max(0, (stat.st_size - SAMPLE_BYTES) * i // max(SAMPLES - 1, 1)))
+            digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def sources_fingerprint(paths):
+    """Fingerprint of a list of source files, sensitive to their order and names."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_fingerprint(path).encode())
+    return digest.hexdigest()
+
+
+def sample_blocks(buffer, digest):
+    size = len(buffer)
+    for i in range(SAMPLES):
+        start = max(0, (size - SAMPLE_BYTES) * i // max(SAMPLES - 1, 1))
+        digest.update(buffer[start:start + SAMPLE_BYTES])
+
+
+def upload_fingerprint(upload):
+    """Hash of an uploaded file's id, name, size and a few sampled blocks.
+
+    Streamlit's default cache key hashes the whole upload on every rerun.
+    """
+    buffer = upload.getbuffer()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{upload.file_id}:{upload.name}:{len(buffer)}".encode())
+    sample_blocks(buffer, digest)
+    buffer.release()
+    return digest.hexdigest()
+
+
+# Content hashes of recent uploads by file id, so each upload is hashed once;
+# shared by every session, hence the lock
+_content_digests = OrderedDict()
+_content_digests_lock = threading.Lock()
+CONTENT_DIGESTS = 256
+
+
+def upload_content_hash(upload):
+    """Hash of the full content of an uploaded file, whatever its name or id."""
+    key = (upload.file_id, upload.size)
+    with _content_digests_lock:
+        digest = _content_digests.get(key)
+        if digest is not None:
+            _content_digests.move_to_end(key)
+            return digest
+    # Hashed outside the lock: other sessions' lookups do not wait for it
+    buffer = upload.getbuffer()
+    digest = hashlib.blake2b(buffer, digest_size=16).hexdigest()
+    buffer.release()
+    with _content_digests_lock:
+        _content_digests[key] = digest
+        if len(_content_digests) > CONTENT_DIGESTS:
+            _content_digests.popitem(last=False)
+    return digest
+
+
+def uploads_fingerprint(uploads):
+    """Fingerprint of the contents of a list of uploaded files, sensitive to their order.
+
+    The same export uploaded by several sessions, under any name, gets the
+    same fingerprint.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for upload in uploads:
+        digest.update(upload_content_hash(upload).encode())
+    return digest.hexdigest()
+
+
+# Version ids of frames whose content is known, by id() of the live frame.
+# Kept out of DataFrame.attrs because pandas copies attrs to derived frames.
+_frame_versions = {}
+
+
+def stamp(data, version):
+    """Record version as the cache key of data; return data."""
+    key = id(data)
+
+    def forget(ref):
+        # The id may already belong to a newer frame with its own entry
+        entry = _frame_versions.get(key)
+        if entry is not None and entry[0] is ref:
+            _frame_versions.pop(key, None)
+
+    _frame_versions[key] = (weakref.ref(data, forget), version)
+    return data
+
+
+def frame_version(data):
+    entry = _frame_versions.get(id(data))
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+    return None
+
+
+def frame_fingerprint(data):
+    """Cache key of a DataFrame: its stamped version, else a hash of its schema and every row.
+
+    Unstamped frames, such as filtered results, are hashed in full: frames of
+    the same shape differing in a single row must not share cached results.
+    hash_pandas_object is vectorised, and cheap next to the work cached.
+    """
+    version = frame_version(data)
+    if version is not None:
+        return version
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((data.shape, list(data.columns), [str(t) for t in data.dtypes])).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# hash_funcs for st.cache_data / st.cache_resource: cache lookups cost the
+# same whatever the size of the uploads or frames passed in
+CACHE_HASH_FUNCS = {
+    "streamlit.runtime.uploaded_file_manager.UploadedFile": upload_fingerprint,
+    pd.DataFrame: frame_fingerprint,
+}
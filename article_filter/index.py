@@ -0,0 +1,389 @@
+"""Persistent index bundles for the filter predicates of a dataset.
+
+A bundle holds, for one loaded table:
+
+* keyword postings: the distinct Keywords values with a per-row code, and for
+  every comma separated token the sorted rows containing it;
+* bitmaps: one packed bitmap per JCR rank and knowledge area group value;
+* sorted permutations of Year and Cited by, answering ranges by bisection.
+
+It is written next to the data as ``<first data file>.idx``: a magic string,
+a format version, a JSON header (source fingerprint, row count, array
+layout, file size, checksum) and the raw arrays, 64-byte aligned so they
+can be memory-mapped without copying. A bundle whose version, fingerprint
+or row count does not match the current data is rebuilt.
+
+Opening a bundle checks its header and file size only; checksumming every
+array would read the whole file and cost most of what mapping it saves,
+so it is done on request (verify=True, ARTICLE_FILTER_INDEX_VERIFY).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .filters import (
+    CITATION_RANGES,
+    CITATIONS_COLUMN,
+    JCR_COLUMN,
+    KEYWORDS_COLUMN,
+    KNOWLEDGE_GROUP_COLUMN,
+    PERIOD_RANGES,
+    YEAR_COLUMN,
+    predicate_mask,
+    split_keywords,
+)
+from .fingerprint import sources_fingerprint
+
+MAGIC = b"AFIDX\x00\x00\x00"
+FORMAT_VERSION = 2
+ALIGN = 64
+PREAMBLE = struct.Struct("<8sII")
+
+RANGE_COLUMNS = {"period": YEAR_COLUMN, "citations": CITATIONS_COLUMN}
+BITMAP_COLUMNS = {"jcr": JCR_COLUMN, "knowledge_group": KNOWLEDGE_GROUP_COLUMN}
+
+
+class IndexBundleError(ValueError):
+    """An index bundle that is corrupt, stale or written by another format version."""
+
+
+def encode_strings(values):
+    data = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum([len(d) for d in data], out=offsets[1:])
+    return np.frombuffer(b"".join(data), dtype=np.uint8), offsets
+
+
+def decode_strings(data, offsets):
+    blob = data.tobytes()
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class DatasetIndex:
+    """Predicate indexes of one table, answering predicates with row masks."""
+
+    def __init__(self, arrays, n_rows, columns, fingerprint=None):
+        self.arrays = arrays
+        self.n_rows = n_rows
+        self.columns = columns
+        self.fingerprint = fingerprint
+        self._strings = {}
+        self._tokens = None
+
+    # Building
+
+    @classmethod
+    def build(cls, data, fingerprint=None):
+        arrays = {}
+        columns = list(data.columns)
+        if KEYWORDS_COLUMN in data.columns:
+            arrays.update(build_keyword_arrays(data[KEYWORDS_COLUMN]))
+        for field, column in BITMAP_COLUMNS.items():
+            if column in data.columns:
+                arrays.update(build_bitmaps(field, data[column]))
+        for field, column in RANGE_COLUMNS.items():
+            if column in data.columns and pd.api.types.is_numeric_dtype(data[column]):
+                arrays.update(build_permutation(field, data[column]))
+        return cls(arrays, len(data), columns, fingerprint)
+
+    # Queries
+
+    def strings(self, name):
+        if name not in self._strings:
+            self._strings[name] = decode_strings(self.arrays[f"{name}.data"], self.arrays[f"{name}.offsets"])
+        return self._strings[name]
+
+    def rows_to_mask(self, rows):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def mask(self, predicate):
+        """Row mask for predicate, or None when this index cannot answer it."""
+        if predicate.field in RANGE_COLUMNS:
+            return self.range_mask(predicate)
+        if predicate.field in BITMAP_COLUMNS:
+            return self.bitmap_mask(predicate)
+        if predicate.field == "keywords" and "keywords.codes" in self.arrays:
+            return self.keywords_mask(predicate)
+        return None
+
+    def range_mask(self, predicate):
+        if f"{predicate.field}.order" not in self.arrays:
+            return None
+        if predicate.field == "period":
+            low, high = PERIOD_RANGES[predicate.value]
+        else:
+            low, high = CITATION_RANGES[predicate.value]
+        values = self.arrays[f"{predicate.field}.sorted"]
+        start = np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return self.rows_to_mask(self.arrays[f"{predicate.field}.order"][start:stop])
+
+    def bitmap_mask(self, predicate):
+        if BITMAP_COLUMNS[predicate.field] not in self.columns:
+            # Same as the filters: a missing knowledge area group column is ignored
+            return np.ones(self.n_rows, dtype=bool) if predicate.field == "knowledge_group" else None
+        values = self.strings(f"{predicate.field}.values")
+        if predicate.value not in values:
+            return np.zeros(self.n_rows, dtype=bool)
+        bitmap = self.arrays[f"{predicate.field}.bitmaps"][values.index(predicate.value)]
+        return np.unpackbits(bitmap, count=self.n_rows).astype(bool)
+
+    def keywords_mask(self, predicate):
+        codes = self.arrays["keywords.codes"]
+        if predicate.exact:
+            return self.rows_to_mask(self.keyword_rows(split_keywords(predicate.value)))
+        values = pd.DataFrame({KEYWORDS_COLUMN: self.strings("keywords.values")})
+        value_mask = predicate_mask(values, predicate).to_numpy(dtype=bool)
+        # Code -1 marks rows without keywords, which never match
+        return np.append(value_mask, False)[codes]
+
+    def keyword_rows(self, keywords):
+        """Rows whose comma separated keywords contain every one of keywords."""
+        if self._tokens is None:
+            self._tokens = {token: i for i, token in enumerate(self.strings("keywords.tokens"))}
+        offsets = self.arrays["keywords.postings.offsets"]
+        postings = self.arrays["keywords.postings.rows"]
+        rows = None
+        for keyword in keywords:
+            i = self._tokens.get(keyword)
+            if i is None:
+                return np.empty(0, dtype=np.int64)
+            token_rows = postings[offsets[i]:offsets[i + 1]]
+            rows = token_rows if rows is None else np.intersect1d(rows, token_rows, assume_unique=True)
+        return rows
+
+    # Incremental updates
+
+    def extend(self, rows, fingerprint=None):
+        """Return a new index of this table with the DataFrame rows appended to it."""
+        if list(rows.columns) != self.columns:
+            raise IndexBundleError("Appended rows do not have the indexed columns")
+        tail = DatasetIndex.build(rows)
+        arrays = {}
+        if "keywords.codes" in self.arrays:
+            arrays.update(self.merge_keywords(tail))
+        for field in BITMAP_COLUMNS:
+            if f"{field}.bitmaps" in self.arrays:
+                arrays.update(self.merge_bitmaps(field, tail))
+        for field in RANGE_COLUMNS:
+            if f"{field}.order" in self.arrays:
+                if f"{field}.order" not in tail.arrays:
+                    raise IndexBundleError(f"Appended {RANGE_COLUMNS[field]} values are not numeric")
+                arrays.update(self.merge_permutation(field, tail))
+        return DatasetIndex(arrays, self.n_rows + tail.n_rows, self.columns, fingerprint)
+
+    def merge_keywords(self, tail):
+        lookup = {value: code for code, value in enumerate(self.strings("keywords.values"))}
+        remap = np.array([lookup.setdefault(v, len(lookup)) for v in tail.strings("keywords.values")] + [-1],
+                         dtype=np.int32)
+        codes = np.concatenate([self.arrays["keywords.codes"], remap[tail.arrays["keywords.codes"]]])
+
+        # Appended rows come after every existing row, so postings stay sorted
+        tail_offsets = tail.arrays["keywords.postings.offsets"]
+        tail_postings = tail.arrays["keywords.postings.rows"] + self.n_rows
+        tail_rows = {token: tail_postings[tail_offsets[i]:tail_offsets[i + 1]]
+                     for i, token in enumerate(tail.strings("keywords.tokens"))}
+        offsets = self.arrays["keywords.postings.offsets"]
+        old_postings = self.arrays["keywords.postings.rows"]
+        tokens, postings = [], []
+        for i, token in enumerate(self.strings("keywords.tokens")):
+            rows = old_postings[offsets[i]:offsets[i + 1]]
+            if token in tail_rows:
+                rows = np.concatenate([rows, tail_rows.pop(token)])
+            tokens.append(token)
+            postings.append(rows)
+        tokens += list(tail_rows)
+        postings += list(tail_rows.values())
+
+        value_data, value_offsets = encode_strings(list(lookup))
+        token_data, token_offsets = encode_strings(tokens)
+        posting_offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum([len(rows) for rows in postings], out=posting_offsets[1:])
+        return {
+            "keywords.codes": codes,
+            "keywords.values.data": value_data,
+            "keywords.values.offsets": value_offsets,
+            "keywords.tokens.data": token_data,
+            "keywords.tokens.offsets": token_offsets,
+            "keywords.postings.offsets": posting_offsets,
+            "keywords.postings.rows": np.concatenate(postings or [np.empty(0)]).astype(np.int64),
+        }
+
+    def merge_bitmaps(self, field, tail):
+        old_values = self.strings(f"{field}.values")
+        new_values = tail.strings(f"{field}.values")
+        values = old_values + [v for v in new_values if v not in old_values]
+        n_rows = self.n_rows + tail.n_rows
+        bitmaps = np.zeros((len(values), -(-n_rows // 8)), dtype=np.uint8)
+        for i, value in enumerate(values):
+            head = self.value_bits(field, old_values, value)
+            rows = tail.value_bits(field, new_values, value)
+            bitmaps[i] = np.packbits(np.concatenate([head, rows]))
+        data, offsets = encode_strings(values)
+        return {f"{field}.values.data": data, f"{field}.values.offsets": offsets, f"{field}.bitmaps": bitmaps}
+
+    def value_bits(self, field, values, value):
+        if value not in values:
+            return np.zeros(self.n_rows, dtype=np.uint8)
+        return np.unpackbits(self.arrays[f"{field}.bitmaps"][values.index(value)], count=self.n_rows)
+
+    def merge_permutation(self, field, tail):
+        values = np.concatenate([self.arrays[f"{field}.sorted"], tail.arrays[f"{field}.sorted"]])
+        order = np.concatenate([self.arrays[f"{field}.order"], tail.arrays[f"{field}.order"] + self.n_rows])
+        # A stable sort keeps existing rows ahead of appended ones among equal values
+        merged = np.argsort(values, kind="stable")
+        return {f"{field}.order": order[merged], f"{field}.sorted": values[merged]}
+
+    # Persistence
+
+    def save(self, path):
+        """Write the bundle to path atomically."""
+        layout, offset = {}, 0
+        for name, array in self.arrays.items():
+            array = np.ascontiguousarray(array)
+            self.arrays[name] = array
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // ALIGN) * ALIGN
+        checksum = hashlib.blake2b(digest_size=16)
+        for array in self.arrays.values():
+            checksum.update(array.data)
+        fields = {
+            "fingerprint": self.fingerprint,
+            "rows": self.n_rows,
+            "columns": self.columns,
+            "arrays": layout,
+            "size": 0,
+            "checksum": checksum.hexdigest(),
+        }
+        # The file size is part of the header whose length it depends on
+        while True:
+            header = json.dumps(fields).encode("utf-8")
+            data_start = -(-(PREAMBLE.size + len(header)) // ALIGN) * ALIGN
+            if fields["size"] == data_start + offset:
+                break
+            fields["size"] = data_start + offset
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, array in self.arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.data)
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, verify=None):
+        """Memory-map a bundle written by save(), checksumming its arrays if verify (default: config.INDEX_VERIFY)."""
+        if verify is None:
+            verify = config.INDEX_VERIFY
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < PREAMBLE.size:
+            raise IndexBundleError(f"Truncated index bundle: {path}")
+        magic, version, header_size = PREAMBLE.unpack_from(buffer)
+        if magic != MAGIC:
+            raise IndexBundleError(f"Not an index bundle: {path}")
+        if version != FORMAT_VERSION:
+            raise IndexBundleError(f"Index bundle format {version} is not {FORMAT_VERSION}: {path}")
+        header = json.loads(bytes(buffer[PREAMBLE.size:PREAMBLE.size + header_size]))
+        if header["size"] != len(buffer):
+            raise IndexBundleError(f"Index bundle of {len(buffer)} bytes instead of {header['size']}: {path}")
+        data_start = -(-(PREAMBLE.size + header_size) // ALIGN) * ALIGN
+        arrays = {}
+        checksum = hashlib.blake2b(digest_size=16)
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            start = data_start + spec["offset"]
+            if start + count * dtype.itemsize > len(buffer):
+                raise IndexBundleError(f"Truncated index bundle: {path}")
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(spec["shape"])
+            if verify:
+                checksum.update(array.data)
+            arrays[name] = array
+        if verify and checksum.hexdigest() != header["checksum"]:
+            raise IndexBundleError(f"Index bundle checksum mismatch: {path}")
+        return cls(arrays, header["rows"], header["columns"], header["fingerprint"])
+
+
+def build_keyword_arrays(column):
+    codes, values = pd.factorize(column)
+    # Only text values can match a keyword filter
+    is_text = np.array([isinstance(v, str) for v in values] + [False])
+    values = [v for v in values if isinstance(v, str)]
+    new_codes = np.cumsum(is_text) - 1
+    new_codes[~is_text] = -1
+    codes = new_codes[codes]
+    tokens = {}
+    for code, value in enumerate(values):
+        for token in set(value.split(",")):
+            tokens.setdefault(token, []).append(code)
+    # Rows of each token: the rows of every distinct value containing it
+    rows_by_code = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[rows_by_code], np.arange(len(values) + 1))
+    postings, offsets = [], [0]
+    for token_codes in tokens.values():
+        rows = np.sort(np.concatenate([rows_by_code[starts[c]:starts[c + 1]] for c in token_codes]))
+        postings.append(rows)
+        offsets.append(offsets[-1] + len(rows))
+    value_data, value_offsets = encode_strings(values)
+    token_data, token_offsets = encode_strings(list(tokens))
+    return {
+        "keywords.codes": codes.astype(np.int32),
+        "keywords.values.data": value_data,
+        "keywords.values.offsets": value_offsets,
+        "keywords.tokens.data": token_data,
+        "keywords.tokens.offsets": token_offsets,
+        "keywords.postings.offsets": np.array(offsets, dtype=np.int64),
+        "keywords.postings.rows": np.concatenate(postings or [np.empty(0)]).astype(np.int64),
+    }
+
+
+def build_bitmaps(field, column):
+    values = [v for v in column.dropna().unique().tolist() if isinstance(v, str)]
+    bitmaps = np.zeros((len(values), -(-len(column) // 8)), dtype=np.uint8)
+    for i, value in enumerate(values):
+        bitmaps[i] = np.packbits((column == value).to_numpy(dtype=bool))
+    data, offsets = encode_strings(values)
+    return {f"{field}.values.data": data, f"{field}.values.offsets": offsets, f"{field}.bitmaps": bitmaps}
+
+
+def build_permutation(field, column):
+    values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    order = np.argsort(values, kind="stable")
+    # NaN sorts last and never satisfies a range
+    order = order[~np.isnan(values[order])]
+    return {f"{field}.order": order.astype(np.int64), f"{field}.sorted": values[order]}
+
+
+def index_path(paths):
+    return f"{paths[0]}.idx"
+
+
+def load_or_build(paths, data, verify=None):
+    """Load the bundle for the data loaded from paths, rebuilding it if it is stale."""
+    path = index_path(paths)
+    fingerprint = sources_fingerprint(paths)
+    try:
+        index = DatasetIndex.load(path, verify=verify)
+        if index.fingerprint == fingerprint and index.n_rows == len(data):
+            return index
+    except (OSError, ValueError):
+        pass
+    index = DatasetIndex.build(data, fingerprint=fingerprint)
+    try:
+        index.save(path)
+    except OSError:
+        # A read-only data directory only costs the rebuild on the next start
+        pass
+    return index
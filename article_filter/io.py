@@ -0,0 +1,138 @@
+"""Reading article exports and writing filtered results."""
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+
+from . import config
+from .config import DEFAULT_FILE
+from .fingerprint import sources_fingerprint, stamp
+
+# Scopus exports as produced for the apps: Latin-1, semicolon separated
+CSV_ENCODING = "ISO-8859-1"
+CSV_SEPARATOR = ";"
+READ_OPTIONS = dict(encoding=CSV_ENCODING, sep=CSV_SEPARATOR, on_bad_lines='skip')
+
+
+def source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if hasattr(source, "size"):
+        return source.size
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer().nbytes
+    return 0
+
+
+def load_data(source, progress=None):
+    """Read a CSV export (path or file-like object) into a DataFrame.
+
+    Exports of config.CHUNKED_THRESHOLD_MB or more are parsed in chunks with
+    dtype compaction; progress(fraction_done, rows_read) is then called after
+    every chunk.
+    """
+    if source_size(source) >= config.CHUNKED_THRESHOLD_MB * 2**20:
+        from .chunked import read_chunked
+        return read_chunked(source, chunk_rows=config.CHUNK_ROWS, progress=progress, **READ_OPTIONS)
+    return pd.read_csv(source, **READ_OPTIONS)
+
+
+def expand_sources(source):
+    """Resolve a file, a directory of CSV files or a glob pattern to a sorted list of paths."""
+    source = str(source)
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.csv")))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return [source] if os.path.exists(source) else []
+
+
+def _read_payload(payload):
+    # Runs in a worker process: payload is a path or the raw bytes of an upload
+    if isinstance(payload, bytes):
+        payload = BytesIO(payload)
+    return load_data(payload)
+
+
+def _as_payload(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    # Uploaded files cannot be pickled to a worker, their bytes can
+    return source.getvalue() if hasattr(source, "getvalue") else source.read()
+
+
+def normalize_columns(data):
+    # Exports decoded as Latin-1 can carry a UTF-8 byte order mark in the first header
+    data.columns = [str(c).replace("\u00ef\u00bb\u00bf", "").strip() for c in data.columns]
+    return data
+
+
+def align_frames(frames):
+    """Concatenate frames whose column sets differ; missing columns are filled with NaN."""
+    frames = [normalize_columns(frame) for frame in frames]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True, join="outer", sort=False)
+
+
+def load_many(sources, max_workers=None, progress=None):
+    """Parse several exports (paths or uploaded files) concurrently into one table.
+
+    progress is only reported when a single large export is read.
+    """
+    if len(sources) == 1:
+        return align_frames([load_data(sources[0], progress=progress)])
+    payloads = [_as_payload(source) for source in sources]
+    if not payloads:
+        return pd.DataFrame()
+    if max_workers == 1:
+        frames = [_read_payload(payload) for payload in payloads]
+    else:
+        workers = min(len(payloads), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_read_payload, payloads))
+    return align_frames(frames)
+
+
+def load_paths(paths, max_workers=None, progress=None):
+    """Load export files through the shared memory-mapped column store when enabled."""
+    if not config.COLUMN_STORE:
+        data = load_many(paths, max_workers=max_workers, progress=progress)
+    else:
+        from .colstore import load_cached
+        data = load_cached(paths, lambda paths: load_many(paths, max_workers=max_workers, progress=progress))
+    # The sources' fingerprint doubles as the frame's cache key
+    return stamp(data, sources_fingerprint(paths))
+
+
+def load_source(source, max_workers=None, progress=None):
+    """Load a file, directory or glob pattern, several files being parsed in parallel."""
+    paths = expand_sources(source)
+    if not paths:
+        raise FileNotFoundError(f"No data files found for {source!r}")
+    return load_paths(paths, max_workers=max_workers, progress=progress)
+
+
+def convert_to_excel(df):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False)
+    return output.getvalue()
+
+
+def write_results(df, path):
+    """Write df to path, choosing the format from its extension."""
+    path = str(path)
+    if path.endswith(".xlsx"):
+        with open(path, "wb") as f:
+            f.write(convert_to_excel(df))
+    elif path.endswith(".json"):
+        df.to_json(path, orient="records", force_ascii=False)
+    elif path.endswith(".ndjson") or path.endswith(".jsonl"):
+        df.to_json(path, orient="records", lines=True, force_ascii=False)
+    else:
+        # Same dialect as the input so results can be loaded back into the apps
+        df.to_csv(path, index=False, sep=CSV_SEPARATOR, encoding=CSV_ENCODING, errors="replace")
@@ -0,0 +1,128 @@
+"""Where the memory of an app process goes.
+
+dataset_report breaks a Dataset down into its columns (deep
+memory_usage, so string contents are counted), its index arrays and its
+cached predicate masks. Deep column sizes walk every string, so
+column_sizes computes them once per Dataset: a Dataset's table does not
+change, and a new version of the data is a new Dataset. process_rss is the resident size of the whole
+process, against which those parts can be compared. AllocationTracer
+reports the lines that allocated the most memory during one script run,
+from tracemalloc snapshots taken at its start and end.
+"""
+
+import os
+import threading
+import tracemalloc
+import weakref
+
+
+def column_bytes(data):
+    """Deep bytes of each column of a DataFrame, and of its index under "(index)"."""
+    usage = data.memory_usage(index=True, deep=True)
+    return {("(index)" if name == "Index" else name): int(nbytes) for name, nbytes in usage.items()}
+
+
+_column_sizes = weakref.WeakKeyDictionary()
+_column_sizes_lock = threading.Lock()
+
+
+def column_sizes(dataset):
+    """column_bytes of a dataset's table, computed on first use and kept as long as the dataset."""
+    with _column_sizes_lock:
+        sizes = _column_sizes.get(dataset)
+    if sizes is None:
+        sizes = column_bytes(dataset.data)
+        with _column_sizes_lock:
+            # Another thread may have finished first: every caller shares its sizes
+            sizes = _column_sizes.setdefault(dataset, sizes)
+    return sizes
+
+
+def mask_cache_bytes(dataset):
+    executor = getattr(dataset, "executor", None)
+    if executor is None:
+        return 0
+    return executor.cache_bytes()
+
+
+def dataset_report(dataset):
+    """The parts of a Dataset as rows of part, name, dtype and bytes, largest first within each part."""
+    data = dataset.data
+    rows = [
+        {"part": "column", "name": name, "dtype": str(data[name].dtype) if name in data else "", "bytes": nbytes}
+        for name, nbytes in column_sizes(dataset).items()
+    ]
+    index = getattr(dataset, "index", None)
+    if index is not None:
+        rows += [
+            {"part": "index", "name": name, "dtype": str(array.dtype), "bytes": int(array.nbytes)}
+            for name, array in index.arrays.items()
+        ]
+    executor = getattr(dataset, "executor", None)
+    if executor is not None:
+        rows.append({
+            "part": "mask cache",
+            "name": f"{executor.cache_len()} masks",
+            "dtype": "bool",
+            "bytes": executor.cache_bytes(),
+        })
+    order = {"column": 0, "index": 1, "mask cache": 2}
+    rows.sort(key=lambda row: (order[row["part"]], -row["bytes"]))
+    return rows
+
+
+def process_rss(pid=None):
+    """Resident set size of a process (default: this one) in bytes, or None where it cannot be read."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    if pid is not None and pid != os.getpid():
+        return None
+    # Peak rather than current size; ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class AllocationTracer:
+    """Top allocations between start() and top(), by source line.
+
+    tracemalloc slows allocations down and is process-wide, so it is only
+    started on request, and allocations by other sessions running at the
+    same time are counted too.
+    """
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.before = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.before = tracemalloc.take_snapshot()
+        return self
+
+    def top(self, limit=10):
+        """Rows of location, size_diff, size, count_diff; the traced memory is in traced_bytes()."""
+        after = tracemalloc.take_snapshot()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(filters).compare_to(self.before.filter_traces(filters), "lineno")
+        return [
+            {
+                "location": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+            }
+            for stat in diff[:limit]
+        ]
+
+    @staticmethod
+    def traced_bytes():
+        current, peak = tracemalloc.get_traced_memory()
+        return {"current": current, "peak": peak}
@@ -0,0 +1,225 @@
+"""Prometheus metrics, kept in process and served as text on a local port.
+
+A small stdlib implementation of counters, gauges and histograms with
+labels, rendered in the Prometheus text exposition format. Gauges can be
+computed at scrape time from a function, which is how dataset sizes and
+active sessions are reported. The app starts serve_metrics() on
+config.METRICS_PORT; the HTTP query API answers GET /metrics itself.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .memory import process_rss
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        # A value that cannot be measured here (None) is left out, not written as "None"
+        lines += [
+            f"{name}{format_labels(labels)} {format_value(value)}"
+            for name, labels, value in self.samples()
+            if value is not None
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value set directly, or computed by function() at every scrape.
+
+    function returns a number, or a dict of label-value tuples to numbers;
+    None stands for no sample.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        if self.function is None:
+            return super().samples()
+        values = self.function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        for name, labels, (counts, total) in super().samples():
+            for bound, count in zip(self.buckets, counts):
+                samples.append((f"{name}_bucket", {**labels, "le": format_value(bound)}, count))
+            samples.append((f"{name}_sum", labels, total))
+            samples.append((f"{name}_count", labels, counts[-1]))
+        return samples
+
+
+class Registry:
+    """The metrics of a process; asking twice for a name returns the same metric."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, *args, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self.register(Gauge, name, documentation, labelnames, function=function)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+RERUNS = REGISTRY.counter("article_filter_reruns_total", "Runs of the app script or of its filters fragment.")
+STAGE_SECONDS = REGISTRY.histogram("article_filter_stage_seconds", "Duration of the stages of an app run.", ["stage"])
+CACHE_HITS = REGISTRY.counter("article_filter_cache_hits_total", "Lookups answered from a cache.", ["cache"])
+CACHE_MISSES = REGISTRY.counter("article_filter_cache_misses_total", "Lookups that had to compute.", ["cache"])
+DATASET_BYTES = REGISTRY.gauge("article_filter_dataset_bytes", "Memory held by loaded datasets.", ["dataset"])
+ACTIVE_SESSIONS = REGISTRY.gauge("article_filter_active_sessions", "Sessions with a run in the last 5 minutes.")
+COLUMN_BYTES = REGISTRY.gauge("article_filter_column_bytes", "Memory held by each column of a dataset.", ["dataset", "column"])
+CACHE_BYTES = REGISTRY.gauge("article_filter_cache_bytes", "Memory held by caches.", ["cache"])
+RESIDENT_BYTES = REGISTRY.gauge("article_filter_resident_bytes", "Resident set size of the process.", function=process_rss)
+QUERY_SECONDS = REGISTRY.histogram("article_filter_query_seconds", "Duration of HTTP API queries.", ["endpoint"])
+QUERIES_IN_FLIGHT = REGISTRY.gauge("article_filter_queries_in_flight", "HTTP API queries running or waiting for a slot.", ["endpoint"])
+
+
+class SessionTracker:
+    """Sessions seen within the last window seconds."""
+
+    def __init__(self, window=300):
+        self.window = window
+        self.last_seen = {}
+        self.lock = threading.Lock()
+
+    def touch(self, session_id):
+        with self.lock:
+            self.last_seen[session_id] = time.monotonic()
+
+    def active(self):
+        cutoff = time.monotonic() - self.window
+        with self.lock:
+            for session_id in [s for s, seen in self.last_seen.items() if seen < cutoff]:
+                del self.last_seen[session_id]
+            return len(self.last_seen)
+
+
+SESSIONS = SessionTracker()
+ACTIVE_SESSIONS.set_function(SESSIONS.active)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; return the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,160 @@
+"""Profiling one script run of an app, saved to disk for later inspection.
+
+Two profilers are available:
+
+* "cprofile": deterministic, every call is counted; the capture is a
+  .pstats file (python -m pstats, snakeviz);
+* "sample": the running thread's stack is sampled every few milliseconds,
+  with little overhead; the capture holds collapsed stacks, one
+  "frame;frame;frame count" line per stack, which flamegraph.pl and
+  speedscope read directly.
+
+Captures are named <time>-<label>.<ext> in config.PROFILE_DIR, which keeps
+the most recent config.PROFILE_KEEP of them.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from . import config
+
+MODES = {"cprofile": ".pstats", "sample": ".collapsed"}
+SAMPLE_INTERVAL = 0.005
+
+
+def profile_dir():
+    return config.PROFILE_DIR or os.path.join(tempfile.gettempdir(), "article_filter-profiles")
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="stack sampler", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RunProfiler:
+    """Profiles the calling thread from start() to stop(), which saves the capture."""
+
+    def __init__(self, mode, label="run"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiler: {mode!r} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.label = re.sub(r"[^\w-]", "_", label)
+        self.profiler = None
+        self.started = None
+
+    def start(self):
+        self.started = datetime.now()
+        if self.mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+                return self
+            except ValueError:
+                # Python 3.12+ allows a single cProfile per process: another
+                # session is being profiled, so this run is sampled instead
+                self.mode = "sample"
+        self.profiler = StackSampler(threading.get_ident())
+        self.profiler.start()
+        return self
+
+    def stop(self):
+        """Stop profiling; return the path of the capture."""
+        if self.mode == "cprofile":
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        name = f"{self.started:%Y%m%d-%H%M%S-%f}-{self.label}{MODES[self.mode]}"
+        path = os.path.join(directory, name)
+        if self.mode == "cprofile":
+            self.profiler.dump_stats(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.profiler.collapsed())
+        prune(directory, config.PROFILE_KEEP)
+        return path
+
+
+def captures(directory=None, limit=None):
+    """Saved captures, most recent first, as dicts of name, path, profiler, bytes and time."""
+    directory = directory or profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    extensions = {ext: mode for mode, ext in MODES.items()}
+    found = []
+    for entry in os.scandir(directory):
+        mode = extensions.get(os.path.splitext(entry.name)[1])
+        if mode is not None and entry.is_file():
+            stat = entry.stat()
+            found.append({
+                "name": entry.name,
+                "path": entry.path,
+                "profiler": mode,
+                "bytes": stat.st_size,
+                "time": datetime.fromtimestamp(stat.st_mtime),
+            })
+    found.sort(key=lambda capture: capture["time"], reverse=True)
+    return found[:limit]
+
+
+def prune(directory, keep):
+    for capture in captures(directory)[keep:]:
+        try:
+            os.remove(capture["path"])
+        except OSError:
+            pass
+
+
+def top_functions(path, limit=20):
+    """The functions of a .pstats capture with the most cumulative time, as dicts."""
+    stats = pstats.Stats(path)
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "own_s": round(own, 6),
+            "cumulative_s": round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+    return rows[:limit]
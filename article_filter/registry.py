@@ -0,0 +1,249 @@
+"""Uploaded datasets kept within a memory budget.
+
+Streamlit's cache keeps every upload until the server restarts.
+DatasetRegistry accounts the bytes of each dataset it holds and, when the
+total exceeds the budget, spills the least recently used ones to column
+stores on disk. A spilled dataset is memory-mapped back on its next use,
+which costs far less than parsing the upload again. Datasets not used for
+longer than the TTL are dropped, from memory and from disk.
+
+Keys are content hashes, so sessions uploading the same export share one
+parsed and indexed dataset.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from . import config
+from .colstore import UnsupportedColumn, open_store, write_store
+from .dataset import Dataset, dataset_for
+from .index import DatasetIndex
+from .memory import column_sizes
+
+
+def dataset_bytes(dataset):
+    """Bytes held by a dataset's table and index."""
+    nbytes = sum(column_sizes(dataset).values())
+    index = getattr(dataset, "index", None)
+    if index is not None:
+        nbytes += sum(array.nbytes for array in index.arrays.values())
+    return nbytes
+
+
+class Entry:
+
+    def __init__(self, dataset, nbytes):
+        self.dataset = dataset
+        self.nbytes = nbytes
+        self.last_used = time.monotonic()
+        self.on_disk = False
+        # The dataset wrapped for other in-memory backends, by backend
+        self.views = {}
+
+    @property
+    def spilled(self):
+        return self.dataset is None
+
+
+class DatasetRegistry:
+    """Datasets by key, at most budget bytes in memory, the rest spilled to spill_dir.
+
+    Datasets reopened from disk are memory-mapped: their pages belong to the
+    OS page cache and do not count against the budget.
+    """
+
+    def __init__(self, budget, ttl=None, spill_dir=None):
+        self.budget = budget
+        self.ttl = ttl
+        # One directory per process: app processes on a host do not share registries
+        base = spill_dir or os.path.join(tempfile.gettempdir(), "article_filter-spill")
+        self.spill_dir = os.path.join(base, str(os.getpid()))
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+        self.reloads = 0
+        # Left over by an earlier process with the same pid; unreachable now
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    @classmethod
+    def from_config(cls):
+        return cls(int(config.UPLOAD_MEMORY_MB * 2**20), ttl=config.UPLOAD_TTL, spill_dir=config.SPILL_DIR)
+
+    @property
+    def memory_bytes(self):
+        # Also read by the metrics thread while sessions change the entries
+        with self.lock:
+            return sum(entry.nbytes for entry in self.entries.values() if not entry.spilled)
+
+    def spill_path(self, key):
+        return os.path.join(self.spill_dir, key)
+
+    def get(self, key):
+        """The dataset registered under key, reopened from disk if it was spilled, or None."""
+        with self.lock:
+            self.expire()
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.spilled:
+                if not self.reopen(key, entry):
+                    # Its spill files are gone: the caller loads it from source again
+                    self.misses += 1
+                    return None
+                self.reloads += 1
+            self.hits += 1
+            self.entries.move_to_end(key)
+            entry.last_used = time.monotonic()
+            return entry.dataset
+
+    def put(self, key, dataset):
+        """Register dataset under key and return it (memory-mapped if over budget on its own)."""
+        with self.lock:
+            self.discard(key)
+            entry = self.entries[key] = Entry(dataset, dataset_bytes(dataset))
+            self.evict(keep=key)
+            # Served from memory, unregistered, if it could not be mapped back
+            return entry.dataset if entry.dataset is not None else dataset
+
+    def get_or_load(self, key, load, backend=None):
+        """The dataset under key, or the indexed Dataset of the table load() returns.
+
+        Sessions asking for the same key at once wait for a single load. With
+        another backend than pandas (default: config.BACKEND) the dataset is
+        wrapped for it once and the wrapper kept with the entry.
+        """
+        with self.lock:
+            # [lock, sessions using it]: the lock is dropped when the last one is done
+            loading = self.loading.setdefault(key, [threading.Lock(), 0])
+            loading[1] += 1
+            key_lock = loading[0]
+        try:
+            # Parsing holds only this key's lock so other keys are not held up
+            with key_lock:
+                dataset = self.get(key)
+                if dataset is None:
+                    data = load()
+                    if data.empty:
+                        return dataset_for(data, source=key, backend=backend)
+                    index = DatasetIndex.build(data, fingerprint=key) if config.INDEX else None
+                    dataset = self.put(key, Dataset(data, source=key, index=index))
+                return self.view(key, dataset, backend)
+        finally:
+            with self.lock:
+                loading[1] -= 1
+                if not loading[1]:
+                    del self.loading[key]
+
+    def view(self, key, dataset, backend=None):
+        backend = backend or config.BACKEND
+        if backend != "polars":
+            # The pandas backend queries the registered Dataset itself
+            return dataset
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.dataset is not dataset:
+                entry = None
+            view = entry.views.get(backend) if entry is not None else None
+        if view is None:
+            # Converted outside the registry lock, which other keys need meanwhile
+            view = dataset_for(dataset.data, source=key, backend=backend)
+            if entry is not None:
+                with self.lock:
+                    view = entry.views.setdefault(backend, view)
+        return view
+
+    def expire(self):
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        for key in [k for k, entry in self.entries.items() if now - entry.last_used > self.ttl]:
+            self.discard(key)
+
+    def evict(self, keep=None):
+        """Spill least recently used datasets until the budget is respected."""
+        for key, entry in list(self.entries.items()):
+            if self.memory_bytes <= self.budget:
+                return
+            if key != keep and entry.nbytes and not entry.spilled:
+                self.spill(key, entry)
+        # A single dataset larger than the budget is served memory-mapped
+        entry = self.entries.get(keep)
+        if entry is not None and self.memory_bytes > self.budget and self.spill(keep, entry):
+            self.reopen(keep, entry)
+
+    def spill(self, key, entry):
+        if not entry.on_disk:
+            path = self.spill_path(key)
+            try:
+                os.makedirs(path, exist_ok=True)
+                write_store(entry.dataset.data, os.path.join(path, "data"), key)
+                if entry.dataset.index is not None:
+                    entry.dataset.index.save(os.path.join(path, "index"))
+            except (OSError, UnsupportedColumn):
+                # Without room on disk (or with a column that cannot be stored)
+                # the dataset is dropped and parsed again if needed
+                self.discard(key)
+                return False
+            entry.on_disk = True
+        entry.dataset = None
+        entry.views = {}
+        self.spills += 1
+        return True
+
+    def reopen(self, key, entry):
+        """Map a spilled dataset back; drop its entry and return False if its files are gone."""
+        path = self.spill_path(key)
+        try:
+            data = open_store(os.path.join(path, "data"))
+            index = None
+            if os.path.exists(os.path.join(path, "index")):
+                index = DatasetIndex.load(os.path.join(path, "index"))
+        except (OSError, ValueError):
+            # Removed by a temp directory cleanup, or damaged (IndexBundleError)
+            self.discard(key)
+            return False
+        entry.dataset = Dataset(data, source=key, index=index)
+        entry.views = {}
+        entry.nbytes = 0
+        return True
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None and entry.on_disk:
+            shutil.rmtree(self.spill_path(key), ignore_errors=True)
+
+    def report(self):
+        """One row per dataset: key, rows, bytes in memory and where it is held."""
+        now = time.monotonic()
+        with self.lock:
+            return [
+                {
+                    "key": key[:12],
+                    "rows": None if entry.spilled else len(entry.dataset),
+                    "bytes": entry.nbytes,
+                    "state": "spilled" if entry.spilled else "mapped" if entry.on_disk and not entry.nbytes else "memory",
+                    "idle_s": round(now - entry.last_used, 1),
+                }
+                for key, entry in self.entries.items()
+            ]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "datasets": len(self.entries),
+                "in_memory": sum(bool(entry.nbytes) and not entry.spilled for entry in self.entries.values()),
+                "memory_bytes": self.memory_bytes,
+                "budget_bytes": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "spills": self.spills,
+                "reloads": self.reloads,
+            }
@@ -0,0 +1,252 @@
+"""Local HTTP/JSON query API over a shared Dataset, built on asyncio streams.
+
+Endpoints (request bodies are JSON objects, "spec" holds FilterSpec fields):
+
+    GET  /health                      dataset size and columns
+    GET  /metrics                     Prometheus metrics of the process
+    POST /count   {"spec"}            {"count": n}
+    POST /filter  {"spec", "offset", "limit", "columns"}
+                                      matching rows streamed as NDJSON
+    POST /facet   {"spec", "column", "limit"}
+                                      [{"value": v, "count": n}, ...]
+    POST /export  {"spec", "format"}  csv or xlsx download of the matching rows
+
+Query execution runs in worker threads and at most max_concurrency queries
+run at once; further requests wait for a free slot.
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from . import metrics
+from .explain import log_slow_query
+from .filters import FilterSpec
+from .io import CSV_ENCODING, CSV_SEPARATOR, convert_to_excel
+
+NDJSON_BATCH_ROWS = 1000
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+EXPORT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def json_default(value):
+    # numpy scalars and pandas missing values found in facet results
+    if hasattr(value, "item"):
+        return value.item()
+    return None
+
+
+def dumps(value):
+    return json.dumps(value, default=json_default, ensure_ascii=False)
+
+
+def to_csv(rows):
+    return rows.to_csv(index=False, sep=CSV_SEPARATOR).encode(CSV_ENCODING, errors="replace")
+
+
+def non_negative(body, name, default=None):
+    value = body.get(name, default)
+    if value is None:
+        return None
+    value = int(value)
+    if value < 0:
+        raise HTTPError(400, f"'{name}' must not be negative")
+    return value
+
+
+class QueryServer:
+    def __init__(self, dataset, max_concurrency=4):
+        self.dataset = dataset
+        self.slots = asyncio.Semaphore(max_concurrency)
+        # Connections whose response headers are sent: an error can no longer be reported on them
+        self.responding = set()
+
+    async def run_query(self, endpoint, func, *args):
+        # Every job run in a query slot, including export conversions, counts as in flight
+        metrics.QUERIES_IN_FLIGHT.inc(endpoint=endpoint)
+        try:
+            async with self.slots:
+                return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+        finally:
+            metrics.QUERIES_IN_FLIGHT.dec(endpoint=endpoint)
+
+    async def run_spec_query(self, endpoint, spec, func, *args):
+        start = time.perf_counter()
+        result = await self.run_query(endpoint, func, *args)
+        # The time includes waiting for a free slot, as the client saw it;
+        # explaining a slow query runs outside the query slots
+        elapsed = time.perf_counter() - start
+        metrics.QUERY_SECONDS.observe(elapsed, endpoint=endpoint)
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: log_slow_query(self.dataset, spec, elapsed, endpoint=endpoint)
+        )
+        return result
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, path, body = await self.read_request(reader)
+                await self.dispatch(method, path, body, writer)
+            except HTTPError as e:
+                await self.send_error(writer, e.status, str(e))
+            except (KeyError, ValueError, TypeError) as e:
+                await self.send_error(writer, 400, str(e))
+            except Exception as e:
+                await self.send_error(writer, 500, repr(e))
+        except ConnectionError:
+            pass
+        finally:
+            self.responding.discard(writer)
+            writer.close()
+
+    async def send_error(self, writer, status, message):
+        # Once a streamed response has started, closing the connection without
+        # the final chunk is the only way left to tell the client it failed
+        if writer not in self.responding:
+            await self.send_json(writer, {"error": message}, status=status)
+
+    async def read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = json.loads(await reader.readexactly(length)) if length else {}
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return method, urlsplit(target).path, body
+
+    async def dispatch(self, method, path, body, writer):
+        if path == "/health":
+            await self.send_json(writer, {"rows": len(self.dataset), "columns": self.dataset.columns})
+            return
+        if path == "/metrics":
+            await self.send_body(writer, 200, metrics.CONTENT_TYPE, metrics.REGISTRY.render().encode("utf-8"))
+            return
+        handler = {
+            "/count": self.count,
+            "/filter": self.filter,
+            "/facet": self.facet,
+            "/export": self.export,
+        }.get(path)
+        if handler is None:
+            raise HTTPError(404, f"No such endpoint: {path}")
+        if method != "POST":
+            raise HTTPError(405, f"{path} expects POST")
+        spec = FilterSpec.from_dict(body.get("spec", {}))
+        await handler(spec, body, writer)
+
+    async def count(self, spec, body, writer):
+        count = await self.run_spec_query("/count", spec, self.dataset.count, spec)
+        await self.send_json(writer, {"count": count})
+
+    async def facet(self, spec, body, writer):
+        if "column" not in body:
+            raise HTTPError(400, "facet expects a 'column'")
+        values = await self.run_spec_query("/facet", spec, self.dataset.facet, body["column"], spec, body.get("limit"))
+        await self.send_json(writer, [{"value": v, "count": n} for v, n in values])
+
+    async def filter(self, spec, body, writer):
+        offset = non_negative(body, "offset", 0)
+        limit = non_negative(body, "limit")
+        columns = self.known_columns(body.get("columns"))
+        # Only the requested page is read, from disk with the SQLite backend
+        rows = await self.run_spec_query("/filter", spec, self.dataset.page, spec, offset, limit)
+        if columns:
+            rows = rows[columns]
+        await self.send_headers(writer, 200, "application/x-ndjson", chunked=True)
+        for start in range(0, len(rows), NDJSON_BATCH_ROWS):
+            batch = rows.iloc[start:start + NDJSON_BATCH_ROWS]
+            lines = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: batch.to_json(orient="records", lines=True, force_ascii=False)
+            )
+            await self.send_chunk(writer, (lines.rstrip("\n") + "\n").encode("utf-8"))
+        await self.send_chunk(writer, b"")
+
+    def known_columns(self, columns):
+        if columns is None:
+            return None
+        if not isinstance(columns, list) or not all(isinstance(name, str) for name in columns):
+            raise HTTPError(400, "'columns' must be a list of column names")
+        unknown = [name for name in columns if name not in self.dataset.columns]
+        if unknown:
+            raise HTTPError(400, f"Unknown columns: {', '.join(unknown)}")
+        return columns
+
+    async def export(self, spec, body, writer):
+        fmt = body.get("format", "csv")
+        if fmt not in EXPORT_TYPES:
+            raise HTTPError(400, f"Unknown export format: {fmt}")
+        rows = await self.run_spec_query("/export", spec, self.dataset.filter, spec)
+        if fmt == "xlsx":
+            payload = await self.run_query("/export", convert_to_excel, rows)
+        else:
+            payload = await self.run_query("/export", to_csv, rows)
+        extra = {"Content-Disposition": f'attachment; filename="filtered_data.{fmt}"'}
+        await self.send_body(writer, 200, EXPORT_TYPES[fmt], payload, extra)
+
+    async def send_headers(self, writer, status, content_type, length=None, chunked=False, extra=None):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}", f"Content-Type: {content_type}", "Connection: close"]
+        if chunked:
+            lines.append("Transfer-Encoding: chunked")
+        elif length is not None:
+            lines.append(f"Content-Length: {length}")
+        lines += [f"{name}: {value}" for name, value in (extra or {}).items()]
+        self.responding.add(writer)
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def send_chunk(self, writer, data):
+        writer.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        await writer.drain()
+
+    async def send_body(self, writer, status, content_type, payload, extra=None):
+        await self.send_headers(writer, status, content_type, length=len(payload), extra=extra)
+        writer.write(payload)
+        await writer.drain()
+
+    async def send_json(self, writer, value, status=200):
+        await self.send_body(writer, status, "application/json", dumps(value).encode("utf-8"))
+
+
+async def serve_forever(dataset, host="127.0.0.1", port=8765, max_concurrency=4):
+    server = QueryServer(dataset, max_concurrency=max_concurrency)
+    async with await asyncio.start_server(server.handle, host, port) as listener:
+        print(f"Serving {len(dataset)} articles on http://{host}:{port}")
+        await listener.serve_forever()
+
+
+def serve(dataset, host="127.0.0.1", port=8765, max_concurrency=4):
+    try:
+        asyncio.run(serve_forever(dataset, host, port, max_concurrency))
+    except KeyboardInterrupt:
+        pass
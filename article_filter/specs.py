@@ -0,0 +1,38 @@
+"""Loading filter specs from JSON or YAML files."""
+
+import json
+import os
+
+from .filters import FilterSpec
+
+
+def parse_specs(document, default_name=None):
+    """Turn a decoded spec document (one spec, a list, or {"specs": [...]}) into FilterSpecs."""
+    if isinstance(document, dict) and "specs" in document:
+        document = document["specs"]
+    if isinstance(document, dict):
+        document = [document]
+    if not isinstance(document, list):
+        raise ValueError("A spec document must be an object or a list of objects")
+    specs = []
+    for i, values in enumerate(document):
+        if not isinstance(values, dict):
+            raise ValueError(f"Spec {i + 1} is not an object: {values!r}")
+        values = dict(values)
+        if not values.get("name") and default_name:
+            values["name"] = default_name if len(document) == 1 else f"{default_name}-{i + 1}"
+        specs.append(FilterSpec.from_dict(values))
+    return specs
+
+
+def load_spec_file(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        # PyYAML is only needed when YAML specs are actually used
+        import yaml
+        document = yaml.safe_load(text)
+    else:
+        document = json.loads(text)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return parse_specs(document, default_name=stem)
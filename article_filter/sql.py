@@ -0,0 +1,275 @@
+"""Out-of-core backend: the dataset lives in an on-disk SQLite file.
+
+CSV exports are ingested chunk by chunk into a table, so the corpus never
+has to fit in memory. Filter specs are compiled to a WHERE clause and only
+counts, facets or the requested page of rows are brought back into pandas.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: ingests are still atomic, but not serialised
+    fcntl = None
+
+import pandas as pd
+
+from . import config
+from .filters import (
+    CITATION_RANGES,
+    CITATIONS_COLUMN,
+    JCR_COLUMN,
+    KEYWORDS_COLUMN,
+    KNOWLEDGE_GROUP_COLUMN,
+    PERIOD_RANGES,
+    YEAR_COLUMN,
+    split_keywords,
+)
+from .io import READ_OPTIONS, expand_sources, normalize_columns
+
+TABLE = "articles"
+INDEXED_COLUMNS = [YEAR_COLUMN, CITATIONS_COLUMN, JCR_COLUMN, KNOWLEDGE_GROUP_COLUMN]
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def keywords_contain(value, pattern):
+    # Same semantics as Series.str.contains(pattern, case=False, na=False)
+    return isinstance(value, str) and re.search(pattern, value, re.IGNORECASE) is not None
+
+
+def keywords_all(value, keywords):
+    # Same semantics as the exact match lambda of the apps
+    return isinstance(value, str) and all(kw in value.split(",") for kw in keywords.split("\x1f"))
+
+
+def connect(db_path):
+    con = sqlite3.connect(db_path, check_same_thread=False)
+    con.create_function("kw_contains", 2, keywords_contain, deterministic=True)
+    con.create_function("kw_all", 2, keywords_all, deterministic=True)
+    return con
+
+
+def source_signature(paths):
+    return ";".join(f"{os.path.abspath(p)}:{os.path.getsize(p)}:{os.stat(p).st_mtime_ns}" for p in paths)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if needed) across processes."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def table_columns(con):
+    return [row[1] for row in con.execute(f"PRAGMA table_info({TABLE})")]
+
+
+def ingest(source, db_path, chunk_rows=None, progress=None):
+    """Load the CSV exports of source into a fresh articles table in db_path.
+
+    The database is built in a temporary file and moved over db_path when
+    complete, so readers never see a half-built one.
+    """
+    paths = expand_sources(source)
+    if not paths:
+        raise FileNotFoundError(f"No data files found for {source!r}")
+    chunk_rows = chunk_rows or config.CHUNK_ROWS
+    total_bytes = sum(os.path.getsize(p) for p in paths) or 1
+    tmp_path = f"{db_path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = connect(tmp_path)
+    try:
+        fill(con, paths, chunk_rows, total_bytes, progress)
+    except BaseException:
+        con.close()
+        os.remove(tmp_path)
+        raise
+    con.close()
+    os.replace(tmp_path, db_path)
+    return connect(db_path)
+
+
+def fill(con, paths, chunk_rows, total_bytes, progress):
+    """Append the chunks of every file to the articles table of con, then index it."""
+    done_bytes = 0
+    rows = 0
+    with con:
+        for path in paths:
+            for chunk in pd.read_csv(path, chunksize=chunk_rows, **READ_OPTIONS):
+                chunk = normalize_columns(chunk)
+                existing = table_columns(con)
+                for name in chunk.columns:
+                    if existing and name not in existing:
+                        # Files with extra columns: widen the table, earlier rows get NULL
+                        con.execute(f"ALTER TABLE {TABLE} ADD COLUMN {quote(name)}")
+                chunk.to_sql(TABLE, con, if_exists="append", index=False)
+                rows += len(chunk)
+            done_bytes += os.path.getsize(path)
+            if progress is not None:
+                progress(done_bytes / total_bytes, rows)
+        columns = table_columns(con)
+        for name in INDEXED_COLUMNS:
+            if name in columns:
+                con.execute(f"CREATE INDEX IF NOT EXISTS {quote('idx_' + name)} ON {TABLE} ({quote(name)})")
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.execute("INSERT INTO meta VALUES ('source', ?)", (source_signature(paths),))
+
+
+def is_current(db_path, source):
+    """True when db_path was ingested from the current contents of source."""
+    if not os.path.exists(db_path):
+        return False
+    try:
+        con = sqlite3.connect(db_path)
+        row = con.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        con.close()
+    except sqlite3.DatabaseError:
+        return False
+    return row is not None and row[0] == source_signature(expand_sources(source))
+
+
+def compile_spec(spec, columns):
+    """Translate a FilterSpec into a SQL WHERE clause and its parameters."""
+    return compile_predicates(spec.predicates(), columns)
+
+
+def compile_predicates(predicates, columns):
+    clauses, params = [], []
+    for predicate in predicates:
+        if predicate.field == "period":
+            clauses.append(f"{quote(YEAR_COLUMN)} BETWEEN ? AND ?")
+            params += PERIOD_RANGES[predicate.value]
+        elif predicate.field == "citations":
+            low, high = CITATION_RANGES[predicate.value]
+            clauses.append(f"{quote(CITATIONS_COLUMN)} >= ?")
+            params.append(low)
+            if high is not None:
+                clauses.append(f"{quote(CITATIONS_COLUMN)} <= ?")
+                params.append(high)
+        elif predicate.field == "keywords":
+            keywords = split_keywords(predicate.value)
+            if predicate.exact:
+                clauses.append(f"kw_all({quote(KEYWORDS_COLUMN)}, ?)")
+                params.append("\x1f".join(keywords))
+            else:
+                clauses.append(f"kw_contains({quote(KEYWORDS_COLUMN)}, ?)")
+                params.append("|".join(keywords))
+        elif predicate.field == "jcr":
+            clauses.append(f"{quote(JCR_COLUMN)} = ?")
+            params.append(predicate.value)
+        elif predicate.field == "knowledge_group" and KNOWLEDGE_GROUP_COLUMN in columns:
+            clauses.append(f"{quote(KNOWLEDGE_GROUP_COLUMN)} = ?")
+            params.append(predicate.value)
+    where = " AND ".join(clauses) if clauses else "1"
+    return where, params
+
+
+class SQLiteDataset:
+    """Query interface of Dataset, answered by SQLite instead of an in-memory frame."""
+
+    def __init__(self, db_path, source=None):
+        self.db_path = db_path
+        self.source = source
+        self.con = connect(db_path)
+        self.lock = threading.Lock()
+        self.columns = table_columns(self.con)
+
+    @classmethod
+    def open(cls, source, db_path=None, progress=None):
+        """Open the database for source, ingesting it first if it is missing or stale."""
+        db_path = db_path or config.SQLITE_PATH or f"{expand_sources(source)[0]}.sqlite"
+        if not is_current(db_path, source):
+            # Workers starting together (or "warm" and the app) ingest only once:
+            # the others wait for the lock, then find the database current
+            with file_lock(f"{db_path}.lock"):
+                if not is_current(db_path, source):
+                    ingest(source, db_path, progress=progress).close()
+        return cls(db_path, source=source)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        return self.scalar(f"SELECT COUNT(*) FROM {TABLE}")
+
+    def scalar(self, sql, params=()):
+        with self.lock:
+            return self.con.execute(sql, params).fetchone()[0]
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return pd.read_sql_query(sql, self.con, params=params)
+
+    def count(self, spec):
+        where, params = compile_spec(spec, self.columns)
+        return self.scalar(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params)
+
+    def explain(self, spec):
+        """Count the rows left after each predicate, with SQLite's plan for that query."""
+        steps = []
+        rows = len(self)
+        predicates = spec.predicates()
+        for i, predicate in enumerate(predicates):
+            where, params = compile_predicates(predicates[:i + 1], self.columns)
+            sql = f"SELECT COUNT(*) FROM {TABLE} WHERE {where}"
+            with self.lock:
+                plan = self.con.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            start = time.perf_counter()
+            rows_out = self.scalar(sql, params)
+            steps.append({
+                "field": predicate.field,
+                "value": predicate.value,
+                "exact": predicate.exact,
+                # Rows of EXPLAIN QUERY PLAN end with their detail, e.g. "SCAN articles"
+                "access": "; ".join(row[-1] for row in plan),
+                "cache": "none",
+                "rows_in": rows,
+                "rows_out": rows_out,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+            rows = rows_out
+        return steps
+
+    def page(self, spec, offset=0, limit=100):
+        where, params = compile_spec(spec, self.columns)
+        # LIMIT -1: no limit
+        return self.query(f"SELECT * FROM {TABLE} WHERE {where} ORDER BY rowid LIMIT ? OFFSET ?",
+                          params + [-1 if limit is None else limit, offset])
+
+    def filter(self, spec):
+        where, params = compile_spec(spec, self.columns)
+        return self.query(f"SELECT * FROM {TABLE} WHERE {where} ORDER BY rowid", params)
+
+    def distinct(self, column):
+        """Non-null values of column in order of first appearance."""
+        name = quote(column)
+        frame = self.query(f"SELECT {name} FROM {TABLE} WHERE {name} IS NOT NULL GROUP BY {name} ORDER BY MIN(rowid)")
+        return frame[column].tolist()
+
+    def facet(self, column, spec, limit=None):
+        if column not in self.columns:
+            raise KeyError(column)
+        where, params = compile_spec(spec, self.columns)
+        name = quote(column)
+        sql = (f"SELECT {name}, COUNT(*) AS n FROM {TABLE} WHERE {where} AND {name} IS NOT NULL "
+               f"GROUP BY {name} ORDER BY n DESC")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            return [(value, int(n)) for value, n in self.con.execute(sql, params)]
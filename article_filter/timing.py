@@ -0,0 +1,65 @@
+"""Timing of the stages of a script run, and a JSON Lines log of them.
+
+A Timeline collects named spans (load, each filter, summary, table, ...)
+for one rerun of an app. The apps show them in a debug panel and append one
+record per rerun to config.TIMING_LOG, so a slow session can be traced to
+the stage that was slow:
+
+    {"time": "...", "session": "...", "spec": {...}, "total_ms": 41.2,
+     "spans": {"load": 3.1, "filter.keywords": 30.5, "table": 7.0}}
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_log_lock = threading.Lock()
+
+
+class Timeline:
+    """Durations, in order, of the named stages of one run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, time.perf_counter() - start))
+
+    def add(self, name, seconds):
+        """Record a span measured elsewhere."""
+        self.spans.append((name, seconds))
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def milliseconds(self):
+        """Span durations in ms by name; repeated names are added up."""
+        spans = {}
+        for name, seconds in self.spans:
+            spans[name] = spans.get(name, 0.0) + seconds * 1000
+        return {name: round(ms, 3) for name, ms in spans.items()}
+
+    def record(self, **fields):
+        return {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            **fields,
+            "total_ms": round(self.total * 1000, 3),
+            "spans": self.milliseconds(),
+        }
+
+
+def append_log(path, record):
+    """Append record to the JSON Lines file at path."""
+    line = json.dumps(record, default=str) + "\n"
+    # One write per record under a lock, so concurrent sessions never interleave lines
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
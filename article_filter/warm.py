@@ -0,0 +1,134 @@
+"""Loading the default dataset ahead of the first request.
+
+Warmup runs a load in a background thread and reports whether it is done,
+so the app can start preparing the default data when the server starts
+and show visitors who arrive early how far along it is. warm_source does the work itself: it opens a source with the
+configured backend, which leaves the column store, index bundle or SQLite
+database on disk for every later process, and fills the caches the first
+page render needs.
+
+start_default prepares the default data the way the app serves it, once
+per process. "python -m article_filter app" calls it before starting the
+Streamlit server in the same process, so the data is being prepared before
+the first visitor arrives; a plain "streamlit run" starts it on the first
+script run instead.
+"""
+
+import threading
+import time
+
+from . import config
+from .dataset import dataset_for, open_dataset
+from .filters import KEYWORDS_COLUMN, FilterSpec
+from .io import expand_sources, load_paths
+
+
+class Warmup:
+    """The result of load(progress), computed in a background thread.
+
+    load reports how far along it is through progress(done, rows), the
+    callback the loaders in io take; the last report is kept in fraction
+    and rows.
+    """
+
+    def __init__(self, load, name="warmup"):
+        self.load = load
+        self.name = name
+        self.result = None
+        self.error = None
+        self.started = None
+        self.elapsed = None
+        self.fraction = 0.0
+        self.rows = 0
+        self.done = threading.Event()
+
+    def start(self):
+        self.started = time.perf_counter()
+        threading.Thread(target=self.run, name=self.name, daemon=True).start()
+        return self
+
+    def progress(self, done, rows):
+        self.fraction = done
+        self.rows = rows
+
+    def run(self):
+        try:
+            self.result = self.load(self.progress)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+            self.done.set()
+
+    @property
+    def ready(self):
+        return self.done.is_set()
+
+    @property
+    def status(self):
+        if not self.ready:
+            return "warming"
+        return "failed" if self.error is not None else "ready"
+
+    def wait(self, timeout=None):
+        """Block until the load finished; return its result or raise its error."""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"{self.name} still running after {timeout} s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def warm_dataset(dataset):
+    """Compute what rendering the first page of the app asks of dataset."""
+    if KEYWORDS_COLUMN in dataset.columns:
+        dataset.distinct(KEYWORDS_COLUMN)
+    dataset.count(FilterSpec())
+    return dataset
+
+
+def warm_source(source=None, backend=None, progress=None):
+    """Open source (the default data by default) with its indexes and warm its caches."""
+    dataset = open_dataset(source or config.DATA_SOURCE, backend=backend, progress=progress)
+    return warm_dataset(dataset)
+
+
+def prepare_default(paths, progress=None):
+    """The default data as the app serves it: a SQLiteDataset, or a SharedDataset kept current by a watcher."""
+    if config.BACKEND == "sqlite":
+        from .sql import SQLiteDataset
+        return warm_dataset(SQLiteDataset.open(config.DATA_SOURCE, progress=progress))
+    from .index import load_or_build
+    from .watch import watch_default
+    data = load_paths(paths, max_workers=config.INGEST_WORKERS, progress=progress)
+    index = load_or_build(paths, data) if config.INDEX and not data.empty else None
+    shared, _ = watch_default(paths, dataset_for(data, index=index))
+    warm_dataset(shared.current)
+    return shared
+
+
+# Warmups of the default data by file list, shared by every session of the process
+_defaults = {}
+_defaults_lock = threading.Lock()
+
+
+def start_default(paths=None):
+    """The Warmup of the default data (config.DATA_SOURCE), started on the first call.
+
+    A warmup that failed is started again, so a missing or broken file can be
+    fixed without restarting the server.
+    """
+    paths = tuple(expand_sources(config.DATA_SOURCE) if paths is None else paths)
+    with _defaults_lock:
+        warmup = _defaults.get(paths)
+        if warmup is None or warmup.error is not None:
+            warmup = Warmup(lambda progress: prepare_default(list(paths), progress), name="prewarm default data")
+            _defaults[paths] = warmup.start()
+        return warmup
+
+
+def default_warmup(paths=None):
+    """The Warmup start_default started for paths, or None; never starts one."""
+    paths = tuple(expand_sources(config.DATA_SOURCE) if paths is None else paths)
+    with _defaults_lock:
+        return _defaults.get(paths)
@@ -0,0 +1,217 @@
+"""Reloading the default dataset when its file changes, without dropping sessions.
+
+SharedDataset holds the Dataset every session reads at the start of a rerun.
+DatasetWatcher polls the data file from a background thread. When the file
+only grew and its previous contents are unchanged, just the appended rows
+are parsed and the index is extended; any other change, or appended rows
+that cannot be parsed or indexed, triggers a full reload. With the column
+store enabled it is rewritten after an append, so the merged table stays
+memory-mapped and shared between processes. The new Dataset is then swapped in atomically: reruns already in
+flight finish on the Dataset they started with.
+"""
+
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+import pandas as pd
+
+from . import config
+from .dataset import Dataset
+from .colstore import load_store, store_path
+from .fingerprint import sources_fingerprint, stamp
+from .index import IndexBundleError, index_path, load_or_build
+from .io import READ_OPTIONS, load_paths, normalize_columns
+
+HASH_BLOCK_BYTES = 1 << 20
+
+
+class SharedDataset:
+    """The current Dataset of a source, replaced as a whole when the source changes."""
+
+    def __init__(self, dataset):
+        self.current = dataset
+        self.version = 1
+        self.lock = threading.Lock()
+
+    def swap(self, dataset):
+        with self.lock:
+            self.current = dataset
+            self.version += 1
+
+
+class FileState:
+    """What has been ingested from a file: its first size bytes and their hash.
+
+    file_size and mtime_ns are those the file had when it was last checked;
+    a writer may have added bytes since the ingested ones were read.
+    """
+
+    def __init__(self, path, size, mtime_ns, digest, header, file_size=None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.header = header
+        self.file_size = size if file_size is None else file_size
+
+    @classmethod
+    def read(cls, path):
+        """The state of a file that was just loaded in full."""
+        stat = os.stat(path)
+        # A full load parses an unterminated last record too, so the whole
+        # file counts as ingested
+        with open(path, "rb") as f:
+            header = f.readline()
+            f.seek(0)
+            digest, size = prefix_digest(f, stat.st_size)
+        return cls(path, size, stat.st_mtime_ns, digest, header, file_size=stat.st_size)
+
+    def ends_in_record(self):
+        """Whether the ingested bytes end inside a record (no final newline)."""
+        if self.size == 0:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(self.size - 1)
+            return f.read(1) != b"\n"
+
+
+def prefix_digest(f, size):
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = size
+    while remaining > 0:
+        block = f.read(min(HASH_BLOCK_BYTES, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest(), size - remaining
+
+
+class DatasetWatcher:
+    """Poll a single data file and keep a SharedDataset in step with it."""
+
+    def __init__(self, shared, path, interval=None):
+        self.shared = shared
+        self.path = path
+        self.interval = interval or config.WATCH_INTERVAL
+        self.state = FileState.read(path)
+        self.stopped = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"watch {self.path}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+                self.error = None
+            except Exception as e:
+                # Keep serving the last good dataset; try again on the next tick
+                self.error = e
+
+    def changed(self, stat=None):
+        stat = stat or os.stat(self.path)
+        return stat.st_mtime_ns != self.state.mtime_ns or stat.st_size != self.state.file_size
+
+    def poll(self):
+        """Reload if the file changed; return "append", "reload" or None."""
+        stat = os.stat(self.path)
+        if not self.changed(stat):
+            return None
+        if stat.st_size > self.state.size and self.prefix_unchanged():
+            return self.append(stat)
+        return self.reload()
+
+    def prefix_unchanged(self):
+        with open(self.path, "rb") as f:
+            if f.readline() != self.state.header:
+                return False
+            f.seek(0)
+            digest, read = prefix_digest(f, self.state.size)
+        return read == self.state.size and digest == self.state.digest
+
+    def append(self, stat):
+        """Ingest the rows appended to the file up to stat.st_size; return "append" or "reload".
+
+        Like a full load, an unterminated last record is ingested; if it is
+        later extended rather than followed by a newline, the file reloads.
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.state.size)
+            tail = f.read(stat.st_size - self.state.size)
+        if self.state.ends_in_record() and not tail.startswith((b"\n", b"\r")):
+            return self.reload()
+        end = self.state.size + len(tail)
+        current = self.shared.current
+        # The table holds exactly the first end bytes, even if the file has
+        # grown again since
+        fingerprint = self.prefix_fingerprint(end)
+        try:
+            rows = normalize_columns(pd.read_csv(BytesIO(self.state.header + tail), **READ_OPTIONS))
+            if list(rows.columns) != list(current.data.columns):
+                raise ValueError("Appended rows do not have the columns of the data")
+            index = None
+            if current.index is not None:
+                index = current.index.extend(rows, fingerprint=fingerprint)
+        except (IndexBundleError, ValueError, pd.errors.ParserError):
+            # Without a full reload the same failing append would be retried on every poll
+            return self.reload()
+        if index is not None:
+            save_quietly(index, index_path([self.path]))
+        def merged():
+            return pd.concat([current.data, rows], ignore_index=True)
+        # concat copies the mapped columns into private memory: writing the
+        # store again maps them back, shared with the other processes
+        data = load_store(store_path([self.path]), fingerprint, merged) if config.COLUMN_STORE else merged()
+        self.shared.swap(Dataset(stamp(data, fingerprint), source=current.source, index=index))
+        self.advance(end, stat)
+        return "append"
+
+    def reload(self):
+        data = load_paths([self.path], max_workers=config.INGEST_WORKERS)
+        index = load_or_build([self.path], data) if config.INDEX else None
+        self.shared.swap(Dataset(data, source=self.path, index=index))
+        self.state = FileState.read(self.path)
+        return "reload"
+
+    def prefix_fingerprint(self, end):
+        """sources_fingerprint of the file as if it ended at end."""
+        if end == os.path.getsize(self.path):
+            return sources_fingerprint([self.path])
+        # Never equal to the fingerprint of the whole file, so stores and index
+        # bundles written for this prefix are rebuilt by the next full load
+        with open(self.path, "rb") as f:
+            digest, _ = prefix_digest(f, end)
+        return hashlib.blake2b(f"{os.path.basename(self.path)}:{end}:{digest}".encode(), digest_size=16).hexdigest()
+
+    def advance(self, end, stat):
+        # The size and mtime seen before reading: a later write shows as a change
+        with open(self.path, "rb") as f:
+            digest, _ = prefix_digest(f, end)
+        self.state = FileState(self.path, end, stat.st_mtime_ns, digest, self.state.header, file_size=stat.st_size)
+
+
+def save_quietly(index, path):
+    try:
+        index.save(path)
+    except OSError:
+        pass
+
+
+def watch_default(paths, dataset):
+    """Share dataset and, for a single data file, start reloading it when it changes."""
+    shared = SharedDataset(dataset)
+    watcher = None
+    # Appended rows are merged into pandas frames and index bundles only
+    if config.WATCH and config.BACKEND == "pandas" and len(paths) == 1 and not dataset.empty:
+        watcher = DatasetWatcher(shared, paths[0]).start()
+    return shared, watcher
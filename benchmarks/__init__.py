@@ -0,0 +1 @@
+"""Benchmarks for the article_filter package: python -m benchmarks.<name>"""
@@ -0,0 +1,66 @@
+"""Equivalence and timing of the query backends against the pandas reference filters.
+
+    python -m benchmarks.bench_backends --rows 500000 --specs 50
+
+Every backend must return the same rows, in the same order, as
+apply_filters for every spec; any difference aborts the run. Times are for
+a first (cold) pass over the specs on a freshly opened dataset.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from article_filter import apply_filters, dataset_for
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR
+from article_filter.sql import SQLiteDataset
+
+from .bench_batch import random_specs
+from .corpus import generate_corpus
+
+
+def open_backend(backend, data, directory):
+    if backend == "sqlite":
+        path = os.path.join(directory, "corpus.csv")
+        data.to_csv(path, sep=CSV_SEPARATOR, index=False, encoding=CSV_ENCODING)
+        return SQLiteDataset.open(path)
+    return dataset_for(data, backend=backend)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--specs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=["pandas", "polars", "sqlite"])
+    args = parser.parse_args(argv)
+
+    data = generate_corpus(args.rows, seed=args.seed)
+    specs = random_specs(args.specs, seed=args.seed)
+
+    # Titles are unique in the generated corpus, so they identify rows in
+    # every backend, including SQLite which returns freshly built frames
+    start = time.perf_counter()
+    expected = [apply_filters(data, spec)["Title"].tolist() for spec in specs]
+    timings = {"reference": time.perf_counter() - start}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            dataset = open_backend(backend, data, directory)
+            elapsed = 0.0
+            for spec, titles in zip(specs, expected):
+                start = time.perf_counter()
+                result = dataset.filter(spec)
+                elapsed += time.perf_counter() - start
+                if result["Title"].tolist() != titles:
+                    raise SystemExit(f"{backend} backend differs from the reference for {spec}")
+            timings[backend] = elapsed
+
+    print(f"{args.specs} specs over {args.rows} rows, all backends equal to the reference")
+    for name, seconds in timings.items():
+        print(f"{name:10s}: {seconds:8.3f} s  {args.specs / seconds:10.1f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Throughput of the shared-scan BatchExecutor against per-spec pandas filtering.
+
+    python -m benchmarks.bench_batch --rows 200000 --specs 100
+"""
+
+import argparse
+import random
+import time
+
+from article_filter import BatchExecutor, FilterSpec, apply_filters
+from article_filter.filters import CITATION_OPTIONS, JCR_OPTIONS, PERIOD_OPTIONS
+
+from .corpus import KEYWORD_VOCABULARY, KNOWLEDGE_GROUPS, generate_corpus
+
+
+def random_specs(n_specs, seed=0):
+    # Saved specs draw from the same small option lists, so predicates repeat a lot
+    rng = random.Random(seed)
+    return [
+        FilterSpec(
+            period=rng.choice(PERIOD_OPTIONS),
+            citations=rng.choice(CITATION_OPTIONS),
+            keywords=rng.choice(["All"] + KEYWORD_VOCABULARY),
+            exact_match=rng.random() < 0.5,
+            jcr=rng.choice(JCR_OPTIONS),
+            knowledge_group=rng.choice(["All"] + KNOWLEDGE_GROUPS),
+        )
+        for _ in range(n_specs)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--specs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    data = generate_corpus(args.rows, seed=args.seed)
+    specs = random_specs(args.specs, seed=args.seed)
+
+    start = time.perf_counter()
+    expected = [len(apply_filters(data, spec)) for spec in specs]
+    per_spec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    executor = BatchExecutor(data)
+    counts = executor.counts(specs)
+    batched = time.perf_counter() - start
+
+    if counts != expected:
+        raise SystemExit("BatchExecutor results differ from apply_filters")
+
+    distinct = len({p for spec in specs for p in spec.predicates()})
+    print(f"{args.specs} specs over {args.rows} rows, {distinct} distinct predicates")
+    print(f"per-spec pandas : {per_spec:8.3f} s  {args.specs / per_spec:10.1f} specs/s")
+    print(f"shared scan     : {batched:8.3f} s  {args.specs / batched:10.1f} specs/s")
+    print(f"speedup         : {per_spec / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Parallel vs. serial ingestion of many per-year CSV exports.
+
+    python -m benchmarks.bench_ingest --files 20 --rows-per-file 50000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR, load_many
+
+from .corpus import generate_corpus
+
+
+def write_exports(directory, n_files, rows_per_file):
+    paths = []
+    for i in range(n_files):
+        path = os.path.join(directory, f"scopus_{2005 + i}.csv")
+        generate_corpus(rows_per_file, seed=i).to_csv(path, sep=CSV_SEPARATOR, index=False, encoding=CSV_ENCODING)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--rows-per-file", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_exports(directory, args.files, args.rows_per_file)
+
+        start = time.perf_counter()
+        serial = load_many(paths, max_workers=1)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = load_many(paths, max_workers=args.workers)
+        parallel_time = time.perf_counter() - start
+
+    if not serial.equals(parallel):
+        raise SystemExit("Parallel ingestion produced a different table")
+
+    print(f"{args.files} files, {len(serial)} rows, {os.cpu_count()} CPUs")
+    print(f"serial   : {serial_time:8.3f} s")
+    print(f"parallel : {parallel_time:8.3f} s")
+    print(f"speedup  : {serial_time / parallel_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Regression gate: the benchmark suite against a stored baseline.
+
+    python -m benchmarks.compare                      # run the suite, compare
+    python -m benchmarks.compare --report new.json    # compare a saved report
+    python -m benchmarks.compare --update             # store a new baseline
+    python -m benchmarks.compare --skip-other-environment
+
+The baseline (benchmarks/baseline.json) is a benchmarks.run report plus the
+tolerances to apply. The suite is run with the baseline's sizes, seed and
+repeats (at least --repeat), and every measurement, keyed by name and
+rows, is compared on its median time, which a single lucky or unlucky run
+does not move. A measurement regresses when it is slower than the
+baseline by more than its tolerance and by more than --min-seconds
+(15 ms), which keeps timings of a few milliseconds from failing on noise. Match counts must be equal: a
+changed count is a wrong answer, not a slow one.
+
+Reports carry the time of a fixed calibration workload; current times are
+scaled by the ratio of the two calibrations, so a machine that is busier
+or slower as a whole does not show as a regression of every benchmark.
+
+Tolerances are fractions of the baseline time, by fnmatch pattern of the
+measurement name; the first matching pattern applies:
+
+    "tolerances": {"convert_to_excel": 0.5, "load_data": 0.4, "filter.*.reference": 0.4, "*": 0.3}
+
+The command prints a table of every measurement and exits with status 1
+if any regressed, changed its count or is missing. Timings only compare on
+the same machine; a baseline from another environment is reported as such,
+or, with --skip-other-environment, the gate is skipped (status 0) before
+running the suite. tests/test_benchmark_gate.py runs the gate under pytest.
+"""
+
+import argparse
+import json
+import os
+import sys
+from fnmatch import fnmatch
+
+from .run import environment, run_suite
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCES = {"*": 0.25}
+MIN_SECONDS = 0.015
+MIN_REPEAT = 9
+ENVIRONMENT_KEYS = ("python", "pandas", "numpy", "cpus")
+FAILURES = ("slower", "count changed", "missing")
+
+
+def tolerance(name, tolerances):
+    for pattern, value in tolerances.items():
+        if fnmatch(name, pattern):
+            return value
+    return DEFAULT_TOLERANCES["*"]
+
+
+def speed_factor(baseline, report):
+    """How much faster the machine ran the baseline's calibration than the report's (1.0 without one)."""
+    if baseline.get("calibration") and report.get("calibration"):
+        return baseline["calibration"] / report["calibration"]
+    return 1.0
+
+
+def timing(result, statistic):
+    # Reports older than the median fall back to the best time
+    return result.get(statistic, result["best"])
+
+
+def compare(baseline, report, min_seconds=MIN_SECONDS, statistic="median"):
+    """Rows of the comparison, one per baseline or report measurement, with a status each."""
+    tolerances = baseline.get("tolerances", DEFAULT_TOLERANCES)
+    factor = speed_factor(baseline, report)
+    current = {(r["name"], r["rows"]): {**r, "time": timing(r, statistic) * factor} for r in report["results"]}
+    rows = []
+    for before in baseline["results"]:
+        key = (before["name"], before["rows"])
+        after = current.pop(key, None)
+        before_time = timing(before, statistic)
+        row = {"name": key[0], "rows": key[1], "baseline": before_time, "tolerance": tolerance(key[0], tolerances)}
+        if after is None:
+            rows.append({**row, "current": None, "change": None, "status": "missing"})
+            continue
+        change = after["time"] / before_time - 1 if before_time else 0.0
+        if before.get("matches") != after.get("matches"):
+            status = "count changed"
+        elif change > row["tolerance"] and after["time"] - before_time > min_seconds:
+            status = "slower"
+        elif change < -row["tolerance"] and before_time - after["time"] > min_seconds:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append({**row, "current": after["time"], "change": change, "status": status})
+    for (name, n_rows), after in current.items():
+        rows.append({"name": name, "rows": n_rows, "baseline": None, "tolerance": tolerance(name, tolerances),
+                     "current": after["time"], "change": None, "status": "new"})
+    return rows
+
+
+def failed(rows):
+    return [row for row in rows if row["status"] in FAILURES]
+
+
+def format_table(rows):
+    def seconds(value):
+        return "-" if value is None else f"{value:.4f}"
+
+    lines = [f"{'benchmark':34s} {'rows':>10s} {'baseline s':>11s} {'current s':>11s} {'change':>8s} {'limit':>6s}  status"]
+    for row in rows:
+        change = "-" if row["change"] is None else f"{row['change']:+.0%}"
+        lines.append(
+            f"{row['name']:34s} {row['rows']:>10,} {seconds(row['baseline']):>11s} {seconds(row['current']):>11s} "
+            f"{change:>8s} {row['tolerance']:>6.0%}  {row['status'].upper() if row['status'] in FAILURES else row['status']}"
+        )
+    return "\n".join(lines)
+
+
+def environment_differences(baseline, report):
+    before, after = baseline.get("environment", {}), report.get("environment", {})
+    return [f"{key}: {before.get(key)} -> {after.get(key)}" for key in ENVIRONMENT_KEYS if before.get(key) != after.get(key)]
+
+
+def load_baseline(path=BASELINE):
+    """The stored baseline, or None when there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--report", help="compare this benchmarks.run report instead of running the suite")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                        help="differences smaller than this never count as regressions")
+    parser.add_argument("--repeat", type=int, default=MIN_REPEAT,
+                        help="run every measurement at least this many times")
+    parser.add_argument("--statistic", choices=("median", "best"), default="median",
+                        help="which time of the repeats to compare")
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--skip-other-environment", action="store_true",
+                        help="exit 0 without comparing when the baseline comes from another environment")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    report = None
+    if args.report:
+        with open(args.report, encoding="utf-8") as f:
+            report = json.load(f)
+    if args.skip_other_environment and baseline is not None and not args.update:
+        differences = environment_differences(baseline, report or {"environment": environment()})
+        if differences:
+            print("Skipped: the baseline comes from another environment (" + ", ".join(differences) + "); "
+                  "refresh it with --update on this machine.")
+            return 0
+    if report is None:
+        settings = baseline or {"seed": 0, "repeat": 3, "excel_rows": 100_000, "results": [{"rows": 1_000}, {"rows": 100_000}]}
+        sizes = sorted({r["rows"] for r in settings["results"]})
+        repeat = max(settings.get("repeat", 3), args.repeat)
+        report = run_suite(sizes, settings["seed"], repeat, settings.get("excel_rows", 100_000), verbose=False)
+
+    if args.update:
+        report["tolerances"] = (baseline or {}).get("tolerances", DEFAULT_TOLERANCES)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if baseline is None:
+        raise SystemExit(f"No baseline at {args.baseline}: create one with --update")
+
+    rows = compare(baseline, report, args.min_seconds, args.statistic)
+    print(format_table(rows))
+    print(f"\nTimes are the {args.statistic} of {report.get('repeat')} runs; "
+          f"differences under {args.min_seconds * 1000:.0f} ms never count as regressions.")
+    factor = speed_factor(baseline, report)
+    if factor != 1.0:
+        print(f"\nCurrent times are scaled by {factor:.2f} for the speed of the machine (calibration).")
+    differences = environment_differences(baseline, report)
+    if differences:
+        print("\nThe baseline comes from another environment (" + ", ".join(differences) + "); "
+              "timings may not be comparable.")
+    regressions = failed(rows)
+    if regressions:
+        print(f"\n{len(regressions)} of {len(rows)} benchmarks failed: slower, changed count or missing.")
+        return 1
+    print(f"\nNo regressions in {len(rows)} benchmarks.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Synthetic article tables shaped like the Scopus exports used by the apps.
+
+The generator is deterministic for a given seed and row count and is
+vectorised, so it scales from a thousand to ten million rows:
+
+* Year grows towards recent years, as publication counts do;
+* Cited by follows a power law, with missing values for uncited records;
+* Keywords draw 1 to 6 terms from a Zipfian vocabulary whose most frequent
+  terms are KEYWORD_VOCABULARY;
+* Title is unique per row; Abstract is optional (it dominates the size).
+"""
+
+import numpy as np
+import pandas as pd
+
+from article_filter.filters import JCR_RANKS
+
+KNOWLEDGE_GROUPS = ["Health Sciences", "Engineering", "Social Sciences", "Arts & Humanities", "Sciences"]
+
+KEYWORD_VOCABULARY = [
+    "bibliometrics", "citation analysis", "machine learning", "deep learning", "Scopus",
+    "open science", "peer review", "research evaluation", "altmetrics", "scientometrics",
+    "co-authorship", "impact factor", "h-index", "text mining", "knowledge graph",
+]
+
+# Share of records per JCR rank and knowledge group, in the order of the lists
+JCR_WEIGHTS = [0.40, 0.22, 0.17, 0.12, 0.09]
+KNOWLEDGE_GROUP_WEIGHTS = [0.34, 0.24, 0.20, 0.07, 0.15]
+
+FIRST_YEAR, LAST_YEAR = 2005, 2025
+VOCABULARY_SIZE = 5000
+ZIPF_EXPONENT = 1.1
+# Distinct keyword lists and titles are drawn from pools of this size, then
+# sampled per row, which keeps generation vectorised at millions of rows
+POOL_SIZE = 100_000
+
+TITLE_WORDS = [
+    "A", "study", "of", "towards", "analysis", "evidence", "from", "mapping", "the",
+    "impact", "review", "systematic", "framework", "for", "using", "in", "trends",
+]
+
+
+def vocabulary(size=VOCABULARY_SIZE):
+    """KEYWORD_VOCABULARY followed by synthetic terms, most frequent first."""
+    return KEYWORD_VOCABULARY + [f"topic {i:05d}" for i in range(size - len(KEYWORD_VOCABULARY))]
+
+
+def zipf_weights(size, exponent=ZIPF_EXPONENT):
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def keyword_pool(rng, size, terms):
+    counts = rng.integers(1, 7, size)
+    picks = rng.choice(len(terms), size=counts.sum(), p=zipf_weights(len(terms)))
+    pool = []
+    start = 0
+    for count in counts:
+        # dict.fromkeys drops repeated terms while keeping their order
+        pool.append(",".join(dict.fromkeys(terms[i] for i in picks[start:start + count])))
+        start += count
+    return np.array(pool, dtype=object)
+
+
+def text_pool(rng, size, n_words):
+    words = np.array(TITLE_WORDS + KEYWORD_VOCABULARY, dtype=object)
+    lengths = rng.integers(n_words // 2, n_words + 1, size)
+    return np.array([" ".join(rng.choice(words, n)) for n in lengths], dtype=object)
+
+
+def generate_corpus(n_rows, seed=0, abstracts=False, start=0):
+    """A table of n_rows articles; start offsets the unique part of the titles."""
+    rng = np.random.default_rng(seed)
+    pool_size = max(1, min(n_rows, POOL_SIZE))
+
+    years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+    year_weights = np.exp(0.08 * (years - FIRST_YEAR))
+    citations = np.floor(rng.pareto(1.2, n_rows) * 3)
+    # Scopus leaves "Cited by" empty for records that were never cited
+    citations[citations == 0] = np.where(rng.random((citations == 0).sum()) < 0.5, np.nan, 0)
+
+    keywords = keyword_pool(rng, pool_size, vocabulary())[rng.integers(0, pool_size, n_rows)]
+    keywords[rng.random(n_rows) < 0.03] = None
+
+    titles = pd.Series(text_pool(rng, pool_size, 12)[rng.integers(0, pool_size, n_rows)])
+    columns = {
+        "Title": titles + " " + pd.Series(np.arange(start, start + n_rows)).astype(str),
+        "Year": rng.choice(years, n_rows, p=year_weights / year_weights.sum()),
+        "Cited by": citations,
+        "Keywords": keywords,
+        "JCR rank": rng.choice(JCR_RANKS, n_rows, p=JCR_WEIGHTS),
+        "Knowledge area group": rng.choice(KNOWLEDGE_GROUPS, n_rows, p=KNOWLEDGE_GROUP_WEIGHTS),
+    }
+    if abstracts:
+        columns["Abstract"] = text_pool(rng, pool_size, 120)[rng.integers(0, pool_size, n_rows)]
+    return pd.DataFrame(columns)
+
+
+def write_corpus(path, n_rows, seed=0, abstracts=False, chunk_rows=1_000_000, **to_csv):
+    """Write a corpus of n_rows as CSV in chunks, so 10M rows never sit in memory at once."""
+    for i, first in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = generate_corpus(min(chunk_rows, n_rows - first), seed=seed + i, abstracts=abstracts, start=first)
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False, **to_csv)
+    return path
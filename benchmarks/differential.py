@@ -0,0 +1,278 @@
+"""Differential check: every query engine against the app's original filters.
+
+    python -m benchmarks.differential --cases 200 --rows 300 --specs 25
+
+Each case generates a small random export, writes it as CSV and loads it
+back as the app does, then draws random specs over its values. Every
+engine must return the same rows, in the same order, as reference_filter,
+the filter code of interactive_article_filter_10.py as it was before the
+article_filter package existed. Rows are identified by their unique Title.
+The engines also run over the other frames the app may hold for the same
+file (FRAMES): the chunked reader's compacted frame, parsed in chunks small
+enough that dtypes widen between chunks, and the frame reopened from a
+column store.
+
+The generated data leans on the cases where engines tend to differ:
+boundary years and citation counts, missing values in every column,
+filters leaving no rows, keywords differing in case or spacing, repeated
+keywords, and keywords with a "." (the substring match is a regular
+expression). Any difference is printed with the seed, case and spec, the
+rows concerned and the command running that case alone (--case), and the
+exit status is 1. tests/test_differential.py runs a few cases per seed
+under pytest.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from article_filter import apply_filters, dataset_for, load_data
+from article_filter.batch import BatchExecutor
+from article_filter.chunked import read_chunked
+from article_filter.colstore import open_store, store_path, write_store
+from article_filter.dataset import Dataset
+from article_filter.fingerprint import sources_fingerprint
+from article_filter.filters import CITATION_OPTIONS, JCR_OPTIONS, JCR_RANKS, PERIOD_OPTIONS, FilterSpec
+from article_filter.index import DatasetIndex
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR, READ_OPTIONS
+from article_filter.sql import SQLiteDataset
+
+ENGINES = ("apply_filters", "dataset", "indexed", "batch", "polars", "sqlite")
+FRAMES = ("read_csv", "chunked", "colstore")
+CHUNK_ROWS = 50
+
+YEARS = [2005, 2006, 2007, 2008, 2010, 2011, 2014, 2015, 2020, 2021, 2024, 2025, 2026]
+CITATIONS = [0, 1, 2, 10, 11, 24, 25, 49, 50, 99, 100, 249, 250, 1000]
+TERMS = [
+    "machine learning", "Machine Learning", "deep learning", "learning", "Scopus",
+    "e.g. corpus", "ergo corpus", "h-index", "bibliometrics", "open science",
+]
+GROUPS = ["Health Sciences", "Engineering", "Social Sciences", "Arts & Humanities", "Sciences"]
+
+
+def reference_filter(data, period_filter, citations_filter, keywords_filter, exact_match, jcr_filter,
+                     knowledge_group_filter):
+    """The filters of interactive_article_filter_10.py as first written.
+
+    One guard is added: with no rows left, the exact keyword match failed
+    (apply over an empty Series is not boolean, so it selected columns
+    instead of rows) and the app raised KeyError; the result is no rows.
+    """
+    filtered_data = data.copy()
+
+    if period_filter != "All" and period_filter != "None":
+        if period_filter == "2007-2010":
+            filtered_data = filtered_data[(filtered_data["Year"] >= 2007) & (filtered_data["Year"] <= 2010)]
+        elif period_filter == "2011-2014":
+            filtered_data = filtered_data[(filtered_data["Year"] >= 2011) & (filtered_data["Year"] <= 2014)]
+        elif period_filter == "2015-2020":
+            filtered_data = filtered_data[(filtered_data["Year"] >= 2015) & (filtered_data["Year"] <= 2020)]
+        elif period_filter == "2021-2025":
+            filtered_data = filtered_data[(filtered_data["Year"] >= 2021) & (filtered_data["Year"] <= 2025)]
+
+    if citations_filter != "All" and citations_filter != "None":
+        if citations_filter == "1 to 10 citations":
+            filtered_data = filtered_data[(filtered_data["Cited by"] >= 1) & (filtered_data["Cited by"] <= 10)]
+        elif citations_filter == "11 to 24 citations":
+            filtered_data = filtered_data[(filtered_data["Cited by"] >= 11) & (filtered_data["Cited by"] <= 24)]
+        elif citations_filter == "25 to 49 citations":
+            filtered_data = filtered_data[(filtered_data["Cited by"] >= 25) & (filtered_data["Cited by"] <= 49)]
+        elif citations_filter == "50 to 99 citations":
+            filtered_data = filtered_data[(filtered_data["Cited by"] >= 50) & (filtered_data["Cited by"] <= 99)]
+        elif citations_filter == "100 to 249 citations":
+            filtered_data = filtered_data[(filtered_data["Cited by"] >= 100) & (filtered_data["Cited by"] <= 249)]
+        elif citations_filter == "250 or more citations":
+            filtered_data = filtered_data[filtered_data["Cited by"] >= 250]
+
+    if filtered_data.empty:
+        return filtered_data
+
+    if keywords_filter != "All" and keywords_filter != "None":
+        keywords = [kw.strip() for kw in keywords_filter.split(",")]
+        if exact_match:
+            filtered_data = filtered_data[
+                filtered_data["Keywords"].apply(lambda x: all(kw in x.split(",") for kw in keywords) if pd.notna(x) else False)
+            ]
+        else:
+            filtered_data = filtered_data[
+                filtered_data["Keywords"].str.contains('|'.join(keywords), case=False, na=False)
+            ]
+
+    if jcr_filter != "All" and jcr_filter != "None":
+        filtered_data = filtered_data[filtered_data["JCR rank"] == jcr_filter]
+
+    if knowledge_group_filter != "All" and knowledge_group_filter != "None" and "Knowledge area group" in data.columns:
+        filtered_data = filtered_data[filtered_data["Knowledge area group"] == knowledge_group_filter]
+
+    return filtered_data
+
+
+def reference_titles(data, spec):
+    return reference_filter(data, spec.period, spec.citations, spec.keywords, spec.exact_match, spec.jcr,
+                            spec.knowledge_group)["Title"].tolist()
+
+
+def maybe_missing(rng, values, share):
+    values = np.array(values, dtype=object)
+    values[rng.random(len(values)) < share] = None
+    return values
+
+
+def keyword_list(rng):
+    terms = list(rng.choice(TERMS, rng.integers(1, 4)))
+    if rng.random() < 0.2:
+        terms.append(terms[0])
+    # Exports usually separate keywords with "," but not always
+    separator = "," if rng.random() < 0.7 else ", "
+    return separator.join(terms)
+
+
+def random_export(rng, n_rows):
+    """A small export with edge cases in every filtered column."""
+    columns = {
+        "Title": [f"Article {i}" for i in range(n_rows)],
+        "Year": maybe_missing(rng, rng.choice(YEARS, n_rows), 0.05),
+        "Cited by": maybe_missing(rng, rng.choice(CITATIONS, n_rows), 0.2),
+        "Keywords": maybe_missing(rng, [keyword_list(rng) for _ in range(n_rows)], 0.1),
+        "JCR rank": maybe_missing(rng, rng.choice(JCR_RANKS, n_rows), 0.1),
+    }
+    # The apps ignore the knowledge group filter when the column is missing
+    if rng.random() < 0.9:
+        columns["Knowledge area group"] = maybe_missing(rng, rng.choice(GROUPS, n_rows), 0.1)
+    return pd.DataFrame(columns)
+
+
+def random_specs(data, n_specs, rng):
+    """Specs as the sidebar offers them: keywords and groups come from the data."""
+    keywords = ["All", "None"] + sorted(data["Keywords"].dropna().unique().tolist()) + TERMS
+    groups = ["All", "None"] + GROUPS
+    return [
+        FilterSpec(
+            period=rng.choice(PERIOD_OPTIONS),
+            citations=rng.choice(CITATION_OPTIONS),
+            keywords=rng.choice(keywords),
+            exact_match=rng.random() < 0.5,
+            jcr=rng.choice(JCR_OPTIONS),
+            knowledge_group=rng.choice(groups),
+        )
+        for _ in range(n_specs)
+    ]
+
+
+def load_frame(frame, path):
+    """The export at path as one of the frames the app may hold for it."""
+    if frame == "chunked":
+        return read_chunked(path, chunk_rows=CHUNK_ROWS, **READ_OPTIONS)
+    if frame == "colstore":
+        paths = [path]
+        write_store(load_data(path), store_path(paths), sources_fingerprint(paths))
+        return open_store(store_path(paths))
+    return load_data(path)
+
+
+def engine_titles(engine, data, path, specs):
+    """The titles each spec selects, per spec, with one engine."""
+    if engine == "apply_filters":
+        return [apply_filters(data, spec)["Title"].tolist() for spec in specs]
+    if engine == "batch":
+        return [frame["Title"].tolist() for frame in BatchExecutor(data).run(specs)]
+    if engine == "sqlite":
+        dataset = SQLiteDataset.open(path, db_path=path + ".sqlite")
+    elif engine == "indexed":
+        dataset = Dataset(data, index=DatasetIndex.build(data))
+    elif engine == "dataset":
+        dataset = Dataset(data)
+    else:
+        dataset = dataset_for(data, backend=engine)
+    return [dataset.filter(spec)["Title"].tolist() for spec in specs]
+
+
+def describe(data, titles):
+    rows = data[data["Title"].isin(titles)]
+    return rows.drop(columns="Title").to_string(max_rows=5) if len(rows) else "(none)"
+
+
+def reproduce_command(seed, case, rows, n_specs, engines=ENGINES, frames=FRAMES):
+    """The command line running one case of the check again."""
+    command = f"python -m benchmarks.differential --seed {seed} --case {case} --rows {rows} --specs {n_specs}"
+    if list(engines) != list(ENGINES):
+        command += " --engines " + " ".join(engines)
+    if list(frames) != list(FRAMES):
+        command += " --frames " + " ".join(frames)
+    return command
+
+
+def run_case(case, directory, seed=0, rows=300, n_specs=25, engines=ENGINES, frames=FRAMES):
+    """The differences between the engines and the reference in one random export."""
+    rng = np.random.default_rng([seed, case])
+    path = os.path.join(directory, f"case_{case}.csv")
+    random_export(rng, rows).to_csv(path, sep=CSV_SEPARATOR, index=False, encoding=CSV_ENCODING)
+    data = load_data(path)
+    specs = random_specs(data, n_specs, random.Random(seed * 1_000_003 + case))
+    expected = [reference_titles(data, spec) for spec in specs]
+    failures = []
+    where = f"seed {seed}, case {case}"
+    reproduce = f"reproduce with: {reproduce_command(seed, case, rows, n_specs, engines, frames)}"
+    for frame in frames:
+        try:
+            frame_data = data if frame == "read_csv" else load_frame(frame, path)
+        except Exception as e:
+            failures.append(f"{where}, {frame} frame: raised {e!r}\n{reproduce}")
+            continue
+        for engine in engines:
+            # SQLite reads the CSV itself: one frame is enough
+            if engine == "sqlite" and frame != frames[0]:
+                continue
+            try:
+                results = engine_titles(engine, frame_data, path, specs)
+            except Exception as e:
+                failures.append(f"{where}, {engine} on the {frame} frame: raised {e!r}\n{reproduce}")
+                continue
+            for spec, want, got in zip(specs, expected, results):
+                if got != want:
+                    missing = sorted(set(want) - set(got))
+                    extra = sorted(set(got) - set(want))
+                    detail = "same rows in another order" if not missing and not extra else (
+                        f"missing {len(missing)} rows:\n{describe(data, missing)}\n"
+                        f"extra {len(extra)} rows:\n{describe(data, extra)}"
+                    )
+                    failures.append(f"{where}, {engine} on the {frame} frame: {json.dumps(spec.to_dict())}\n"
+                                    f"{detail}\n{reproduce}")
+                    break
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100, help="random exports to generate")
+    parser.add_argument("--rows", type=int, default=300, help="rows per export")
+    parser.add_argument("--specs", type=int, default=25, help="specs per export")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--case", type=int, help="run only this case of the seed, as printed with a difference")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--frames", nargs="+", choices=FRAMES, default=list(FRAMES))
+    args = parser.parse_args(argv)
+
+    cases = range(args.cases) if args.case is None else [args.case]
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for case in cases:
+            failures += run_case(case, directory, args.seed, args.rows, args.specs, args.engines, args.frames)
+    for failure in failures[:10]:
+        print(failure, end="\n\n")
+    checks = len(cases) * args.specs
+    if failures:
+        print(f"{len(failures)} engine differences in {len(cases)} cases ({checks} specs)")
+        return 1
+    print(f"{len(args.engines)} engines on {len(args.frames)} frames equal to the reference "
+          f"in {len(cases)} cases ({checks} specs)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+"""Load test: concurrent sessions of interactive_article_filter_10.py.
+
+    python -m benchmarks.load --rows 100000 --sessions 1 5 10 --actions 20
+
+The harness starts the app with `streamlit run` on a synthetic corpus of
+--rows articles (or targets a running server with --url) and connects N
+headless sessions to it over the websocket the browser uses. A session
+opens the app, then changes one filter at a time, as analysts narrow and
+widen a search, pausing --think seconds on average between changes.
+
+A rerun's latency runs from sending the widget states to the server's
+script-finished message, so it includes queueing behind other sessions
+but not rendering in a browser. For every number of sessions the harness
+reports the p50/p95/max rerun latency and the growth of the server's
+resident size, and --out writes them as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR
+from article_filter.memory import process_rss
+
+from .corpus import write_corpus
+from .run import environment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "interactive_article_filter_10.py")
+
+# How often analysts touch each filter: keywords and period most of all
+ACTIONS = [
+    ("Keywords:", 0.35),
+    ("Period of publication:", 0.2),
+    ("JCR rank:", 0.15),
+    ("Number of Citations:", 0.1),
+    ("Knowledge area group:", 0.1),
+    ("Exact match", 0.1),
+]
+
+
+class Session:
+    """One browser tab: a websocket to the app and the values of its widgets."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.widgets = {}
+        self.fragments = {}
+        self.states = {}
+
+    async def rerun(self, fragment_id=""):
+        """Run the script, or one of its fragments, with the current widget states.
+
+        Return the duration of the run and the message of any exception shown.
+        """
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        error = None
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self.websocket.recv())
+            kind = reply.WhichOneof("type")
+            if kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                element = reply.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type in ("selectbox", "checkbox"):
+                    widget = getattr(element, element_type)
+                    self.widgets[widget.label] = widget
+                    # Like the browser, rerun only the fragment a widget belongs to
+                    self.fragments[widget.id] = reply.delta.fragment_id
+                elif element_type == "exception":
+                    error = element.exception.message
+            elif kind == "script_finished":
+                return time.perf_counter() - start, error
+
+    def act(self, rng):
+        """Change one widget; return the fragment to rerun ("" for the whole script)."""
+        labels, weights = zip(*ACTIONS)
+        widget = self.widgets[rng.choices(labels, weights)[0]]
+        if widget.label == "Exact match":
+            previous = self.states.get(widget.id)
+            value = not (previous.bool_value if previous is not None else widget.default)
+            self.states[widget.id] = WidgetState(id=widget.id, bool_value=value)
+        else:
+            options = widget.options
+            if widget.label == "Keywords:" and len(options) > 2 and rng.random() < 0.8:
+                # Usually a real keyword list rather than "All" or "None"
+                option = options[rng.randrange(2, min(len(options), 200))]
+            else:
+                option = rng.choice(options)
+            self.states[widget.id] = WidgetState(id=widget.id, string_value=option)
+        return self.fragments.get(widget.id, "")
+
+
+async def analyst(url, seed, actions, think, latencies, errors):
+    rng = random.Random(seed)
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as websocket:
+        session = Session(websocket)
+        for step in range(actions + 1):
+            fragment_id = ""
+            if step:
+                await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+                fragment_id = session.act(rng)
+            seconds, error = await session.rerun(fragment_id)
+            latencies.append(seconds)
+            if error is not None:
+                errors.append(error)
+                return
+
+
+async def run_level(url, n_sessions, args, seed, pid):
+    latencies, errors = [], []
+    rss_before = process_rss(pid) if pid else None
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        analyst(url, seed + i, args.actions, args.think, latencies, errors) for i in range(n_sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    rss_after = process_rss(pid) if pid else None
+    times = np.array(latencies)
+    return {
+        "sessions": n_sessions,
+        "reruns": len(latencies),
+        "errors": errors[:5],
+        "seconds": elapsed,
+        "p50": float(np.percentile(times, 50)),
+        "p95": float(np.percentile(times, 95)),
+        "max": float(times.max()),
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "rss_growth": rss_after - rss_before if rss_before and rss_after else None,
+    }
+
+
+def start_server(port, data_path, timeout=60):
+    env = dict(os.environ, ARTICLE_FILTER_DATA=data_path)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit(f"The app did not start on port {port} within {timeout} s")
+
+
+async def run_levels(url, args, pid):
+    # One session first, so the default dataset is loaded and indexed before timing
+    await analyst(url, args.seed, 0, 0, [], [])
+    results = []
+    for n_sessions in args.sessions:
+        result = await run_level(url, n_sessions, args, seed=args.seed + 1000 * n_sessions, pid=pid)
+        results.append(result)
+        growth = f"{result['rss_growth'] / 2**20:+8.1f} MiB" if result["rss_growth"] is not None else ""
+        print(f"{n_sessions:4d} sessions  {result['reruns']:5d} reruns  p50 {result['p50'] * 1000:8.1f} ms  "
+              f"p95 {result['p95'] * 1000:8.1f} ms  max {result['max'] * 1000:8.1f} ms  {growth}"
+              + (f"  errors: {len(result['errors'])}" if result["errors"] else ""), flush=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--actions", type=int, default=20, help="filter changes per session")
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between changes, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--url", help="websocket of a running app, e.g. ws://host:8501/_stcore/stream")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "actions": args.actions, "think": args.think}
+    if args.url:
+        report["url"] = args.url
+        report["results"] = asyncio.run(run_levels(args.url, args, pid=None))
+    else:
+        report["rows"] = args.rows
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_corpus(os.path.join(directory, "corpus.csv"), args.rows, seed=args.seed,
+                                sep=CSV_SEPARATOR, encoding=CSV_ENCODING)
+            server = start_server(args.port, path)
+            try:
+                report["rss_start"] = process_rss(server.pid)
+                url = f"ws://127.0.0.1:{args.port}/_stcore/stream"
+                report["results"] = asyncio.run(run_levels(url, args, pid=server.pid))
+            finally:
+                server.terminate()
+                server.wait()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
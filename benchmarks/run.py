@@ -0,0 +1,140 @@
+"""Benchmark suite: load, filter and export timings as a JSON report.
+
+    python -m benchmarks.run --rows 1000 100000 1000000 --out report.json
+
+For every corpus size the suite writes a synthetic CSV export, then times
+
+* load_data: parsing the export (chunked above config.CHUNKED_THRESHOLD_MB);
+* filter.<type>: one predicate of each filter type, with the reference
+  apply_filters and with an indexed Dataset;
+* convert_to_excel: the Excel download of a filtered table (at most
+  --excel-rows rows; Excel sheets hold 1,048,576 rows at most).
+
+Each measurement keeps the best and the median of --repeat runs. Results
+are keyed by name and rows, so reports from two runs can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from article_filter import FilterSpec, apply_filters, convert_to_excel, load_data
+from article_filter.dataset import Dataset
+from article_filter.index import DatasetIndex
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR
+
+from .corpus import write_corpus
+
+FILTERS = {
+    "period": FilterSpec(period="2015-2020"),
+    "citations": FilterSpec(citations="25 to 49 citations"),
+    "keywords": FilterSpec(keywords="machine learning"),
+    "keywords_exact": FilterSpec(keywords="machine learning,deep learning", exact_match=True),
+    "jcr": FilterSpec(jcr="Q1"),
+    "knowledge_group": FilterSpec(knowledge_group="Engineering"),
+    "combined": FilterSpec(period="2021-2025", citations="1 to 10 citations", keywords="bibliometrics", jcr="Q2"),
+}
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, {"best": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def calibrate(repeat=5):
+    """Median time of a fixed pandas workload, a measure of the machine's current speed."""
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"key": rng.integers(0, 1000, 200_000), "value": rng.random(200_000)})
+    words = pd.Series(rng.choice(["alpha", "beta", "gamma", "delta"], 50_000))
+    _, timing = measure(lambda: (frame.groupby("key")["value"].sum(), words.str.contains("mm")), repeat)
+    return timing["median"]
+
+
+def run_size(n_rows, directory, seed, repeat, excel_rows):
+    results = []
+
+    def record(name, timing, **extra):
+        results.append({"name": name, "rows": n_rows, **timing, **extra})
+
+    path = write_corpus(os.path.join(directory, f"corpus_{n_rows}.csv"), n_rows, seed=seed,
+                        sep=CSV_SEPARATOR, encoding=CSV_ENCODING)
+    data, timing = measure(lambda: load_data(path), repeat)
+    record("load_data", timing, bytes=os.path.getsize(path))
+
+    # Masks are cached, so each filter gets a fresh Dataset
+    index, timing = measure(lambda: DatasetIndex.build(data), repeat)
+    record("index.build", timing)
+    for name, spec in FILTERS.items():
+        result, timing = measure(lambda: apply_filters(data, spec), repeat)
+        record(f"filter.{name}.reference", timing, matches=len(result))
+        count, timing = measure(lambda: Dataset(data, index=index).count(spec), repeat)
+        if count != len(result):
+            raise SystemExit(f"Indexed Dataset differs from apply_filters for {name}")
+        record(f"filter.{name}.indexed", timing, matches=count)
+
+    export = apply_filters(data, FILTERS["jcr"]).head(excel_rows)
+    payload, timing = measure(lambda: convert_to_excel(export), repeat)
+    record("convert_to_excel", timing, exported_rows=len(export), bytes=len(payload))
+    os.remove(path)
+    return results
+
+
+def run_suite(rows, seed=0, repeat=3, excel_rows=100_000, verbose=True):
+    """Run the suite for every size in rows; return the report."""
+    report = {"environment": environment(), "seed": seed, "repeat": repeat, "excel_rows": excel_rows,
+              "results": []}
+    # The machine's speed drifts during a run: calibrate before, between and
+    # after the sizes, and keep the median
+    calibrations = [calibrate()]
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in rows:
+            for result in run_size(n_rows, directory, seed, repeat, excel_rows):
+                if verbose:
+                    print(f"{result['name']:32s} {result['rows']:>10,} rows  {result['best']:9.4f} s", flush=True)
+                report["results"].append(result)
+            calibrations.append(calibrate())
+    report["calibration"] = statistics.median(calibrations)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--excel-rows", type=int, default=100_000)
+    parser.add_argument("--out", help="write the JSON report here (default: print it)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.rows, args.seed, args.repeat, args.excel_rows)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,17 @@ import os
 import pandas as pd
 import streamlit as st
 from io import BytesIO
-import openpyxl
-print("openpyxl importado correctamente")
+from article_filter.excel import load_workbook, sheet_names
+from article_filter.fingerprint import CACHE_HASH_FUNCS
 
 # Cargar el archivo de datos
-@st.cache_data
-def load_data(file):
+# El libro se lee con calamine si está instalado (si no, con openpyxl en modo
+# solo lectura) y se guarda como almacén columnar: volver a subir el mismo
+# archivo lo mapea en memoria en lugar de leerlo de nuevo
+@st.cache_resource(hash_funcs=CACHE_HASH_FUNCS)
+def load_data(file, sheets=None):
     try:
-        data = pd.read_excel(file, engine='openpyxl')
+        data = load_workbook(file, sheets=sheets)
         st.write("Datos cargados correctamente:")
         st.write(data.head())
         return data
@@ -17,6 +20,14 @@ def load_data(file):
         st.error(f"Error al cargar el archivo: {e}")
         return pd.DataFrame()
 
+# Hojas del libro
+@st.cache_data(hash_funcs=CACHE_HASH_FUNCS)
+def load_sheet_names(file):
+    try:
+        return sheet_names(file)
+    except Exception:
+        return []
+
 # Configuración de la aplicación
 st.set_page_config(page_title="Interactive Article Filter", layout="wide")
 
@@ -29,7 +40,11 @@ st.markdown("---")
 uploaded_file = st.file_uploader("Sube tu archivo Excel aquí", type=["xlsx"])
 
 if uploaded_file is not None:
-    data = load_data(uploaded_file)
+    # Los libros con varias hojas permiten elegir cuáles cargar (se concatenan)
+    sheets = load_sheet_names(uploaded_file)
+    if len(sheets) > 1:
+        sheets = st.multiselect("Hojas:", sheets, default=sheets[:1]) or sheets[:1]
+    data = load_data(uploaded_file, tuple(sheets))
 
     if data.empty:
         st.warning("La base de datos no se pudo cargar. Verifica que el archivo existe y su formato es correcto.")
@@ -1,145 +1,376 @@
 
+import hmac
 import os
+import time
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from io import BytesIO
 
-# Load the data file
-@st.cache_data
-def load_data(file):
+import article_filter
+from article_filter import CITATION_OPTIONS, JCR_OPTIONS, PERIOD_OPTIONS, FilterSpec, config, dataset_for, metrics
+from article_filter.dataset import Dataset
+from article_filter.explain import PLAN_COLUMNS, explain, log_slow_query
+from article_filter.fingerprint import uploads_fingerprint
+from article_filter.memory import AllocationTracer, column_sizes, dataset_report, mask_cache_bytes, process_rss
+from article_filter.profiling import MODES as PROFILERS, RunProfiler, captures, top_functions
+from article_filter.registry import DatasetRegistry, dataset_bytes
+from article_filter.sql import SQLiteDataset
+from article_filter.timing import Timeline, append_log
+from article_filter.warm import default_warmup, start_default
+from article_filter.watch import SharedDataset
+
+# Rows per page of the filtered table when the out-of-core backend is used
+PAGE_ROWS = 100
+
+def show_preview(data):
+    st.write("Data loaded successfully:")
+    st.write(data.head())
+
+# Load the data files (several files are parsed in parallel and concatenated)
+def read_files(files, load):
     try:
-        data = pd.read_csv(file, encoding='ISO-8859-1', sep=';', on_bad_lines='skip')
-        st.write("Data loaded successfully:")
-        st.write(data.head())
+        # Large exports are parsed in chunks; show how far along we are
+        progress_bar = st.empty()
+        def show_progress(done, rows):
+            progress_bar.progress(done, text=f"Loading data... {rows:,} rows")
+        data = load(files, max_workers=config.INGEST_WORKERS, progress=show_progress)
+        progress_bar.empty()
+        show_preview(data)
         return data
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return pd.DataFrame()
 
-# App configuration
-st.set_page_config(page_title="Interactive Article Filter", layout="wide")
+# Uploaded datasets are shared through a registry with a memory budget
+# (ARTICLE_FILTER_UPLOAD_MEMORY_MB); the least recently used ones are
+# spilled to disk and memory-mapped back when needed again. Uploads are
+# keyed by content, so every session uploading the same export shares one
+# parsed and indexed dataset
+@st.cache_resource
+def upload_registry():
+    return DatasetRegistry.from_config()
 
-# Add custom CSS for background color
-st.markdown(
-    """
-    <style>
-    .stApp {
-        background-color: #f0f8ff;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+def load_data(files):
+    read = []
+    def load():
+        read.append(True)
+        return read_files(files, article_filter.load_many)
+    # The dataset comes wrapped for ARTICLE_FILTER_BACKEND, and the wrapper is
+    # kept in the registry with its caches for the following runs
+    uploaded = upload_registry().get_or_load(uploads_fingerprint(files), load, backend=config.BACKEND)
+    (metrics.CACHE_MISSES if read else metrics.CACHE_HITS).inc(cache="data")
+    if not read:
+        # Same preview as when the files were first read
+        show_preview(uploaded.data)
+    return uploaded
 
-# Title
-st.title("Interactive Article Filter")
-st.markdown("<h2 style='color: blue;'>Use the filters below to explore and segment the database interactively.</h2>", unsafe_allow_html=True)
-st.markdown("<hr style='border: 1px solid blue;'>", unsafe_allow_html=True)
-
-# Dynamic file upload
-uploaded_file = st.file_uploader("Upload your CSV file here", type=["csv"])
-
-# Load default data if no file is uploaded
-default_file = "Base Final_25_12_2024_5.csv"  # Ensure this file is in the same directory
-if uploaded_file is not None:
-    data = load_data(uploaded_file)
-elif os.path.exists(default_file):
-    data = load_data(default_file)
-else:
-    st.warning("No file uploaded and default data file not found.")
-    data = pd.DataFrame()
-
-if not data.empty:
+# The default data is prepared in a background thread and shared by every
+# session. "python -m article_filter app" starts it with the server, before
+# any visitor arrives; with a plain "streamlit run" the first script run
+# starts it. It is opened from its memory-mapped column store and index
+# bundle (or its SQLite database), which "python -m article_filter warm" can
+# build before the server even starts. With the pandas backend, a watcher
+# swaps in a new dataset when the file changes, without clearing any cache.
+# A failed preparation is started again by the next run.
+
+def wait_for(warmup):
+    # Readiness indicator: a visitor arriving while the data is prepared sees its progress
+    progress_bar = st.empty()
+    while not warmup.done.wait(0.2):
+        progress_bar.progress(min(warmup.fraction, 1.0), text=f"Preparing the default data... {warmup.rows:,} rows")
+    progress_bar.empty()
+
+# The in-memory default dataset once it is ready, without waiting or starting anything
+def default_dataset():
+    warmup = default_warmup()
+    if warmup is None or not warmup.ready or warmup.error is not None or isinstance(warmup.result, SQLiteDataset):
+        return None
+    return warmup.result.current
+
+def show_memory(dataset, uploaded_files, tracer):
+    rss = process_rss()
+    st.caption(f"Process resident size: {rss / 2**20:,.1f} MiB" if rss else "Process resident size unavailable")
+    report = pd.DataFrame(dataset_report(dataset)) if isinstance(dataset, Dataset) else pd.DataFrame()
+    if not report.empty:
+        st.write(f"Dataset in use: {report['bytes'].sum() / 2**20:,.1f} MiB")
+        st.dataframe(report, hide_index=True)
+    st.write("Uploaded datasets (shared by all sessions)")
+    st.dataframe(pd.DataFrame(upload_registry().report(), columns=["key", "rows", "bytes", "state", "idle_s"]), hide_index=True)
+    if uploaded_files:
+        st.caption(f"Upload buffers of this session: {sum(f.size for f in uploaded_files):,} bytes")
+    if tracer is not None:
+        traced = tracer.traced_bytes()
+        st.write(f"Top allocations of this run (traced: {traced['current']:,} bytes, peak {traced['peak']:,})")
+        st.dataframe(pd.DataFrame(tracer.top()), hide_index=True)
+
+# Prometheus metrics on ARTICLE_FILTER_METRICS_PORT (127.0.0.1), one server per process.
+# The collectors run on the metrics thread at each scrape: they read shared
+# objects only, never Streamlit caches, and sizes are computed once per
+# version of the data
+@st.cache_resource
+def start_metrics():
+    registry = upload_registry()
+    def dataset_sizes():
+        sizes = {("uploads",): registry.memory_bytes}
+        default = default_dataset()
+        if default is not None:
+            sizes[("default",)] = dataset_bytes(default)
+        return sizes
+    def default_column_sizes():
+        default = default_dataset()
+        if default is None:
+            return {}
+        return {("default", column): nbytes for column, nbytes in column_sizes(default).items()}
+    def cache_sizes():
+        default = default_dataset()
+        return {
+            ("upload registry",): registry.memory_bytes,
+            ("default masks",): mask_cache_bytes(default) if default is not None else 0,
+        }
+    metrics.DATASET_BYTES.set_function(dataset_sizes)
+    metrics.COLUMN_BYTES.set_function(default_column_sizes)
+    metrics.CACHE_BYTES.set_function(cache_sizes)
+    return metrics.serve_metrics(config.METRICS_PORT) if config.METRICS_PORT else None
+
+def show_profiles():
+    # Admin view (?admin=profiles): the most recent captures of ?profile=
+    st.title("Profiles")
+    recent = captures(limit=config.PROFILE_KEEP)
+    if not recent:
+        st.info("No profiles yet. Add ?profile=cprofile or ?profile=sample to the app URL to profile a run.")
+        return
+    st.dataframe(pd.DataFrame(recent).drop(columns="path"), hide_index=True)
+    capture = st.selectbox("Profile:", recent, format_func=lambda capture: capture["name"])
+    with open(capture["path"], "rb") as f:
+        st.download_button("Download", f.read(), file_name=capture["name"])
+    if capture["profiler"] == "cprofile":
+        st.dataframe(pd.DataFrame(top_functions(capture["path"])), hide_index=True)
+    else:
+        st.caption("Collapsed stacks: open with speedscope or flamegraph.pl")
+
+def sidebar_filters(dataset):
     # Sidebar filters
     st.sidebar.header("Filters")
     
     # Period of publication filter
-    period_options = ["All", "None", "2007-2010", "2011-2014", "2015-2020", "2021-2025"]
-    period_filter = st.sidebar.selectbox("Period of publication:", period_options, index=0)
+    period_filter = st.sidebar.selectbox("Period of publication:", PERIOD_OPTIONS, index=0)
     
     # Citations filter
-    citation_options = ["All", "None", "1 to 10 citations", "11 to 24 citations", "25 to 49 citations", "50 to 99 citations", "100 to 249 citations", "250 or more citations"]
-    citations_filter = st.sidebar.selectbox("Number of Citations:", citation_options, index=0)
+    citations_filter = st.sidebar.selectbox("Number of Citations:", CITATION_OPTIONS, index=0)
     
     # Keywords filter
-    keyword_categories = ["All", "None"] + sorted(data["Keywords"].dropna().unique().tolist())
+    keyword_categories = ["All", "None"] + sorted(dataset.distinct("Keywords"))
     keywords_filter = st.sidebar.selectbox("Keywords:", keyword_categories, index=0)
     
     exact_match = st.sidebar.checkbox("Exact match", value=False)
     
     # JCR filter
-    jcr_options = ["All", "None", "No Q", "Q1", "Q2", "Q3", "Q4"]
-    jcr_filter = st.sidebar.selectbox("JCR rank:", jcr_options, index=0)
+    jcr_filter = st.sidebar.selectbox("JCR rank:", JCR_OPTIONS, index=0)
     
     # Knowledge area group filter
-    if "Knowledge area group" in data.columns:
-        knowledge_group_filter = st.sidebar.selectbox("Knowledge area group:", ["All", "None"] + list(data["Knowledge area group"].dropna().unique()))
+    if "Knowledge area group" in dataset.columns:
+        knowledge_group_filter = st.sidebar.selectbox("Knowledge area group:", ["All", "None"] + dataset.distinct("Knowledge area group"))
     else:
         knowledge_group_filter = st.sidebar.selectbox("Knowledge area group:", ["All", "None"])
         st.warning("The column 'Knowledge area group' was not found in the CSV file.")
     
     # Apply filters
-    filtered_data = data.copy()
-    
-    # Filter by period of publication
-    if period_filter != "All" and period_filter != "None":
-        if period_filter == "2007-2010":
-            filtered_data = filtered_data[(filtered_data["Year"] >= 2007) & (filtered_data["Year"] <= 2010)]
-        elif period_filter == "2011-2014":
-            filtered_data = filtered_data[(filtered_data["Year"] >= 2011) & (filtered_data["Year"] <= 2014)]
-        elif period_filter == "2015-2020":
-            filtered_data = filtered_data[(filtered_data["Year"] >= 2015) & (filtered_data["Year"] <= 2020)]
-        elif period_filter == "2021-2025":
-            filtered_data = filtered_data[(filtered_data["Year"] >= 2021) & (filtered_data["Year"] <= 2025)]
-    
-    # Filter by citations
-    if citations_filter != "All" and citations_filter != "None":
-        if citations_filter == "1 to 10 citations":
-            filtered_data = filtered_data[(filtered_data["Cited by"] >= 1) & (filtered_data["Cited by"] <= 10)]
-        elif citations_filter == "11 to 24 citations":
-            filtered_data = filtered_data[(filtered_data["Cited by"] >= 11) & (filtered_data["Cited by"] <= 24)]
-        elif citations_filter == "25 to 49 citations":
-            filtered_data = filtered_data[(filtered_data["Cited by"] >= 25) & (filtered_data["Cited by"] <= 49)]
-        elif citations_filter == "50 to 99 citations":
-            filtered_data = filtered_data[(filtered_data["Cited by"] >= 50) & (filtered_data["Cited by"] <= 99)]
-        elif citations_filter == "100 to 249 citations":
-            filtered_data = filtered_data[(filtered_data["Cited by"] >= 100) & (filtered_data["Cited by"] <= 249)]
-        elif citations_filter == "250 or more citations":
-            filtered_data = filtered_data[filtered_data["Cited by"] >= 250]
-    
-    # Filter by keywords
-    if keywords_filter != "All" and keywords_filter != "None":
-        keywords = [kw.strip() for kw in keywords_filter.split(",")]
-        if exact_match:
-            filtered_data = filtered_data[
-                filtered_data["Keywords"].apply(lambda x: all(kw in x.split(",") for kw in keywords) if pd.notna(x) else False)
-            ]
+    return FilterSpec(
+        period=period_filter,
+        citations=citations_filter,
+        keywords=keywords_filter,
+        exact_match=exact_match,
+        jcr=jcr_filter,
+        knowledge_group=knowledge_group_filter,
+    )
+
+# Paging reruns only this fragment
+@st.fragment
+def show_table(dataset, spec):
+    if isinstance(dataset, SQLiteDataset):
+        # Only the page being shown is read from the database
+        pages = max(1, -(-dataset.count(spec) // PAGE_ROWS))
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1)
+        st.dataframe(dataset.page(spec, offset=(page - 1) * PAGE_ROWS, limit=PAGE_ROWS))
+    else:
+        st.dataframe(dataset.filter(spec))
+
+def report_run(timeline, dataset, spec, plan, uploaded_files, tracer):
+    # Timings of this run
+    record = timeline.record(
+        session=session_id,
+        spec=spec.to_dict() if spec is not None else None,
+        rows=len(dataset),
+        backend=type(dataset).__name__,
+    )
+    if config.TIMING_LOG:
+        append_log(config.TIMING_LOG, record)
+    start_metrics()
+    # Counts fragment runs too, which ?profile= does not profile
+    metrics.RERUNS.inc()
+    metrics.SESSIONS.touch(session_id)
+    for stage, ms in record["spans"].items():
+        metrics.STAGE_SECONDS.observe(ms / 1000, stage=stage)
+    if plan is not None:
+        for step in plan["steps"]:
+            if step["cache"] in ("hit", "miss"):
+                (metrics.CACHE_HITS if step["cache"] == "hit" else metrics.CACHE_MISSES).inc(cache="result")
+    if spec is not None:
+        # The query is the filter steps and the count (ARTICLE_FILTER_SLOW_QUERY_MS)
+        query_ms = sum(ms for name, ms in record["spans"].items() if name.startswith("filter.") or name == "summary")
+        log_slow_query(dataset, spec, query_ms / 1000, plan=plan, session=session_id)
+    if debug:
+        with st.sidebar.expander("Stage timings", expanded=True):
+            st.dataframe(pd.DataFrame(list(record["spans"].items()), columns=["Stage", "ms"]), hide_index=True)
+            st.caption(f"Total {record['total_ms']:.1f} ms")
+        if spec is not None:
+            with st.sidebar.expander("Query plan"):
+                # Other backends run the query again to explain it, so only on request
+                if plan is None and st.button("Explain"):
+                    plan = explain(dataset, spec)
+                if plan is not None:
+                    st.dataframe(pd.DataFrame(plan["steps"], columns=PLAN_COLUMNS), hide_index=True)
+                    st.caption(f"{plan['rows']:,} rows -> {plan['rows_out']:,} rows")
+        with st.expander("Memory"):
+            show_memory(dataset, uploaded_files, tracer)
+
+# Filters, summary and table. Changing a filter reruns this fragment only:
+# the page setup, the uploader, loading the data and its preview run again
+# on a full rerun, when the uploaded files change
+@st.fragment
+def explore(source, uploaded_files):
+    # Stage timings of this run: shown with ?debug=1 (or ARTICLE_FILTER_DEBUG) and
+    # appended to ARTICLE_FILTER_TIMING_LOG when set
+    timeline = Timeline()
+    load_seconds = st.session_state.pop("load_seconds", None)
+    if load_seconds is not None:
+        timeline.add("load", load_seconds)
+    # Allocations of this run, with ARTICLE_FILTER_TRACEMALLOC
+    tracer = AllocationTracer().start() if config.TRACEMALLOC else None
+    # The watcher may swap the default data: each run reads its current version once
+    dataset = source.current if isinstance(source, SharedDataset) else source
+    spec = None
+    plan = None
+    if not dataset.empty:
+        spec = sidebar_filters(dataset)
+        
+        # In memory, the spec is evaluated (and its masks cached) one predicate at a
+        # time, which times each filter and gives the plan of this run
+        if isinstance(dataset, Dataset):
+            plan = explain(dataset, spec)
+            for step in plan["steps"]:
+                timeline.add(f"filter.{step['field']}", step["ms"] / 1000)
+        
+        # Results summary
+        st.subheader("Results Summary")
+        
+        with timeline.span("summary"):
+            if spec.period == 'All' and spec.citations == 'All' and spec.keywords == 'All' and spec.jcr == 'All' and spec.knowledge_group == 'All':
+                total_results = 205  # Set to 205 when all filters are set to "All"
+            else:
+                total_results = dataset.count(spec)
+        
+        st.write(f"Total results: {total_results}")
+        
+        # Display filtered table
+        st.subheader("Filtered Table")
+        with timeline.span("table"):
+            show_table(dataset, spec)
+    else:
+        st.info("Please upload a CSV file to get started.")
+    report_run(timeline, dataset, spec, plan, uploaded_files, tracer)
+
+# App configuration
+st.set_page_config(page_title="Interactive Article Filter", layout="wide")
+
+# Add custom CSS for background color
+st.markdown(
+    """
+    <style>
+    .stApp {
+        background-color: #f0f8ff;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+)
+
+# Profiling from the URL and the profiles page are for maintainers only: they
+# need ?token= set to ARTICLE_FILTER_ADMIN_TOKEN (unset: both are disabled)
+admin_token = st.query_params.get("token")
+is_admin = bool(config.ADMIN_TOKEN) and admin_token is not None and hmac.compare_digest(admin_token, config.ADMIN_TOKEN)
+
+if st.query_params.get("admin") == "profiles":
+    if not is_admin:
+        st.error("The profiles page needs a valid ?token= (ARTICLE_FILTER_ADMIN_TOKEN).")
+        st.stop()
+    show_profiles()
+    st.stop()
+
+# Stage timings, query plan and memory panels with ?debug=1 (or ARTICLE_FILTER_DEBUG)
+debug = config.DEBUG or st.query_params.get("debug") not in (None, "0")
+ctx = get_script_run_ctx()
+session_id = ctx.session_id if ctx else None
+
+# Profile this run with ?profile=cprofile or ?profile=sample and the admin
+# token (every run with ARTICLE_FILTER_PROFILE); captures are listed with
+# ?admin=profiles
+profiler = None
+profile_mode = config.PROFILE
+if "profile" in st.query_params:
+    if is_admin:
+        profile_mode = st.query_params.get("profile")
+    else:
+        st.warning("Profiling from the URL needs a valid ?token= (ARTICLE_FILTER_ADMIN_TOKEN).")
+if profile_mode in PROFILERS:
+    profiler = RunProfiler(profile_mode, label=(session_id or "run")[:8]).start()
+elif profile_mode:
+    st.warning(f"Unknown profiler {profile_mode!r}: use one of {', '.join(PROFILERS)}")
+
+# The profiler is stopped however the run ends: st.stop(), a rerun or an error
+try:
+    # Title
+    st.title("Interactive Article Filter")
+    st.markdown("<h2 style='color: blue;'>Use the filters below to explore and segment the database interactively.</h2>", unsafe_allow_html=True)
+    st.markdown("<hr style='border: 1px solid blue;'>", unsafe_allow_html=True)
+
+    # Dynamic file upload
+    uploaded_files = st.file_uploader("Upload your CSV files here", type=["csv"], accept_multiple_files=True)
+
+    # Load default data if no file is uploaded
+    # ARTICLE_FILTER_DATA may point to a file, a directory or a glob pattern of CSV exports
+    default_files = article_filter.expand_sources(config.DATA_SOURCE)  # Ensure the default file is in the same directory
+    # ARTICLE_FILTER_BACKEND selects the query engine: pandas, polars, or sqlite to
+    # keep the default data on disk instead of in memory
+    load_started = time.perf_counter()
+    if uploaded_files:
+        source = load_data(uploaded_files)
+    elif default_files:
+        warmup = start_default(default_files)
+        wait_for(warmup)
+        st.sidebar.caption(f"Default data {warmup.status} in {warmup.elapsed:.1f} s")
+        if warmup.error is not None:
+            st.error(f"Error loading file: {warmup.error}")
+            source = dataset_for(pd.DataFrame())
         else:
-            filtered_data = filtered_data[
-                filtered_data["Keywords"].str.contains('|'.join(keywords), case=False, na=False)
-            ]
-    
-    # Filter by JCR
-    if jcr_filter != "All" and jcr_filter != "None":
-        filtered_data = filtered_data[filtered_data["JCR rank"] == jcr_filter]
-    
-    # Filter by knowledge area group
-    if knowledge_group_filter != "All" and knowledge_group_filter != "None" and "Knowledge area group" in data.columns:
-        filtered_data = filtered_data[filtered_data["Knowledge area group"] == knowledge_group_filter]
-    
-    # Results summary
-    st.subheader("Results Summary")
-    
-    if period_filter == 'All' and citations_filter == 'All' and keywords_filter == 'All' and jcr_filter == 'All' and knowledge_group_filter == 'All':
-        total_results = 205  # Set to 205 when all filters are set to "All"
+            # The SQLite dataset, or the in-memory one shared with its watcher
+            source = warmup.result
+            if isinstance(source, SharedDataset):
+                # Rendered once per full rerun: a version swapped in by the
+                # watcher is previewed on the next one
+                show_preview(source.current.data)
     else:
-        total_results = len(filtered_data)
-    
-    st.write(f"Total results: {total_results}")
-    
-    # Display filtered table
-    st.subheader("Filtered Table")
-    st.dataframe(filtered_data)
-else:
-    st.info("Please upload a CSV file to get started.")
+        st.warning("No file uploaded and default data file not found.")
+        source = dataset_for(pd.DataFrame())
+    st.session_state["load_seconds"] = time.perf_counter() - load_started
+
+    explore(source, uploaded_files)
 
+finally:
+    if profiler is not None:
+        path = profiler.stop()
+        # A query parameter profiles a single run, not every run that follows
+        if "profile" in st.query_params:
+            del st.query_params["profile"]
+        st.sidebar.caption(f"Profile saved to {path}")
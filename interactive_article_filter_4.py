@@ -4,8 +4,10 @@ import pandas as pd
 import streamlit as st
 from io import BytesIO
 
+from article_filter.fingerprint import CACHE_HASH_FUNCS
+
 # Cargar el archivo de datos
-@st.cache_data
+@st.cache_data(hash_funcs=CACHE_HASH_FUNCS)
 def load_data(file):
     try:
         data = pd.read_csv(file, encoding='ISO-8859-1', sep=';', on_bad_lines='skip')
@@ -0,0 +1,92 @@
+import random
+import threading
+
+import numpy as np
+import pandas as pd
+
+from article_filter.batch import BatchExecutor
+from article_filter.filters import FilterSpec, Predicate, apply_filters, predicate_mask
+
+N_ROWS = 1000
+
+
+def frame():
+    return pd.DataFrame({
+        "Title": [f"Article {i}" for i in range(N_ROWS)],
+        "Year": [2005 + i % 20 for i in range(N_ROWS)],
+        "Cited by": [i % 300 for i in range(N_ROWS)],
+        "Keywords": [f"kw{i % 7},kw{i % 11}" for i in range(N_ROWS)],
+        "JCR rank": ["Q1", "Q2", "Q3", "Q4", "No Q"] * (N_ROWS // 5),
+    })
+
+
+def keyword(i):
+    return Predicate("keywords", f"kw{i}")
+
+
+def cached(executor):
+    return list(executor._masks)
+
+
+def test_least_recently_used_mask_is_evicted_first():
+    # Room for three masks of N_ROWS booleans
+    executor = BatchExecutor(frame(), max_bytes=3 * N_ROWS)
+    for i in range(3):
+        executor.mask(keyword(i))
+    assert cached(executor) == [keyword(0), keyword(1), keyword(2)]
+
+    executor.mask(keyword(0))
+    assert cached(executor) == [keyword(1), keyword(2), keyword(0)]
+    assert (executor.hits, executor.misses) == (1, 3)
+
+    executor.mask(keyword(3))
+    assert cached(executor) == [keyword(2), keyword(0), keyword(3)]
+    executor.mask(keyword(1))
+    assert cached(executor) == [keyword(0), keyword(3), keyword(1)]
+    assert (executor.hits, executor.misses) == (1, 5)
+
+
+def test_cache_stays_within_max_bytes():
+    executor = BatchExecutor(frame(), max_bytes=5 * N_ROWS + N_ROWS // 2)
+    for i in range(11):
+        executor.mask(keyword(i))
+        assert executor.cache_bytes() <= executor.max_bytes
+    assert executor.cache_len() == 5
+    assert executor.cache_bytes() == 5 * N_ROWS
+
+    # A mask larger than the whole cache is computed but not kept
+    small = BatchExecutor(frame(), max_bytes=N_ROWS - 1)
+    assert small.mask(keyword(1)).sum() == len(apply_filters(frame(), FilterSpec(keywords="kw1")))
+    assert (small.cache_len(), small.cache_bytes()) == (0, 0)
+
+
+def test_concurrent_lookups_keep_the_cache_consistent():
+    data = frame()
+    predicates = [keyword(i) for i in range(11)] + [
+        Predicate("jcr", rank) for rank in ("Q1", "Q2", "Q3", "Q4", "No Q")
+    ] + [Predicate("period", period) for period in ("2007-2010", "2011-2014", "2015-2020", "2021-2025")]
+    expected = {p: predicate_mask(data, p).to_numpy(dtype=bool) for p in predicates}
+    executor = BatchExecutor(data, max_bytes=6 * N_ROWS)
+    calls = 300
+    errors = []
+    start = threading.Barrier(8)
+
+    def session(seed):
+        rng = random.Random(seed)
+        start.wait()
+        for _ in range(calls):
+            predicate = rng.choice(predicates)
+            if not np.array_equal(executor.mask(predicate), expected[predicate]):
+                errors.append(predicate)
+
+    threads = [threading.Thread(target=session, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert executor.hits + executor.misses == 8 * calls
+    assert executor.cache_bytes() <= executor.max_bytes
+    assert executor.cache_bytes() == sum(mask.nbytes for mask, _ in executor._masks.values())
+    assert executor.cache_len() == len(executor._masks)
@@ -0,0 +1,18 @@
+"""The benchmark regression gate (benchmarks.compare) as a test: python -m pytest --benchmarks."""
+
+import pytest
+
+from benchmarks import compare
+from benchmarks.run import environment
+
+
+@pytest.mark.benchmark
+def test_no_regressions_against_baseline():
+    baseline = compare.load_baseline()
+    if baseline is None:
+        pytest.skip(f"No baseline at {compare.BASELINE}: create one with python -m benchmarks.compare --update")
+    differences = compare.environment_differences(baseline, {"environment": environment()})
+    if differences:
+        pytest.skip("The baseline comes from another environment (" + ", ".join(differences) + "); "
+                    "refresh it with python -m benchmarks.compare --update")
+    assert compare.main([]) == 0
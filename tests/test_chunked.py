@@ -0,0 +1,70 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from article_filter.chunked import read_chunked
+from article_filter.io import READ_OPTIONS
+
+N_ROWS = 60
+
+
+def cited_by(i):
+    # Integers, then decimals and missing values after the first chunks
+    return str(i) if i < 20 else "" if i % 3 == 0 else f"{i}.5"
+
+
+def code(i):
+    # Integers, with a single text value in a later chunk
+    return f"X{i}" if i == 45 else str(i)
+
+
+def label(i):
+    # Text in the first chunk, chunks of numbers and booleans later
+    return f"L{i}" if i < 8 else str(i * 1000) if i < 30 else "True" if i % 2 else "False"
+
+
+def group(i):
+    # Few distinct values (a categorical column), numeric in one chunk
+    return ["Q1", "Q2"][i % 2] if i < 16 or i >= 24 else "007"
+
+
+def export(path):
+    lines = ["Title;Year;Cited by;Code;Label;Group"]
+    lines += [f"Article {i};{2000 + i % 9};{cited_by(i)};{code(i)};{label(i)};{group(i)}" for i in range(N_ROWS)]
+    with open(path, "w", encoding=READ_OPTIONS["encoding"]) as f:
+        f.write("\n".join(lines) + "\n")
+    return str(path)
+
+
+def values(frame):
+    return {name: [None if pd.isna(v) else v for v in frame[name].astype(object)] for name in frame.columns}
+
+
+@pytest.mark.parametrize("chunk_rows", [8, 25, 1000])
+def test_widening_columns_match_read_csv(tmp_path, chunk_rows):
+    path = export(tmp_path / "export.csv")
+    expected = pd.read_csv(path, **READ_OPTIONS)
+    result = read_chunked(path, chunk_rows=chunk_rows, **READ_OPTIONS)
+    assert list(result.columns) == list(expected.columns)
+    assert values(result) == values(expected)
+    assert result["Code"].tolist()[:3] == ["0", "1", "2"]
+    assert result["Label"].tolist()[8] == "8000"
+
+
+def test_file_objects_are_read_again_from_the_start(tmp_path):
+    path = export(tmp_path / "export.csv")
+    expected = pd.read_csv(path, **READ_OPTIONS)
+    with open(path, "rb") as f:
+        content = f.read()
+    for source in (content, BytesIO(content)):
+        assert values(read_chunked(source, chunk_rows=8, **READ_OPTIONS)) == values(expected)
+
+
+def test_int_column_widens_to_float(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text("Title;Cited by\n" + "".join(f"T{i};{i if i < 10 else i + 0.25}\n" for i in range(30)))
+    result = read_chunked(str(path), chunk_rows=10, **READ_OPTIONS)
+    expected = pd.read_csv(path, **READ_OPTIONS)
+    assert result["Cited by"].dtype.kind == "f"
+    assert result["Cited by"].tolist() == expected["Cited by"].tolist()
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from article_filter import cli
+from article_filter.io import CSV_ENCODING
+
+CSV = "Title;Year;Cited by;Keywords;JCR rank\nA;2016;3;Scopus,h-index;Q1\nB;2009;0;open science;Q2\n"
+
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV, encoding=CSV_ENCODING)
+    return str(path)
+
+
+def run(tmp_path, data, name, text):
+    spec = tmp_path / name
+    spec.write_text(text, encoding="utf-8")
+    return cli.main(["filter", str(spec), "--data", data, "--count-only", "--backend", "pandas"])
+
+
+def test_filter_counts(tmp_path, data, capsys):
+    assert run(tmp_path, data, "s.json", json.dumps({"keywords": "Scopus", "exact_match": True})) == 0
+    assert capsys.readouterr().out.split() == ["s", "1"]
+
+
+@pytest.mark.parametrize("spec", [{"keywords": 5}, {"exact_match": "false"}, {"jcr": ["Q1"]}])
+def test_bad_json_spec_is_an_error_not_a_traceback(tmp_path, data, capsys, spec):
+    assert run(tmp_path, data, "bad.json", json.dumps(spec)) == 1
+    assert "article_filter: error: Filter field" in capsys.readouterr().err
+
+
+def test_bad_yaml_spec_is_an_error_not_a_traceback(tmp_path, data, capsys):
+    pytest.importorskip("yaml")
+    assert run(tmp_path, data, "bad.yaml", "keywords: 2020\n") == 1
+    assert "'keywords' must be a string" in capsys.readouterr().err
@@ -0,0 +1,106 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from article_filter import colstore
+from article_filter.colstore import UnsupportedColumn, load_cached, open_store, read_manifest, write_store
+from article_filter.io import CSV_SEPARATOR
+
+
+def frame():
+    return pd.DataFrame({
+        "Title": ["Café", "naïve", None, "", "Ω"],
+        "Year": [2005, 2010, 2015, 2020, 2025],
+        "Cited by": [1.5, np.nan, 3.0, 0.0, 250.0],
+        "Open": [True, False, True, True, False],
+        "JCR rank": pd.Categorical(["Q1", "Q2", None, "Q1", "No Q"], categories=["Q1", "Q2", "No Q"], ordered=True),
+        "Level": pd.Categorical([1, 2, 1, 3, 2]),
+    })
+
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if ".tmp-" in name or ".old-" in name]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "store")
+    write_store(frame(), path, "fp")
+    data = open_store(path)
+    assert read_manifest(path)["fingerprint"] == "fp"
+    for name in ["Year", "Cited by", "Open"]:
+        np.testing.assert_array_equal(data[name].to_numpy(), frame()[name].to_numpy())
+        assert data[name].dtype == frame()[name].dtype
+    assert data["Title"].tolist()[:2] == ["Café", "naïve"] and pd.isna(data["Title"][2]) and data["Title"][3] == ""
+    assert data["JCR rank"].cat.ordered and list(data["JCR rank"].cat.categories) == ["Q1", "Q2", "No Q"]
+    assert data["JCR rank"].isna().tolist() == [False, False, True, False, False]
+    assert list(data["Level"].cat.categories) == [1, 2, 3]
+    assert not leftovers(tmp_path)
+
+
+def test_text_columns_map_as_large_strings(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    path = str(tmp_path / "store")
+    write_store(frame(), path, "fp")
+    array = open_store(path)["Title"].array
+    assert isinstance(array, pd.arrays.ArrowStringArray)
+    assert array._pa_array.type == pa.large_string()
+
+
+def test_unsupported_column_writes_nothing(tmp_path):
+    path = str(tmp_path / "store")
+    with pytest.raises(UnsupportedColumn):
+        write_store(pd.DataFrame({"x": [{"a": 1}, None]}), path, "fp")
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_write_leaves_no_temporary_directory(tmp_path, monkeypatch):
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(colstore, "write_text", fail)
+    with pytest.raises(OSError):
+        write_store(frame(), str(tmp_path / "store"), "fp")
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_writers_leave_one_valid_store(tmp_path):
+    path = str(tmp_path / "store")
+    write_store(frame(), path, "old")
+    errors = []
+
+    def write(i):
+        try:
+            write_store(frame(), path, "new")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert read_manifest(path)["fingerprint"] == "new"
+    assert open_store(path)["Year"].tolist() == frame()["Year"].tolist()
+    assert leftovers(tmp_path) == []
+
+
+def test_stale_source_rebuilds_the_store(tmp_path):
+    source = str(tmp_path / "data.csv")
+    frame().drop(columns=["JCR rank", "Level"]).to_csv(source, sep=CSV_SEPARATOR, index=False, encoding="utf-8")
+    loads = []
+
+    def load(paths):
+        loads.append(paths)
+        return pd.read_csv(paths[0], sep=CSV_SEPARATOR, encoding="utf-8")
+
+    assert len(load_cached([source], load)) == 5
+    assert len(load_cached([source], load)) == 5
+    assert len(loads) == 1
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("Extra;2026;1.0;True\n")
+    assert len(load_cached([source], load)) == 6
+    assert len(loads) == 2
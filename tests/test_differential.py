@@ -0,0 +1,52 @@
+"""Every query engine, over every frame the app may load, against the app's original filters.
+
+A few small random exports per seed; python -m benchmarks.differential runs
+as many cases as wanted. A failure shows the seed, case and spec, and the
+command running that case alone.
+"""
+
+import importlib.util
+import json
+
+import pytest
+
+from benchmarks import differential
+from benchmarks.differential import ENGINES, FRAMES, main, run_case
+
+CASES = 3
+ROWS = 200
+SPECS = 15
+
+AVAILABLE_ENGINES = [
+    engine for engine in ENGINES if engine != "polars" or importlib.util.find_spec("polars") is not None
+]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engines_match_reference(seed, tmp_path):
+    failures = []
+    for case in range(CASES):
+        failures += run_case(case, str(tmp_path), seed, ROWS, SPECS, AVAILABLE_ENGINES, FRAMES)
+    assert not failures, "\n\n".join(failures[:5])
+
+
+def test_failures_tell_how_to_reproduce_them(tmp_path, monkeypatch, capsys):
+    titles = differential.engine_titles
+
+    def drop_last_row(engine, data, path, specs):
+        results = titles(engine, data, path, specs)
+        return [result[:-1] for result in results] if engine == "batch" else results
+
+    monkeypatch.setattr(differential, "engine_titles", drop_last_row)
+    failures = run_case(1, str(tmp_path), 7, ROWS, SPECS, ["dataset", "batch"], ["read_csv"])
+    assert failures
+    first, *_, last = failures[0].splitlines()
+    assert first.startswith("seed 7, case 1, batch on the read_csv frame: {")
+    assert "period" in json.loads(first.split(": ", 1)[1])
+    command = ("python -m benchmarks.differential --seed 7 --case 1 --rows 200 --specs 15 "
+               "--engines dataset batch --frames read_csv")
+    assert last == f"reproduce with: {command}"
+
+    # The command runs that case alone, and finds the same difference
+    assert main(command.split()[3:]) == 1
+    assert capsys.readouterr().out.startswith(failures[0])
@@ -0,0 +1,126 @@
+import os
+import time
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from article_filter import config, excel
+from article_filter.colstore import MANIFEST
+from article_filter.excel import excel_engine, load_workbook, prune_stores, read_workbook, sheet_names
+
+pytest.importorskip("openpyxl")
+
+ENGINES = ["openpyxl", "calamine"]
+
+
+def frame(n=50, offset=0):
+    return pd.DataFrame({
+        "Title": [f"Article {offset + i}" for i in range(n)],
+        "Year": [2005 + i % 20 for i in range(n)],
+        "Cited by": [float(i) if i % 4 else None for i in range(n)],
+        "JCR rank": ["Q1", "Q2"] * (n // 2),
+    })
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / "export.xlsx")
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        frame().to_excel(writer, sheet_name="2023", index=False)
+        frame(20, offset=50).drop(columns="JCR rank").to_excel(writer, sheet_name="2024", index=False)
+    return path
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "cache")
+    monkeypatch.setattr(config, "EXCEL_CACHE_DIR", directory)
+    return directory
+
+
+def engine(name):
+    if name == "calamine":
+        pytest.importorskip("python_calamine")
+    return name
+
+
+def values(data):
+    return {name: [None if pd.isna(v) else v for v in data[name].astype(object)] for name in data.columns}
+
+
+def test_excel_engine():
+    assert excel_engine("openpyxl") == "openpyxl"
+    assert excel_engine("auto") in excel.ENGINES
+    with pytest.raises(ValueError, match="xlrd"):
+        excel_engine("xlrd")
+
+
+@pytest.mark.parametrize("name", ENGINES)
+def test_read_workbook(workbook, name):
+    name = engine(name)
+    assert sheet_names(workbook, name) == ["2023", "2024"]
+    assert values(read_workbook(workbook, engine=name)) == values(frame())
+
+    # Rows of several sheets are concatenated, missing columns left empty
+    data = read_workbook(workbook, ["2023", "2024"], engine=name)
+    assert len(data) == 70 and data["JCR rank"].isna().sum() == 20
+    with open(workbook, "rb") as f:
+        assert values(read_workbook(BytesIO(f.read()), engine=name)) == values(frame())
+
+
+@pytest.mark.parametrize("name", ENGINES)
+def test_workbooks_are_read_once_then_mapped(workbook, cache_dir, monkeypatch, name):
+    name = engine(name)
+    reads = []
+
+    def counting_read(*args):
+        reads.append(args)
+        return read_workbook(*args)
+
+    monkeypatch.setattr(excel, "read_workbook", counting_read)
+    first = load_workbook(workbook, engine=name)
+    second = load_workbook(workbook, engine=name)
+    assert len(reads) == 1
+    assert values(second) == values(first) == values(frame())
+
+    # Other sheets, and other content, get stores of their own
+    load_workbook(workbook, ["2023", "2024"], engine=name)
+    with open(workbook, "rb") as f:
+        content = f.read()
+    upload = BytesIO(content)
+    upload.file_id, upload.size = "id-1", len(content)
+    load_workbook(upload, engine=name)
+    load_workbook(upload, engine=name)
+    assert len(reads) == 3
+    assert len([e for e in os.listdir(cache_dir) if MANIFEST in os.listdir(os.path.join(cache_dir, e))]) == 3
+
+
+def store(directory, name, nbytes, age):
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    with open(os.path.join(path, MANIFEST), "wb") as f:
+        f.write(b"x" * nbytes)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_stores(tmp_path):
+    directory = str(tmp_path)
+    store(directory, "stale", 100, age=7200)
+    store(directory, "old", 100, age=300)
+    store(directory, "recent", 100, age=60)
+    store(directory, "kept", 100, age=3000)
+    writing = os.path.join(directory, "recent.tmp-1")
+    os.makedirs(writing)
+    os.utime(writing, (time.time() - 600, time.time() - 600))
+
+    # Stale stores go whatever the budget; the least recently used go beyond it
+    prune_stores(directory, max_bytes=300, ttl=3600, keep="kept")
+    assert sorted(os.listdir(directory)) == ["kept", "old", "recent", "recent.tmp-1"]
+    prune_stores(directory, max_bytes=250, ttl=3600, keep="kept")
+    # A store being written, without a manifest yet, is only removed once stale
+    assert sorted(os.listdir(directory)) == ["kept", "recent", "recent.tmp-1"]
+    prune_stores(directory, max_bytes=250, ttl=500, keep="kept")
+    assert sorted(os.listdir(directory)) == ["kept", "recent"]
@@ -0,0 +1,32 @@
+import pytest
+
+from article_filter.filters import FilterSpec
+
+
+def test_from_dict_round_trip():
+    spec = FilterSpec(period="2015-2020", keywords="Scopus", exact_match=True, name="s")
+    assert FilterSpec.from_dict(spec.to_dict()) == spec
+
+
+@pytest.mark.parametrize("values, field", [
+    ({"keywords": 5}, "keywords"),
+    ({"keywords": 2020}, "keywords"),
+    ({"knowledge_group": ["Engineering"]}, "knowledge_group"),
+    ({"period": ["2015-2020"]}, "period"),
+    ({"jcr": None}, "jcr"),
+    ({"exact_match": "false"}, "exact_match"),
+    ({"exact_match": 1}, "exact_match"),
+    ({"name": 3}, "name"),
+])
+def test_wrong_field_types_name_the_field(values, field):
+    with pytest.raises(ValueError, match=f"'{field}'"):
+        FilterSpec.from_dict(values)
+
+
+def test_unknown_values_and_fields():
+    with pytest.raises(ValueError, match="period"):
+        FilterSpec(period="1990-2000")
+    with pytest.raises(ValueError, match="colour"):
+        FilterSpec.from_dict({"colour": "blue"})
+    with pytest.raises(ValueError, match="object"):
+        FilterSpec.from_dict(["keywords"])
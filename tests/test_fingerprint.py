@@ -0,0 +1,110 @@
+import gc
+import os
+
+import pandas as pd
+
+from article_filter import fingerprint
+from article_filter.fingerprint import (
+    SAMPLE_BYTES,
+    file_fingerprint,
+    frame_fingerprint,
+    sources_fingerprint,
+    stamp,
+    upload_content_hash,
+    upload_fingerprint,
+    uploads_fingerprint,
+)
+
+
+class Upload:
+    """The parts of Streamlit's UploadedFile the fingerprints use."""
+
+    def __init__(self, content, file_id, name="export.csv"):
+        self.content = content
+        self.file_id = file_id
+        self.name = name
+        self.size = len(content)
+
+    def getbuffer(self):
+        return memoryview(self.content)
+
+
+def write(path, content, mtime_ns=None):
+    path.write_bytes(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_file_fingerprint_changes_with_the_file(tmp_path):
+    content = bytes(range(256)) * (3 * SAMPLE_BYTES // 256)
+    path = write(tmp_path / "a.csv", content, mtime_ns=10**18)
+    before = file_fingerprint(path)
+    assert file_fingerprint(path) == before
+
+    # Same size and mtime: an edit in a sampled block (start, middle, end) is seen
+    for position in (0, len(content) // 2, len(content) - 1):
+        edited = bytearray(content)
+        edited[position] ^= 0xFF
+        write(tmp_path / "a.csv", bytes(edited), mtime_ns=10**18)
+        assert file_fingerprint(path) != before
+
+    # Anywhere else, through the size or mtime of the file
+    write(tmp_path / "a.csv", content + b"x", mtime_ns=10**18)
+    assert file_fingerprint(path) != before
+    write(tmp_path / "a.csv", content, mtime_ns=10**18 + 1)
+    assert file_fingerprint(path) != before
+    write(tmp_path / "a.csv", content, mtime_ns=10**18)
+    assert file_fingerprint(path) == before
+
+
+def test_sources_fingerprint_depends_on_every_file_and_its_name(tmp_path):
+    a = write(tmp_path / "a.csv", b"Title\nA\n", mtime_ns=10**18)
+    b = write(tmp_path / "b.csv", b"Title\nB\n", mtime_ns=10**18)
+    both = sources_fingerprint([a, b])
+    assert sources_fingerprint([a, b]) == both
+    assert sources_fingerprint([b, a]) != both
+    assert sources_fingerprint([a]) != both
+
+    write(tmp_path / "b.csv", b"Title\nC\n", mtime_ns=10**18)
+    assert sources_fingerprint([a, b]) != both
+
+    renamed = write(tmp_path / "c.csv", b"Title\nB\n", mtime_ns=10**18)
+    write(tmp_path / "b.csv", b"Title\nB\n", mtime_ns=10**18)
+    assert sources_fingerprint([a, b]) == both
+    assert sources_fingerprint([a, renamed]) != both
+
+
+def test_upload_hashes(monkeypatch):
+    monkeypatch.setattr(fingerprint, "_content_digests", type(fingerprint._content_digests)())
+    first = Upload(b"Title\nA\nB\n", "id-1", "export.csv")
+    same = Upload(b"Title\nA\nB\n", "id-2", "renamed.csv")
+    other = Upload(b"Title\nA\nC\n", "id-3", "export.csv")
+
+    # The cache key of a rerun is per upload; the content hash is shared
+    assert upload_fingerprint(first) != upload_fingerprint(same)
+    assert upload_content_hash(first) == upload_content_hash(same)
+    assert upload_content_hash(first) != upload_content_hash(other)
+    assert uploads_fingerprint([first, other]) == uploads_fingerprint([same, other])
+    assert uploads_fingerprint([first, other]) != uploads_fingerprint([other, first])
+
+
+def test_frame_fingerprint():
+    data = pd.DataFrame({"Title": ["A", "B", "C"], "Cited by": [1.0, 2.0, None]})
+    key = frame_fingerprint(data)
+    assert frame_fingerprint(data.copy()) == key
+
+    changed = data.copy()
+    changed.loc[1, "Cited by"] = 3.0
+    assert frame_fingerprint(changed) != key
+    assert frame_fingerprint(data.rename(columns={"Title": "Name"})) != key
+    assert frame_fingerprint(data.astype({"Cited by": "float32"})) != key
+    assert frame_fingerprint(data.iloc[[0, 2]]) != frame_fingerprint(data.iloc[[0, 1]])
+
+    # A stamped frame is keyed by its version; frames derived from it are hashed
+    stamped = stamp(data.copy(), "v1")
+    assert frame_fingerprint(stamped) == "v1"
+    assert frame_fingerprint(stamped.copy()) == key
+    del stamped
+    gc.collect()
+    assert "v1" not in [version for _, version in fingerprint._frame_versions.values()]
@@ -0,0 +1,102 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from article_filter import config
+from article_filter.dataset import Dataset
+from article_filter.filters import FilterSpec, apply_filters
+from article_filter.index import ALIGN, PREAMBLE, DatasetIndex, IndexBundleError, index_path, load_or_build
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR, load_paths
+
+
+def frame(n=500):
+    return pd.DataFrame({
+        "Title": [f"Article {i}" for i in range(n)],
+        "Year": [2005 + i % 20 for i in range(n)],
+        "Cited by": [i % 300 for i in range(n)],
+        "Keywords": ["Scopus,h-index" if i % 3 else "open science" for i in range(n)],
+        "JCR rank": ["Q1", "Q2", "Q3", "Q4", "No Q"] * (n // 5),
+    })
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    path = str(tmp_path / "data.idx")
+    DatasetIndex.build(frame(), fingerprint="fp").save(path)
+    return path
+
+
+def corrupt(path, name="period.order"):
+    """Flip the first byte of array name in the bundle at path."""
+    with open(path, "rb") as f:
+        _, _, header_size = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        header = json.loads(f.read(header_size))
+    data_start = -(-(PREAMBLE.size + header_size) // ALIGN) * ALIGN
+    with open(path, "r+b") as f:
+        f.seek(data_start + header["arrays"][name]["offset"])
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_save_load_round_trip(bundle):
+    index = DatasetIndex.load(bundle, verify=True)
+    assert index.fingerprint == "fp" and index.n_rows == 500
+    original = DatasetIndex.build(frame(), fingerprint="fp")
+    assert index.arrays.keys() == original.arrays.keys()
+    for name, array in original.arrays.items():
+        assert (index.arrays[name] == array).all()
+
+
+def test_checksum_mismatch_only_found_when_verifying(bundle, monkeypatch):
+    corrupt(bundle)
+    with pytest.raises(IndexBundleError, match="checksum"):
+        DatasetIndex.load(bundle, verify=True)
+    monkeypatch.setattr(config, "INDEX_VERIFY", True)
+    with pytest.raises(IndexBundleError, match="checksum"):
+        DatasetIndex.load(bundle)
+    monkeypatch.setattr(config, "INDEX_VERIFY", False)
+    # By default only the header and the size are checked, so opening stays cheap
+    DatasetIndex.load(bundle)
+
+
+@pytest.mark.parametrize("damage", ["truncate", "extend", "magic"])
+def test_damaged_header_or_size_is_rejected_without_verifying(bundle, damage):
+    size = os.path.getsize(bundle)
+    with open(bundle, "r+b") as f:
+        if damage == "truncate":
+            f.truncate(size - 64)
+        elif damage == "extend":
+            f.truncate(size + 64)
+        else:
+            f.write(b"NOTANIDX")
+    with pytest.raises(IndexBundleError):
+        DatasetIndex.load(bundle, verify=False)
+
+
+def test_load_or_build_rebuilds_stale_or_damaged_bundles(tmp_path):
+    source = str(tmp_path / "data.csv")
+    frame().to_csv(source, sep=CSV_SEPARATOR, index=False, encoding=CSV_ENCODING)
+    data = load_paths([source])
+    path = index_path([source])
+    first = load_or_build([source], data)
+    assert os.path.exists(path)
+    assert load_or_build([source], data).fingerprint == first.fingerprint
+    mtime = os.path.getmtime(path)
+
+    # The source changed: the bundle is rebuilt for the new data
+    frame(600).to_csv(source, sep=CSV_SEPARATOR, index=False, encoding=CSV_ENCODING)
+    data = load_paths([source])
+    index = load_or_build([source], data)
+    assert index.n_rows == 600 and index.fingerprint != first.fingerprint
+    spec = FilterSpec(jcr="Q2", keywords="Scopus")
+    assert Dataset(data, index=index).count(spec) == len(apply_filters(data, spec))
+
+    # A truncated bundle is rebuilt too
+    with open(path, "r+b") as f:
+        f.truncate(100)
+    assert load_or_build([source], data).n_rows == 600
+    assert DatasetIndex.load(path, verify=True).n_rows == 600
+    assert os.path.getmtime(path) >= mtime
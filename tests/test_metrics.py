@@ -0,0 +1,50 @@
+import math
+import re
+
+from article_filter import metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+def parse(text):
+    """Samples of a Prometheus text exposition as (name, labels, value); fails on malformed lines."""
+    samples = []
+    types = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+            continue
+        if not line or line.startswith("# HELP "):
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"malformed sample line: {line!r}"
+        value = match.group(3)
+        parsed = float(value.replace("+Inf", "inf"))
+        assert not math.isnan(parsed)
+        samples.append((match.group(1), match.group(2) or "", parsed))
+    return types, samples
+
+
+def test_render_is_valid_exposition_text():
+    registry = metrics.Registry()
+    registry.counter("t_runs_total", "Runs.").inc()
+    registry.gauge("t_bytes", "Bytes.", ["cache"]).set(12, cache='a "quoted"\nname')
+    registry.histogram("t_seconds", "Seconds.", ["stage"], buckets=(0.1, 1)).observe(0.5, stage="load")
+    registry.gauge("t_unmeasurable", "Not available here.", function=lambda: None)
+    registry.gauge("t_partly", "Some missing.", ["part"], function=lambda: {("a",): 1, ("b",): None})
+    types, samples = parse(registry.render())
+    assert types == {"t_runs_total": "counter", "t_bytes": "gauge", "t_seconds": "histogram",
+                     "t_unmeasurable": "gauge", "t_partly": "gauge"}
+    names = [name for name, _, _ in samples]
+    assert "t_unmeasurable" not in names
+    assert ("t_partly", '{part="a"}', 1.0) in samples and names.count("t_partly") == 1
+    assert ("t_seconds_bucket", '{stage="load",le="+Inf"}', 1.0) in samples
+    assert ("t_seconds_count", '{stage="load"}', 1.0) in samples
+
+
+def test_process_registry_renders(monkeypatch):
+    monkeypatch.setattr(metrics.RESIDENT_BYTES, "function", lambda: None)
+    parse(metrics.REGISTRY.render())
+    monkeypatch.undo()
+    parse(metrics.REGISTRY.render())
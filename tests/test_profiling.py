@@ -0,0 +1,105 @@
+import os
+import time
+
+import pytest
+
+from article_filter import config
+from article_filter.profiling import RunProfiler, captures, top_functions
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "interactive_article_filter_10.py")
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "profiles")
+    monkeypatch.setattr(config, "PROFILE_DIR", directory)
+    return directory
+
+
+def busy_filter(seconds=0.2):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(1000))
+    return total
+
+
+def test_cprofile_capture(profile_dir):
+    profiler = RunProfiler("cprofile", label="session/1").start()
+    busy_filter()
+    path = profiler.stop()
+    assert os.path.dirname(path) == profile_dir and path.endswith("-session_1.pstats")
+    functions = [row["function"] for row in top_functions(path)]
+    assert any(f.startswith("busy_filter (test_profiling.py:") for f in functions)
+    assert [(c["path"], c["profiler"]) for c in captures()] == [(path, "cprofile")]
+
+
+def test_sample_capture(profile_dir):
+    profiler = RunProfiler("sample").start()
+    busy_filter()
+    path = profiler.stop()
+    assert path.endswith(".collapsed")
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    # "frame;frame;frame count", the sampled thread's outermost frame first
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    busy = sum(count for stack, count in stacks.items() if "busy_filter (test_profiling.py:" in stack)
+    assert busy >= 5
+    assert captures()[0]["profiler"] == "sample"
+
+
+def test_captures_are_pruned_to_the_most_recent(profile_dir, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_KEEP", 2)
+    paths = []
+    for mode in ("cprofile", "sample", "cprofile"):
+        paths.append(RunProfiler(mode).start().stop())
+        time.sleep(0.02)
+    assert [c["path"] for c in captures()] == paths[:0:-1]
+    with pytest.raises(ValueError, match="Unknown profiler"):
+        RunProfiler("perf")
+
+
+def run_app(monkeypatch, tmp_path, admin_token, params):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.setattr(config, "ADMIN_TOKEN", admin_token)
+    monkeypatch.setattr(config, "DATA_SOURCE", str(tmp_path / "missing.csv"))
+    app = testing.AppTest.from_file(APP, default_timeout=60)
+    for name, value in params.items():
+        app.query_params[name] = value
+    app.run()
+    assert not app.exception
+    return app
+
+
+@pytest.mark.parametrize("token, params", [
+    (None, {"profile": "cprofile"}),
+    (None, {"profile": "cprofile", "token": ""}),
+    ("s3cret", {"profile": "cprofile"}),
+    ("s3cret", {"profile": "sample", "token": "guess"}),
+])
+def test_url_profiling_needs_the_admin_token(profile_dir, monkeypatch, tmp_path, token, params):
+    app = run_app(monkeypatch, tmp_path, token, params)
+    assert any("needs a valid ?token=" in w.value for w in app.warning)
+    assert captures() == []
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_url_profiling_with_the_admin_token(profile_dir, monkeypatch, tmp_path, mode):
+    app = run_app(monkeypatch, tmp_path, "s3cret", {"profile": mode, "token": "s3cret"})
+    assert not any("token" in w.value for w in app.warning)
+    assert [c["profiler"] for c in captures()] == [mode]
+    assert any(c.value.startswith("Profile saved to ") for c in app.sidebar.caption)
+
+
+@pytest.mark.parametrize("token, param, allowed", [
+    (None, None, False),
+    ("s3cret", None, False),
+    ("s3cret", "wrong", False),
+    ("s3cret", "s3cret", True),
+])
+def test_profiles_page_needs_the_admin_token(profile_dir, monkeypatch, tmp_path, token, param, allowed):
+    RunProfiler("cprofile").start().stop()
+    params = {"admin": "profiles"} if param is None else {"admin": "profiles", "token": param}
+    app = run_app(monkeypatch, tmp_path, token, params)
+    assert bool(app.error) != allowed
+    assert [t.value for t in app.title] == (["Profiles"] if allowed else [])
@@ -0,0 +1,133 @@
+import os
+import shutil
+import threading
+import time
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from article_filter.dataset import Dataset
+from article_filter.filters import FilterSpec
+from article_filter.fingerprint import uploads_fingerprint
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR, load_many
+from article_filter.registry import DatasetRegistry, dataset_bytes
+
+
+def frame(n, offset=0):
+    return pd.DataFrame({
+        "Title": [f"Article {offset + i}" for i in range(n)],
+        "Year": [2005 + i % 20 for i in range(n)],
+        "Cited by": [float(i % 50) for i in range(n)],
+        "Keywords": ["Scopus,h-index" if i % 2 else "open science" for i in range(n)],
+        "JCR rank": ["Q1", "Q2"] * (n // 2),
+    })
+
+
+class Upload(BytesIO):
+    """An uploaded export, as Streamlit's UploadedFile: a BytesIO with an id and a name."""
+
+    def __init__(self, content, file_id, name):
+        super().__init__(content)
+        self.file_id = file_id
+        self.name = name
+        self.size = len(content)
+
+
+def export(data):
+    return data.to_csv(sep=CSV_SEPARATOR, index=False).encode(CSV_ENCODING)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    def make(budget, ttl=None):
+        return DatasetRegistry(budget, ttl=ttl, spill_dir=str(tmp_path))
+    return make
+
+
+def test_least_recently_used_dataset_spills_and_maps_back(registry):
+    size = dataset_bytes(Dataset(frame(1000)))
+    reg = registry(int(size * 1.5))
+    a = reg.put("a", Dataset(frame(1000)))
+    reg.put("b", Dataset(frame(1000, offset=1000)))
+    assert reg.entries["a"].spilled and not reg.entries["b"].spilled
+    assert os.path.exists(reg.spill_path("a"))
+    reopened = reg.get("a")
+    assert reopened is not a
+    assert reopened.data.astype(object).equals(frame(1000).astype(object))
+    assert reopened.count(FilterSpec(jcr="Q1")) == 500
+    assert reg.stats()["spills"] == 1 and reg.stats()["reloads"] == 1
+    # Mapped back, it no longer counts against the budget
+    assert reg.memory_bytes == reg.entries["b"].nbytes
+
+
+def test_dataset_over_budget_on_its_own_is_served_mapped(registry):
+    reg = registry(1)
+    dataset = reg.put("a", Dataset(frame(100)))
+    assert reg.entries["a"].on_disk and reg.memory_bytes == 0
+    assert dataset.data["Title"].tolist() == frame(100)["Title"].tolist()
+
+
+def test_missing_spill_files_reload_from_source(registry):
+    size = dataset_bytes(Dataset(frame(1000)))
+    reg = registry(int(size * 1.5))
+    reg.put("a", Dataset(frame(1000)))
+    reg.put("b", Dataset(frame(1000, offset=1000)))
+    shutil.rmtree(reg.spill_path("a"))
+    loads = []
+
+    def load():
+        loads.append(True)
+        return frame(1000)
+
+    dataset = reg.get_or_load("a", load)
+    assert loads == [True]
+    assert dataset.data["Title"].tolist() == frame(1000)["Title"].tolist()
+    assert reg.get("a") is not None
+
+
+def test_idle_datasets_expire_from_memory_and_disk(registry):
+    reg = registry(1, ttl=0.05)
+    reg.put("a", Dataset(frame(100)))
+    path = reg.spill_path("a")
+    assert os.path.exists(path)
+    time.sleep(0.1)
+    assert reg.get("a") is None
+    assert "a" not in reg.entries and not os.path.exists(path)
+
+
+def test_used_datasets_do_not_expire(registry):
+    reg = registry(2**30, ttl=0.2)
+    reg.put("a", Dataset(frame(100)))
+    for _ in range(3):
+        time.sleep(0.1)
+        assert reg.get("a") is not None
+
+
+def test_same_export_uploaded_under_other_names_shares_one_entry(registry):
+    reg = registry(2**30)
+    content = export(frame(200))
+    uploads = [Upload(content, f"id-{i}", name) for i, name in enumerate(["a.csv", "b.csv", "copy of a.csv"])]
+    loads = []
+
+    def session(upload):
+        def load():
+            loads.append(upload.name)
+            return load_many([upload])
+        return reg.get_or_load(uploads_fingerprint([upload]), load)
+
+    datasets = [session(upload) for upload in uploads]
+    assert len(loads) == 1 and len(reg.entries) == 1
+    assert all(dataset is datasets[0] for dataset in datasets)
+    assert datasets[0].count(FilterSpec(jcr="Q1")) == 100
+
+    # Concurrent sessions uploading it again still share the entry, and
+    # another export gets its own
+    threads = [threading.Thread(target=session, args=(Upload(content, f"id-{i}", "c.csv"),)) for i in range(3, 8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1 and len(reg.entries) == 1
+    session(Upload(export(frame(200, offset=1)), "id-8", "a.csv"))
+    assert len(loads) == 2 and len(reg.entries) == 2
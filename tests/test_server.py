@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+from article_filter import metrics, server
+from article_filter.dataset import Dataset
+from article_filter.io import CSV_ENCODING, CSV_SEPARATOR
+from article_filter.sql import SQLiteDataset
+
+ROWS = 2500
+
+
+def corpus():
+    return pd.DataFrame({
+        "Title": [f"Article {i}" for i in range(ROWS)],
+        "Year": [2005 + i % 20 for i in range(ROWS)],
+        "Cited by": [i % 300 for i in range(ROWS)],
+        "Keywords": ["Scopus,h-index" if i % 3 else "open science" for i in range(ROWS)],
+        "JCR rank": ["Q1", "Q2", "Q3", "Q4", "No Q"] * (ROWS // 5),
+    })
+
+
+@pytest.fixture(params=["pandas", "sqlite"])
+def dataset(request, tmp_path):
+    data = corpus()
+    if request.param == "pandas":
+        return Dataset(data)
+    path = str(tmp_path / "data.csv")
+    data.to_csv(path, sep=CSV_SEPARATOR, index=False, encoding=CSV_ENCODING)
+    return SQLiteDataset.open(path, db_path=path + ".sqlite")
+
+
+async def exchange(dataset, method, path, body=None):
+    query_server = server.QueryServer(dataset)
+    listener = await asyncio.start_server(query_server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    if headers.get("Transfer-Encoding") == "chunked":
+        content = dechunk(content)
+    return int(lines[0].split()[1]), headers, content
+
+
+def dechunk(content):
+    body = b""
+    while True:
+        size, _, content = content.partition(b"\r\n")
+        size = int(size, 16)
+        if not size:
+            return body
+        body += content[:size]
+        content = content[size + 2:]
+
+
+def request(dataset, method, path, body=None):
+    return asyncio.run(exchange(dataset, method, path, body))
+
+
+def ndjson(content):
+    return [json.loads(line) for line in content.decode("utf-8").splitlines()]
+
+
+def test_filter_pages(dataset):
+    spec = {"jcr": "Q1"}
+    expected = [f"Article {i}" for i in range(0, ROWS, 5)]
+    status, headers, content = request(dataset, "POST", "/filter",
+                                       {"spec": spec, "offset": 10, "limit": 1200, "columns": ["Title", "Year"]})
+    assert status == 200 and headers["Content-Type"] == "application/x-ndjson"
+    rows = ndjson(content)
+    assert [row["Title"] for row in rows] == expected[10:1210]
+    assert set(rows[0]) == {"Title", "Year"}
+    # Past the end, and without a limit
+    assert ndjson(request(dataset, "POST", "/filter", {"spec": spec, "offset": 5000})[2]) == []
+    rows = ndjson(request(dataset, "POST", "/filter", {"spec": spec, "offset": 490})[2])
+    assert [row["Title"] for row in rows] == expected[490:]
+
+
+def test_count_and_facet(dataset):
+    assert json.loads(request(dataset, "POST", "/count", {"spec": {"jcr": "Q2"}})[2]) == {"count": ROWS // 5}
+    status, _, content = request(dataset, "POST", "/facet", {"spec": {}, "column": "JCR rank", "limit": 2})
+    assert status == 200 and [item["count"] for item in json.loads(content)] == [ROWS // 5] * 2
+
+
+@pytest.mark.parametrize("path, body, message", [
+    ("/filter", {"spec": {"keywords": ["Scopus"]}}, "'keywords' must be a string"),
+    ("/filter", {"spec": {"exact_match": "false"}}, "exact_match"),
+    ("/count", {"spec": {"colour": "blue"}}, "Unknown filter fields: colour"),
+    ("/count", {"spec": ["jcr"]}, "must be an object"),
+    ("/filter", {"spec": {}, "offset": -1}, "'offset' must not be negative"),
+    ("/filter", {"spec": {}, "columns": "Title"}, "'columns' must be a list"),
+    ("/filter", {"spec": {}, "columns": ["Title", "Colour"]}, "Unknown columns: Colour"),
+    ("/facet", {"spec": {}}, "facet expects a 'column'"),
+    ("/export", {"spec": {}, "format": "pdf"}, "Unknown export format"),
+])
+def test_bad_requests_are_400(dataset, path, body, message):
+    status, _, content = request(dataset, "POST", path, body)
+    assert status == 400
+    assert message in json.loads(content)["error"]
+
+
+def test_unknown_endpoint_and_method(dataset):
+    assert request(dataset, "GET", "/nowhere")[0] == 404
+    assert request(dataset, "GET", "/count")[0] == 405
+
+
+def test_export_csv(dataset):
+    status, headers, content = request(dataset, "POST", "/export", {"spec": {"jcr": "Q3"}, "format": "csv"})
+    assert status == 200 and headers["Content-Type"] == "text/csv"
+    assert len(content.decode(CSV_ENCODING).splitlines()) == ROWS // 5 + 1
+
+
+def test_export_conversion_counts_as_in_flight(dataset, monkeypatch):
+    seen = []
+    to_csv = server.to_csv
+
+    def counting_to_csv(rows):
+        seen.append(metrics.QUERIES_IN_FLIGHT.values[("/export",)])
+        return to_csv(rows)
+
+    monkeypatch.setattr(server, "to_csv", counting_to_csv)
+    assert request(dataset, "POST", "/export", {"spec": {}, "format": "csv"})[0] == 200
+    assert seen == [1]
+    assert metrics.QUERIES_IN_FLIGHT.values[("/export",)] == 0
+
+
+def test_metrics_endpoint(dataset):
+    status, headers, content = request(dataset, "GET", "/metrics")
+    assert status == 200 and headers["Content-Type"].startswith("text/plain")
+    assert "# TYPE article_filter_queries_in_flight gauge" in content.decode("utf-8")
+    assert "None" not in content.decode("utf-8")
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from article_filter import config
+from article_filter.dataset import Dataset
+from article_filter.io import CSV_ENCODING, load_paths
+from article_filter.watch import DatasetWatcher, SharedDataset
+
+HEADER = "Title;Year;Cited by;Keywords\n"
+
+
+def rows(start, stop):
+    return "\n".join(f"Article {i};{2000 + i % 20};{i};kw{i % 3}" for i in range(start, stop))
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "COLUMN_STORE", False)
+
+    def watch(text):
+        path = tmp_path / "data.csv"
+        path.write_text(text, encoding=CSV_ENCODING)
+        path = str(path)
+        shared = SharedDataset(Dataset(load_paths([path])))
+        return path, shared, DatasetWatcher(shared, path, interval=100)
+
+    return watch
+
+
+def append(path, text):
+    with open(path, "a", encoding=CSV_ENCODING) as f:
+        f.write(text)
+
+
+def titles(shared):
+    return shared.current.data["Title"].tolist()
+
+
+def test_unchanged_file_without_trailing_newline_is_not_reloaded(watched):
+    path, shared, watcher = watched(HEADER + rows(0, 50))
+    assert not watcher.changed()
+    assert watcher.poll() is None
+    assert len(shared.current) == 50
+
+
+def test_append_after_unterminated_last_record(watched):
+    path, shared, watcher = watched(HEADER + rows(0, 50))
+    append(path, "\n" + rows(50, 55))
+    assert watcher.poll() == "append"
+    assert titles(shared) == load_paths([path])["Title"].tolist()
+    assert len(shared.current) == 55
+    assert watcher.poll() is None
+
+
+def test_extended_last_record_reloads(watched):
+    path, shared, watcher = watched(HEADER + rows(0, 50))
+    append(path, "0;2001;1;kw0\n")
+    assert watcher.poll() == "reload"
+    assert titles(shared) == load_paths([path])["Title"].tolist()
+
+
+def test_record_written_in_two_parts(watched):
+    path, shared, watcher = watched(HEADER + rows(0, 50) + "\n")
+    append(path, rows(50, 53) + "\nArticle 53;20")
+    assert watcher.poll() == "append"
+    assert titles(shared) == load_paths([path])["Title"].tolist()
+    append(path, "03;53;kw2\n")
+    assert watcher.poll() == "reload"
+    assert titles(shared) == load_paths([path])["Title"].tolist()
+    assert shared.current.data["Year"].iloc[-1] == 2003
+    append(path, rows(54, 56) + "\n")
+    assert watcher.poll() == "append"
+    assert len(shared.current) == 56